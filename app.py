@@ -1,11 +1,14 @@
 """Flask App for Water Mate."""
 
 import os
+import click
 from dotenv import load_dotenv
 import shutil
-from flask import Flask, render_template, request, json, jsonify, flash, redirect, session, g, url_for, send_from_directory
+from flask import Flask, render_template, request, json, jsonify, flash, redirect, session, g, url_for, send_from_directory, abort
 # from flask_debugtoolbar import DebugToolbarExtension #for development only
-from sqlalchemy.exc import IntegrityError
+from flask_migrate import Migrate
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import selectinload, joinedload
 from functools import wraps
 from models import db, connect_db, Collection, Room, User, LightType, LightSource, PlantType, Plant, WaterSchedule, WaterHistory
 from forms import *
@@ -13,13 +16,20 @@ from werkzeug.utils import secure_filename
 from location import UserLocation
 from datetime import datetime, timedelta
 from water_calculator import WaterCalculator
-import boto3
-from botocore.exceptions import ClientError
+from water_recalculator import recalculate_water_schedules
+from identity import get_current_identity, remember_user, forget_user
+from loaders import load_collection, load_room, load_lightsource, load_plant, load_plant_schedule
+from storage import get_storage, StorageError
+from uploads import UploadQueue
+from static_assets import StaticAssets
+from reference import preload_reference, get_plant_type, load_plant_type
+from water_batch import parse_batch, apply_batch, BatchError
 
 load_dotenv()  # take environment variables from .env.
 CURRENT_USER_KEY = 'current_user'
+# Requests with these methods don't change data, so they can use the cached identity of the logged in user.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 UPLOAD_FOLDER = os.getenv('S3_LOCATION')
-BUCKET_NAME = os.getenv('S3_BUCKET')
 
 app = Flask(__name__)
 
@@ -32,13 +42,35 @@ app.config['SQLALCHEMY_DATABASE_URI'] = uri
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0 #Disables Flask file caching
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0 #Disables Flask file caching, except for fingerprinted static files (see static_assets)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['WATER_HISTORY_PAGE_SIZE'] = int(os.getenv('WATER_HISTORY_PAGE_SIZE', 25))
+app.config['WATER_HISTORY_MAX_PAGE_SIZE'] = 100
+app.config['WATER_MANAGER_MAX_BATCH'] = 500
 # toolbar = DebugToolbarExtension(app) # for development only
 
 #connect app
 connect_db(app)
 
+#the schema (tables and indexes) is managed with migrations in /migrations, run flask db upgrade after pulling changes
+migrate = Migrate(app, db)
+
+#PlantTypes and LightTypes are cached once per process, set PRELOAD_REFERENCE_DATA to load them at startup instead of on first use
+if os.getenv('PRELOAD_REFERENCE_DATA'):
+    with app.app_context():
+        try:
+            preload_reference()
+        except SQLAlchemyError as e:
+            #the tables don't exist before the first flask db upgrade, they are loaded on first use instead
+            db.session.rollback()
+            app.logger.warning(f'Could not preload the reference data: {e}')
+
+#plant images are uploaded by a background worker so requests don't wait on S3
+upload_queue = UploadQueue(app)
+
+#static URLs get a content hash so the static files can be cached by the browser for a year
+static_assets = StaticAssets(app)
+
 ####################
 # Home/Pages/Error 
 # Routes
@@ -47,10 +79,15 @@ connect_db(app)
 @app.before_request
 def check_for_authed_user():
     """Check if there is a current user session before each request.
-    If current user in session, add the user to the global g user."""
+    If current user in session, add the user's identity (id, name, username and coordinates) to the global g user.
+    The identity is read from the session or a short lived cache, so the database is only queried when it expires.
+    Requests that change data always load the identity from the database, and a deleted user is logged out."""
 
     if CURRENT_USER_KEY in session:
-        g.user = User.query.get_or_404(session[CURRENT_USER_KEY])
+        g.user = get_current_identity(session, session[CURRENT_USER_KEY], refresh=request.method not in SAFE_METHODS)
+
+        if g.user is None:
+            del session[CURRENT_USER_KEY]
     else:
         g.user = None
 
@@ -87,6 +124,8 @@ def page_not_found(e):
 @app.errorhandler(403)
 def forbidden(e):
     """403 forbidden route."""
+    if request.is_json:
+        return (jsonify({"access": "DENIED"}), 403)
     return render_template("403.html", e=e), 403
 
 @app.route('/about')
@@ -129,14 +168,16 @@ def signup():
                 )
                 db.session.commit()
 
-                #create a new uploads directory (key) in S3 bucket for this user
-                #connnect as client to create a new key
-                s3 = boto3.client('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-                new_directory_name = f'uploads/user/{new_user.id}/'
-                s3.put_object(Bucket=BUCKET_NAME, Key=(new_directory_name))
+                #create a new uploads directory (key) in the upload storage (S3 bucket) for this user
+                try:
+                    get_storage().make_folder(f'{new_user.id}/')
+                except StorageError as e:
+                    #uploads create the directory anyway, so this isn't a reason to fail the signup
+                    app.logger.warning(f'Could not create the uploads directory for user {new_user.id}: {e}')
 
                 #add the new user to session
                 session[CURRENT_USER_KEY] = new_user.id
+                remember_user(session, new_user)
 
                 flash(f'Welcome to Water Mate, {new_user.name}!', 'success')
                 return redirect(url_for('get_started'))
@@ -161,6 +202,7 @@ def login():
 
         if user:
             session[CURRENT_USER_KEY] = user.id
+            remember_user(session, user)
             flash(f'Welcome back, {user.name}!', 'success')
             return redirect(url_for('water_manager'))
         
@@ -174,6 +216,7 @@ def logout():
     """Logout the current user."""
 
     if CURRENT_USER_KEY in session:
+        forget_user(session, session[CURRENT_USER_KEY])
         del session[CURRENT_USER_KEY]
 
     flash("You have successfully logged out.", 'success')
@@ -189,7 +232,13 @@ def dashboard():
     """Show the user dashboard for a specific user. Shows all Collections, Rooms, LightSources and Plants."""
 
     user = g.user
-    collections = Collection.query.filter_by(user_id=g.user.id).all()
+    #load the whole collection tree in a fixed number of queries (one per level) instead of lazy loading each room's lights and plants
+    collections = (Collection.query
+        .filter_by(user_id=g.user.id)
+        .options(
+            selectinload(Collection.rooms).selectinload(Room.lightsources),
+            selectinload(Collection.rooms).selectinload(Room.plants))
+        .all())
 
     return render_template('/dashboard.html', user=user, collections=collections)
 
@@ -207,17 +256,18 @@ def view_profile():
 def edit_profile():
     """Edit a user's profile information."""
 
-    form = EditUserProfileForm(obj=g.user)
+    user = g.user.load()
+    form = EditUserProfileForm(obj=user)
 
     if form.validate_on_submit():
-        if User.authenticate(g.user.username, form.password.data):
+        if User.authenticate(user.username, form.password.data):
             try:
-                user = User.query.get_or_404(g.user.id)
                 user.name = form.name.data
                 user.username = form.username.data
                 user.email = form.email.data
 
                 db.session.commit()
+                remember_user(session, user)
                 flash('Profile updated!', 'success')
                 return redirect(url_for('view_profile'))
 
@@ -227,17 +277,18 @@ def edit_profile():
 
         form.password.errors.append('Wrong password, please try again.')
 
-    return render_template('/user/edit.html', user=g.user, form=form)
+    return render_template('/user/edit.html', user=user, form=form)
 
 @app.route('/profile/edit-password', methods=['GET', 'POST'])
 @auth_required
 def edit_password():
     """Edit a user's password."""
 
-    form = ChangePasswordForm(obj=g.user)
+    user = g.user.load()
+    form = ChangePasswordForm(obj=user)
 
     if form.validate():
-        if User.changePassword(g.user, form.current_password.data, form.new_password.data):
+        if User.changePassword(user, form.current_password.data, form.new_password.data):
             db.session.commit()
 
             flash('Password updated!', 'success')
@@ -259,10 +310,12 @@ def edit_location():
         coordinates = user_location.get_coordinates()
 
         if coordinates:
-            g.user.latitude = coordinates['lat']
-            g.user.longitude = coordinates['lng']
+            user = g.user.load()
+            user.latitude = coordinates['lat']
+            user.longitude = coordinates['lng']
 
             db.session.commit()
+            remember_user(session, user)
             flash('Geolocation is updated.', 'success')
             return redirect(url_for('view_profile'))
 
@@ -276,24 +329,19 @@ def delete_profile():
     """Delete a user's account and all data."""
     #Try to delete the user, if there is a problem tell the user why.
     try:
-        #first we have to delete all plants
-        user_plants = Plant.query.filter_by(user_id=g.user.id).all()
-        for plant in user_plants:
-            db.session.delete(plant)
-            db.session.commit()
-
-        #delete the user's files and uploads directory (key) from the S3 bucket
-        s3 = boto3.resource('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-        bucket = s3.Bucket(BUCKET_NAME)
-        for key in bucket.objects.filter(Prefix=f'uploads/user/{g.user.id}/'):
-            print(key)
-            key.delete()
-
-        #try to delete the user
-        db.session.delete(g.user)
+        #delete the user's rows with bulk deletes in one transaction
+        User.delete_account(g.user.id)
         db.session.commit()
 
+        #delete the user's files and uploads directory (key) from the upload storage (S3 bucket)
+        try:
+            get_storage().delete_prefix(f'{g.user.id}/')
+        except StorageError as e:
+            #the account is already deleted, so any files left behind are only logged
+            app.logger.warning(f'Could not delete the uploads for user {g.user.id}: {e}')
+
         #delete user session
+        forget_user(session, g.user.id)
         if CURRENT_USER_KEY in session:
             del session[CURRENT_USER_KEY]
         
@@ -301,6 +349,7 @@ def delete_profile():
         return redirect(url_for('homepage'))
 
     except IntegrityError:
+        db.session.rollback()
         flash('There was a problem deleting your account.', 'warning')
         return redirect(url_for('dashboard'))
 
@@ -313,7 +362,7 @@ def delete_profile():
 def show_collections():
     """Show user collection landing page."""
 
-    collections = g.user.collections
+    collections = Collection.query.filter_by(user_id=g.user.id).all()
 
     return render_template('/collection/view_collections.html', collections=collections)
 
@@ -322,13 +371,9 @@ def show_collections():
 def view_collection(collection_id):
     """View a collection by id and all of the rooms inside the collection."""
 
-    collection = Collection.query.get_or_404(collection_id)
+    collection = load_collection(collection_id, joinedload(Collection.rooms))
     rooms = collection.rooms
 
-    if collection.user_id != g.user.id:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('show_collections'))
-
     return render_template('/collection/view_collection.html', collection=collection, rooms=rooms)
 
 @app.route('/collections/add-collection', methods=['GET', 'POST'])
@@ -344,7 +389,7 @@ def add_collection():
             user_id = g.user.id,
         )
         try:
-            g.user.collections.append(new_collection)
+            db.session.add(new_collection)
             db.session.commit()
             flash(f'New Collection, {new_collection.name} - added!', 'success')
         except IntegrityError:
@@ -359,21 +404,17 @@ def add_collection():
 def edit_collection(collection_id):
     """Edit a collection by id."""
 
-    collection = Collection.query.get_or_404(collection_id)
+    collection = load_collection(collection_id)
 
     form = EditCollectionForm(obj=collection)
 
-    if g.user.id == collection.user_id:
-        if form.validate_on_submit():
-            try:
-                collection.name = form.name.data
-                db.session.commit()
-                flash(f'{collection.name} updated!', 'success')
-            except IntegrityError:
-                flash('Collection names must be unique.', 'warning')
-            return redirect(url_for('show_collections'))
-    else:
-        flash('Access Denied.', 'danger')
+    if form.validate_on_submit():
+        try:
+            collection.name = form.name.data
+            db.session.commit()
+            flash(f'{collection.name} updated!', 'success')
+        except IntegrityError:
+            flash('Collection names must be unique.', 'warning')
         return redirect(url_for('show_collections'))
 
     return render_template('/collection/edit_collection.html', form=form)
@@ -383,17 +424,14 @@ def edit_collection(collection_id):
 def delete_collection(collection_id):
     """Delete a collection by id."""
 
-    collection = Collection.query.get_or_404(collection_id)
+    collection = load_collection(collection_id)
 
-    if g.user.id == collection.user_id:
-        try:
-            db.session.delete(collection)
-            db.session.commit()
-            flash('Collection Deleted.', 'success')
-        except IntegrityError:
-            flash('You cannot delete a collection that has plants!', 'warning')
-    else:
-        flash('Access Denied.', 'danger')
+    try:
+        db.session.delete(collection)
+        db.session.commit()
+        flash('Collection Deleted.', 'success')
+    except IntegrityError:
+        flash('You cannot delete a collection that has plants!', 'warning')
     
     return redirect(url_for('show_collections'))
 
@@ -406,16 +444,10 @@ def delete_collection(collection_id):
 def view_room(room_id):
     """View a room by id."""
 
-    room = Room.query.get_or_404(room_id)
+    room, collection = load_room(room_id)
     plants = room.plants
     lightsources = room.lightsources
 
-    collection = Collection.query.get_or_404(room.collection_id)
-
-    if collection.user_id != g.user.id:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('show_collections'))
-
     return render_template('/room/view_room.html', room=room, plants=plants, lightsources=lightsources)
 
 @app.route('/collections/<int:collection_id>/add-room', methods=['GET', 'POST'])
@@ -425,27 +457,22 @@ def add_room(collection_id):
 
     form = AddRoomForm()
 
-    collection = Collection.query.get_or_404(collection_id)
-
-    if g.user.id == collection.user_id:
-        if form.validate_on_submit():
-            new_room = Room(
-                name = form.name.data,
-                collection_id = collection_id
-            )
-            try:
-                collection.rooms.append(new_room)
-                db.session.commit()
-                flash(f'New Room, {new_room.name} - added!', 'success')
+    collection = load_collection(collection_id)
 
-            except IntegrityError:
-                flash('Room names must be unique.', 'warning')
+    if form.validate_on_submit():
+        new_room = Room(
+            name = form.name.data,
+            collection_id = collection_id
+        )
+        try:
+            collection.rooms.append(new_room)
+            db.session.commit()
+            flash(f'New Room, {new_room.name} - added!', 'success')
 
-            return redirect(url_for('view_collection', collection_id=collection_id))
+        except IntegrityError:
+            flash('Room names must be unique.', 'warning')
 
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('show_collections'))
+        return redirect(url_for('view_collection', collection_id=collection_id))
 
     return render_template('/room/add_room.html', form=form, collection_id=collection_id)
 
@@ -454,23 +481,18 @@ def add_room(collection_id):
 def edit_room(room_id):
     """Edit a room by id."""
 
-    room = Room.query.get_or_404(room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
+    room, collection = load_room(room_id)
 
     form = EditRoomForm(obj=room)
 
-    if g.user.id == collection.user_id:
-        if form.validate_on_submit():
-            try:
-                room.name = form.name.data
-                db.session.commit()
-                flash(f'{room.name} updated!', 'success')
-            except IntegrityError:
-                db.session.rollback() #For some reason my @app.teardown_request method isn't rolling back this session when it errors
-                flash('Room names must be unique.', 'warning')
-            return redirect(url_for('view_collection', collection_id=collection.id))
-    else:
-        flash('Access Denied.', 'danger')
+    if form.validate_on_submit():
+        try:
+            room.name = form.name.data
+            db.session.commit()
+            flash(f'{room.name} updated!', 'success')
+        except IntegrityError:
+            db.session.rollback() #For some reason my @app.teardown_request method isn't rolling back this session when it errors
+            flash('Room names must be unique.', 'warning')
         return redirect(url_for('view_collection', collection_id=collection.id))
 
     return render_template('/room/edit_room.html', form=form, room=room)
@@ -480,20 +502,16 @@ def edit_room(room_id):
 def delete_room(room_id):
     """Delete a room by id."""
 
-    room = Room.query.get_or_404(room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
+    room, collection = load_room(room_id)
 
-    if g.user.id == collection.user_id:
-        try:
-            db.session.delete(room)
-            db.session.commit()
-            flash('Room Deleted.', 'success')
-        except IntegrityError:
-            db.session.rollback()
-            flash('You cannot delete a room that has plants!', 'warning')
-            return redirect(url_for('view_room', room_id=room_id))
-    else:
-        flash('Access Denied.', 'danger')
+    try:
+        db.session.delete(room)
+        db.session.commit()
+        flash('Room Deleted.', 'success')
+    except IntegrityError:
+        db.session.rollback()
+        flash('You cannot delete a room that has plants!', 'warning')
+        return redirect(url_for('view_room', room_id=room_id))
 
     return redirect(url_for('view_collection', collection_id=collection.id))
 
@@ -507,26 +525,21 @@ def add_lightsource(room_id):
     """Add one or multiple light sources to a room."""
 
     form = AddLightSource()
-    room = Room.query.get_or_404(room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
+    room, collection = load_room(room_id)
 
-    if g.user.id == collection.user_id:
-        if form.validate_on_submit():
-            try:
-                #types arrive as a list of ORM objects
-                light_types = form.light_type.data
-                for light in light_types:
-                    #we will set the daily_total to the default 8 hours for now.
-                    room.lightsources.append(LightSource(type=light.type, type_id=light.id, room_id=room_id))
+    if form.validate_on_submit():
+        try:
+            #types arrive as a list of ORM objects
+            light_types = form.light_type.data
+            for light in light_types:
+                #we will set the daily_total to the default 8 hours for now.
+                room.lightsources.append(LightSource(type=light.type, type_id=light.id, room_id=room_id))
 
-                db.session.commit()
-            except IntegrityError:
-                flash('You already added this lightsource to this room!', 'warning')
+            db.session.commit()
+        except IntegrityError:
+            flash('You already added this lightsource to this room!', 'warning')
 
-            return redirect(url_for('view_room', room_id=room_id))
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection.id))
+        return redirect(url_for('view_room', room_id=room_id))
 
     return render_template('/light/add_lightsource.html', form=form, room=room)
 
@@ -537,16 +550,10 @@ def view_lightsource_plants(lightsource_id):
     Helpful if a user wants to delete a lightsource from a room 
     but needs to know which plants are assigned to this light."""
 
-    lightsource = LightSource.query.get_or_404(lightsource_id)
-    room = Room.query.get_or_404(lightsource.room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
+    lightsource, room, collection = load_lightsource(lightsource_id)
     plants = lightsource.plant
 
-    if g.user.id == collection.user_id:
-        return render_template('/light/view_lightsource_plants.html', room=room, plants=plants, lightsource=lightsource)
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection.id))
+    return render_template('/light/view_lightsource_plants.html', room=room, plants=plants, lightsource=lightsource)
 
 @app.route('/collection/room/lightsource/<int:lightsource_id>', methods=['POST'])
 @auth_required
@@ -555,22 +562,16 @@ def delete_lightsource(lightsource_id):
     Lightsources that have plants using them cannot
     be deleted."""
 
-    lightsource = LightSource.query.get_or_404(lightsource_id)
-    room = Room.query.get_or_404(lightsource.room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
+    lightsource, room, collection = load_lightsource(lightsource_id)
 
-    if g.user.id == collection.user_id:
-        try:
-            db.session.delete(lightsource)
-            db.session.commit()
-            flash(f'{lightsource.type} light was deleted from your {room.name}', 'success')
-        except IntegrityError:
-            db.session.rollback()
-            flash('You cannot delete a lightsource that has plants using it! Change your plant lightsource first.', 'warning')
-        return redirect(url_for('view_room', room_id=room.id))
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection.id))
+    try:
+        db.session.delete(lightsource)
+        db.session.commit()
+        flash(f'{lightsource.type} light was deleted from your {room.name}', 'success')
+    except IntegrityError:
+        db.session.rollback()
+        flash('You cannot delete a lightsource that has plants using it! Change your plant lightsource first.', 'warning')
+    return redirect(url_for('view_room', room_id=room.id))
 
 ####################
 # Plant Routes
@@ -582,28 +583,15 @@ def view_plant(plant_id):
     """View a plants details by plant id. From the plant view you can
     edit plant details, view other details, or delete a plant."""
 
-    plant = Plant.query.get_or_404(plant_id)
-    water_schedule = WaterSchedule.query.filter_by(plant_id=plant_id).first()
+    plant, water_schedule, room, collection = load_plant_schedule(plant_id)
 
-    if g.user.id == plant.user_id:
-        return render_template('/plant/view_plant.html', plant=plant, water_schedule=water_schedule)
-    else:
-        collection_id = plant.room.collection_id
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection_id))
+    return render_template('/plant/view_plant.html', plant=plant, water_schedule=water_schedule)
 
-def post_s3(bucket, key, img):
-    """A helper method to POST an image to S3 bucket."""
-    try:
-        # Connect to s3 account using account credentials. We will use this connection to connection securely to our 
-        # s3 account to create new user upload directories and upload user images.
-        s3 = boto3.resource('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-        # upload the image in the specified folder(key)
-        s3.Bucket(bucket).put_object(Key=key+img.filename, Body=img)
-        #if successful return the new img url
-        return f'{UPLOAD_FOLDER}{g.user.id}/{img.filename}'
-    except ClientError as e:
-        return None
+def spool_image(img):
+    """A helper method to spool a user's uploaded image for the background resize & upload to the user's uploads directory.
+    Returns the upload job, set the plant's image to job.placeholder and submit the job after the plant is saved."""
+
+    return upload_queue.spool(img, prefix=f'{g.user.id}/')
 
 @app.route('/collection/rooms/<int:room_id>/add-plant', methods=['GET', 'POST'])
 @auth_required
@@ -611,47 +599,35 @@ def add_plant(room_id):
     """Add a new plant to a room by room id."""
 
     form = AddPlantForm()
-    room = Room.query.get_or_404(room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
+    room, collection = load_room(room_id)
     #set the light_source query for the form
     form.light_source.query = LightSource.query.filter_by(room_id=room.id).all()
 
-    if g.user.id == collection.user_id:
-        if form.validate_on_submit():
-            # print(request.values)
-            img = request.files['image']
-            #if the image exists, securely upload to user's s3 bucket
-            if img.filename:
-                key = f'uploads/user/{g.user.id}/'
-                url = post_s3(bucket=BUCKET_NAME, key=key, img=img)
+    if form.validate_on_submit():
+        # print(request.values)
+        img = request.files['image']
+        #if the image exists, spool it for the background upload to the user's uploads directory.
+        #the plant shows a placeholder image until the upload finishes.
+        upload = spool_image(img) if img.filename else None
+
+        new_plant = Plant(
+            name=form.name.data,
+            image=upload.placeholder if upload else None,
+            user_id=g.user.id,
+            type_id=form.plant_type.data.id,
+            room_id=room.id,
+            light_id=form.light_source.data.id)
+        room.plants.append(new_plant)
+        db.session.commit()
 
-                new_plant = Plant(
-                    name=form.name.data,
-                    image=url,
-                    user_id=g.user.id,
-                    type_id=form.plant_type.data.id,
-                    room_id=room.id,
-                    light_id=form.light_source.data.id)
-            else:
-                new_plant = Plant(
-                    name=form.name.data,
-                    image=None,
-                    user_id=g.user.id,
-                    type_id=form.plant_type.data.id,
-                    room_id=room.id,
-                    light_id=form.light_source.data.id)
-            print(new_plant)
-            room.plants.append(new_plant)
-            db.session.commit()
+        if upload:
+            upload_queue.submit(upload, new_plant.id)
 
-            water_date = form.water_date.data
-            create_waterschedule(new_plant, water_date)
+        water_date = form.water_date.data
+        create_waterschedule(new_plant, water_date)
 
-            flash(f'New plant, {new_plant.name}, added to {room.name}!', 'success')
-            return redirect(url_for('view_room', room_id=room.id))
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection.id))
+        flash(f'New plant, {new_plant.name}, added to {room.name}!', 'success')
+        return redirect(url_for('view_room', room_id=room.id))
 
     return render_template('/plant/add_plant.html', form=form, room=room)
 
@@ -660,45 +636,42 @@ def add_plant(room_id):
 def edit_plant(plant_id):
     """Edit a plant by id."""
 
-    plant = Plant.query.get_or_404(plant_id)
+    plant, room, collection = load_plant(plant_id)
     form = EditPlantForm(obj=plant)
-    form.plant_type.data = PlantType.query.get(plant.type_id)
+    form.plant_type.data = get_plant_type(plant.type_id)
     form.light_source.data = LightSource.query.get(plant.light_id)
 
-    room = Room.query.get_or_404(plant.room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
-
     #set the light_source query for the form
     form.light_source.query = LightSource.query.filter_by(room_id=room.id).all()
 
-    if g.user.id == plant.user_id:
-        if form.validate_on_submit():
-            #if the image exists, securely upload to user's s3 bucket
-            img = request.files['image']
-            if img:
-                key = f'uploads/user/{g.user.id}/'
-                url = post_s3(bucket=BUCKET_NAME, key=key, img=img)
-                #set the new plant url from the upload
-                plant.image = url
-      
-            #update the rest of the plant's data from the form
-            plant.name = form.name.data
-            plant.type_id = form.plant_type.data.id
-            plant.light_id = form.light_source.data.id
-            db.session.commit()
+    if form.validate_on_submit():
+        #if the image exists, spool it for the background upload to the user's uploads directory
+        img = request.files['image']
+        upload = None
+        if img:
+            upload = spool_image(img)
+            #show a placeholder image until the upload finishes
+            plant.image = upload.placeholder
+            plant.image_renditions = None
+
+        #update the rest of the plant's data from the form
+        plant.name = form.name.data
+        plant.type_id = form.plant_type.data.id
+        plant.light_id = form.light_source.data.id
+
+        #reset the plant's water_schedule to reflect any changes in type or location but do not change the last water date.
+        #the water schedule was loaded with the plant and the plant type comes from the form, so neither is queried again.
+        water_schedule = plant.water_schedule
+        plant_type = form.plant_type.data
+        water_schedule.water_interval = plant_type.base_water
+        water_schedule.next_water_date = water_schedule.water_date + timedelta(days=plant_type.base_water)
+        db.session.commit()
 
-            #reset the plant's water_schedule to reflect any changes in type or location but do not change the last water date.
-            water_schedule = WaterSchedule.query.filter_by(plant_id=plant.id).first()
-            plant_type = PlantType.query.get_or_404(plant.type_id)
-            water_schedule.water_interval = plant_type.base_water
-            water_schedule.next_water_date = water_schedule.water_date + timedelta(days=plant_type.base_water)
-            db.session.commit()
+        if upload:
+            upload_queue.submit(upload, plant.id)
 
-            flash(f'{plant.name} updated!', 'success')
-            return redirect(url_for('view_plant', plant_id=plant.id))
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection.id))
+        flash(f'{plant.name} updated!', 'success')
+        return redirect(url_for('view_plant', plant_id=plant.id))
 
     return render_template('/plant/edit_plant.html', form=form, plant=plant, room=room)
 
@@ -707,27 +680,21 @@ def edit_plant(plant_id):
 def delete_plant(plant_id):
     """Delete a plant by id."""
 
-    plant = Plant.query.get_or_404(plant_id)
-    room = Room.query.get_or_404(plant.room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
-
-    if g.user.id == plant.user_id:
-        #This isn't working yet. I don't want to accidentally delete the main key/directory
-        # if not '/static/img/succulents.png' in plant.image:
-        #     #the img is hosted in s3 so we need to delete the image.
-        #     s3 = boto3.resource('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-        #     bucket = s3.Bucket(BUCKET_NAME)
-        #     for key in bucket.objects.filter(Prefix=f'uploads/user/{g.user.id}/'):
-        #         if key.key in plant.image:
-        #             print(key.key)
-
-        db.session.delete(plant)
-        db.session.commit()
-        flash('Plant Deleted.', 'success')
-        return redirect(url_for('view_room', room_id=room.id))
-    else:
-        flash('Access Denied.', 'danger')
-        return redirect(url_for('view_collection', collection_id=collection.id))
+    plant, room, collection = load_plant(plant_id)
+
+    #This isn't working yet. I don't want to accidentally delete the main key/directory
+    # if not '/static/img/succulents.png' in plant.image:
+    #     #the img is hosted in s3 so we need to delete the image.
+    #     s3 = boto3.resource('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
+    #     bucket = s3.Bucket(BUCKET_NAME)
+    #     for key in bucket.objects.filter(Prefix=f'uploads/user/{g.user.id}/'):
+    #         if key.key in plant.image:
+    #             print(key.key)
+
+    db.session.delete(plant)
+    db.session.commit()
+    flash('Plant Deleted.', 'success')
+    return redirect(url_for('view_room', room_id=room.id))
 
 ####################
 # Schedule Routes
@@ -738,14 +705,14 @@ def create_waterschedule(plant, date=None):
     Accepts a plant ORM object, sets water_date to current datetime and water interval
     is set from plant type base interval."""
 
-    plant_type = PlantType.query.get_or_404(plant.type_id)
+    plant_type = load_plant_type(plant.type_id)
 
-    plant.water_schedule.append(WaterSchedule(
+    plant.water_schedule = WaterSchedule(
         water_date=date if date else datetime.today(),
         next_water_date=date + timedelta(days=plant_type.base_water) if date else datetime.today() + timedelta(days=plant_type.base_water),
         water_interval=plant_type.base_water,
         plant_id=plant.id
-    ))
+    )
     db.session.commit()
 
 @app.route('/water-manager')
@@ -756,81 +723,75 @@ def water_manager():
 
     form = AddWaterHistoryNotes(meta={'csrf': False})
 
-    plants = Plant.query.filter_by(user_id=g.user.id).all()
-    schedules = WaterSchedule.query.filter(WaterSchedule.next_water_date <= datetime.today()).all()
-    plant_ids = [schedule.plant_id for schedule in schedules]
-    plants_to_water = [plant for plant in plants if plant.id in plant_ids]
+    plants_to_water = WaterSchedule.get_due_schedules(g.user.id, datetime.today())
 
-    return render_template('water_manager.html', user=g.user, plants=plants_to_water, form=form, schedules=schedules)
+    return render_template('water_manager.html', user=g.user, plants=plants_to_water, form=form)
 
 @app.route('/water-manager/<int:plant_id>/water', methods=['POST'])
 @auth_required
 def water_plant(plant_id):
     """Waters a plant by plant id, updates the plant water schedule and updates the plant water history table."""
 
-    plant = Plant.query.get_or_404(plant_id)
-    water_schedule = WaterSchedule.query.filter_by(plant_id=plant.id).first()
+    plant, water_schedule, room, collection = load_plant_schedule(plant_id)
 
-    if g.user.id == plant.user_id:
-        if water_schedule.manual_mode == True:
+    #history records are added to the session instead of appended to water_schedule.water_history, so the plant's whole history isn't loaded
+    if water_schedule.manual_mode == True:
 
-            water_schedule.water_date = datetime.today()
+        water_schedule.water_date = datetime.today()
+        water_schedule.next_water_date = datetime.today() + timedelta(days=water_schedule.water_interval)
+
+        db.session.add(WaterHistory(
+            water_date=water_schedule.water_date,
+            notes=request.json['notes'],
+            plant_id=plant.id,
+            water_schedule_id=water_schedule.id
+        ))
+
+        db.session.commit()
+        return (jsonify({"status": "OK"}), 201)
+    else:
+        plant_light_source = LightSource.query.get_or_404(plant.light_id)
+        plant_type = load_plant_type(plant.type_id)
+
+        #if light source is artifical, just update the next water date and add the history record. 
+        # I could potentially force artificial light sources to have a manual schedule, this makes more sense than having seperate logic for both.
+        if plant_light_source.type == 'Artificial':
             water_schedule.next_water_date = datetime.today() + timedelta(days=water_schedule.water_interval)
 
-            water_schedule.water_history.append(WaterHistory(
-                water_date=water_schedule.water_date,
+            db.session.add(WaterHistory(
+                water_date=datetime.today(),
                 notes=request.json['notes'],
                 plant_id=plant.id,
-                water_schedule_id=water_schedule.id
-            ))
+                water_schedule_id=water_schedule.id))
 
             db.session.commit()
             return (jsonify({"status": "OK"}), 201)
-        else:
-            plant_light_source = LightSource.query.get_or_404(plant.light_id)
-            plant_type = PlantType.query.get_or_404(plant.type_id)
-
-            #if light source is artifical, just update the next water date and add the history record. 
-            # I could potentially force artificial light sources to have a manual schedule, this makes more sense than having seperate logic for both.
-            if plant_light_source.type == 'Artificial':
-                water_schedule.next_water_date = datetime.today() + timedelta(days=water_schedule.water_interval)
 
-                water_schedule.water_history.append(WaterHistory(
-                    water_date=datetime.today(),
-                    notes=request.json['notes'],
-                    plant_id=plant.id,
-                    water_schedule_id=water_schedule.id))
+        #if the light source is natural, we need to calculate the next_water_date using the solar calculator light forcast and water calculator water internal.
+        try:
+            water_calculator = WaterCalculator(
+                user=g.user,
+                plant_type=plant_type,
+                water_schedule=water_schedule,
+                light_type=plant_light_source.type)
 
-                db.session.commit()
-                return (jsonify({"status": "OK"}), 201)
+            new_water_interval = water_calculator.calculate_water_interval()
 
-            #if the light source is natural, we need to calculate the next_water_date using the solar calculator light forcast and water calculator water internal.
-            try:
-                water_calculator = WaterCalculator(
-                    user=g.user,
-                    plant_type=plant_type,
-                    water_schedule=water_schedule,
-                    light_type=plant_light_source.type)
-                    
-                new_water_interval = water_calculator.calculate_water_interval()
-
-                water_schedule.water_interval = new_water_interval
-                water_schedule.water_date = datetime.today()
-                water_schedule.next_water_date = datetime.today() + timedelta(days=new_water_interval)
-                
-                water_schedule.water_history.append(WaterHistory(
-                    water_date=water_schedule.water_date,
-                    notes=request.json['notes'],
-                    plant_id=plant.id,
-                    water_schedule_id=water_schedule.id))
+            water_schedule.water_interval = new_water_interval
+            water_schedule.water_date = datetime.today()
+            water_schedule.next_water_date = datetime.today() + timedelta(days=new_water_interval)
 
-                db.session.commit()
-                return (jsonify({"status": "OK"}), 201)
+            db.session.add(WaterHistory(
+                water_date=water_schedule.water_date,
+                notes=request.json['notes'],
+                plant_id=plant.id,
+                water_schedule_id=water_schedule.id))
 
-            except ConnectionRefusedError:
-                (jsonify({"connection": "REFUSED"}), 404)
+            db.session.commit()
+            return (jsonify({"status": "OK"}), 201)
 
-    return (jsonify({"access": "DENIED"}), 403)
+        except ConnectionRefusedError:
+            return (jsonify({"connection": "REFUSED"}), 404)
 
 @app.route('/water-manager/<int:plant_id>/snooze', methods=['POST'])
 @auth_required
@@ -838,26 +799,39 @@ def snooze_plant(plant_id,):
     """Snoozes a plant's water schedule for num of days, for a specific plant id.
     Updates the plant's water schedule and water history table indicating the plant was snoozed."""
 
-    plant = Plant.query.get_or_404(plant_id)
+    plant, water_schedule, room, collection = load_plant_schedule(plant_id)
 
-    if g.user.id == plant.user_id:
-        #update the water schedule and water history table
-        water_schedule = WaterSchedule.query.filter_by(plant_id=plant.id).first()
-        num_days = 3
-        water_schedule.next_water_date = datetime.today() + timedelta(days=num_days)
+    #update the water schedule and water history table
+    num_days = 3
+    water_schedule.next_water_date = datetime.today() + timedelta(days=num_days)
 
-        water_schedule.water_history.append(WaterHistory(
-            water_date=water_schedule.water_date,
-            snooze=num_days,
-            notes=request.json['notes'],
-            plant_id=plant.id,
-            water_schedule_id=water_schedule.id
-        ))
+    db.session.add(WaterHistory(
+        water_date=water_schedule.water_date,
+        snooze=num_days,
+        notes=request.json['notes'],
+        plant_id=plant.id,
+        water_schedule_id=water_schedule.id
+    ))
 
-        db.session.commit()
-        return (jsonify({"status": "OK"}), 201)
+    db.session.commit()
+    return (jsonify({"status": "OK"}), 201)
+
+@app.route('/water-manager/batch', methods=['POST'])
+@auth_required
+def water_plants():
+    """Waters or snoozes a list of plants in one request and one transaction.
+    Accepts JSON: {"plants": [{"id": 1, "action": "water" or "snooze", "notes": "..."}, {etc.}]} (at most WATER_MANAGER_MAX_BATCH plants).
+    Returns the status and next water date of each plant, plants that aren't found or can't get a light forecast are not changed."""
 
-    return (jsonify({"access": "DENIED"}), 403)
+    try:
+        batch = parse_batch(request.get_json(silent=True), app.config['WATER_MANAGER_MAX_BATCH'])
+    except BatchError as e:
+        return (jsonify({"status": "INVALID", "error": str(e)}), 400)
+
+    results = apply_batch(g.user, batch, datetime.today())
+    db.session.commit()
+
+    return (jsonify({"status": "OK", "plants": results}), 201)
 
 @app.route('/collection/room/plant/<int:plant_id>/water-schedule/edit', methods=['GET', 'POST'])
 @auth_required
@@ -867,38 +841,89 @@ def edit_waterschedule(plant_id):
     between manual mode or auto. If the schedule is set to manual 
     intervals it will not adjust for seasonal changes."""
 
-    plant = Plant.query.get_or_404(plant_id)
-    room = Room.query.get_or_404(plant.room_id)
-    collection = Collection.query.get_or_404(room.collection_id)
-    water_schedule = WaterSchedule.query.filter_by(plant_id=plant_id).first()
+    plant, water_schedule, room, collection = load_plant_schedule(plant_id)
 
     form = EditWaterScheduleForm(obj=water_schedule)
 
-    if g.user.id == collection.user_id:
-        if form.validate_on_submit():
-            water_schedule.manual_mode = form.manual_mode.data
-            water_schedule.water_interval = int(form.water_interval.data)
-            water_schedule.next_water_date = water_schedule.water_date + timedelta(days=water_schedule.water_interval)
-            db.session.commit()
-            flash('Water Schedule updated.', 'success')
-            return redirect(url_for('view_plant', plant_id=plant_id))
-    else:
-        flash('Access Denied.', 'danger')
+    if form.validate_on_submit():
+        water_schedule.manual_mode = form.manual_mode.data
+        water_schedule.water_interval = int(form.water_interval.data)
+        water_schedule.next_water_date = water_schedule.water_date + timedelta(days=water_schedule.water_interval)
+        db.session.commit()
+        flash('Water Schedule updated.', 'success')
         return redirect(url_for('view_plant', plant_id=plant_id))
     
     return render_template('/schedule/edit_waterschedule.html', form=form, water_schedule=water_schedule, plant=plant)
 
+def get_waterhistory_page(water_schedule):
+    """This is a helper method to get a page of a water schedule's history from the request args.
+    ?before= is the page key of the last history on the previous page and ?per_page= is the page size
+    (defaults to WATER_HISTORY_PAGE_SIZE and is capped at WATER_HISTORY_MAX_PAGE_SIZE).
+    Returns (water_history, next_key), aborts with a 400 if the page key isn't valid."""
+
+    per_page = request.args.get('per_page', app.config['WATER_HISTORY_PAGE_SIZE'], type=int)
+    per_page = min(max(per_page, 1), app.config['WATER_HISTORY_MAX_PAGE_SIZE'])
+
+    before = request.args.get('before')
+
+    if before:
+        try:
+            before = WaterHistory.parse_key(before)
+        except ValueError:
+            abort(400)
+
+    return WaterHistory.get_page(water_schedule.id, per_page, before)
+
 @app.route('/collection/room/plant/<int:plant_id>/water-history')
 @auth_required
 def view_waterhistory(plant_id):
-    """View the water history table for a plant via the plant's id."""
+    """View the water history table for a plant via the plant's id.
+    The history is shown newest first, one page at a time."""
 
-    plant = Plant.query.get_or_404(plant_id)
-    water_schedule = WaterSchedule.query.filter_by(plant_id=plant.id).first()
-    water_history = WaterHistory.query.filter_by(water_schedule_id=water_schedule.id)
+    plant, water_schedule, room, collection = load_plant_schedule(plant_id)
+    water_history, next_key = get_waterhistory_page(water_schedule)
 
-    if g.user.id == plant.user_id:
-        return render_template('/schedule/view_waterhistory.html', plant=plant, water_history=water_history)
-    
-    flash('Access Denied.', 'danger')
-    return redirect(url_for('view_plant', plant_id=plant_id)) 
\ No newline at end of file
+    return render_template('/schedule/view_waterhistory.html', plant=plant, water_history=water_history, next_key=next_key, per_page=request.args.get('per_page', type=int))
+
+@app.route('/collection/room/plant/<int:plant_id>/water-history/json')
+@auth_required
+def get_waterhistory(plant_id):
+    """Returns a page of a plant's water history as JSON, newest first.
+    Request the next page with ?before= set to the returned next key (null on the last page)."""
+
+    plant, water_schedule, room, collection = load_plant_schedule(plant_id)
+    water_history, next_key = get_waterhistory_page(water_schedule)
+
+    return jsonify({
+        "plant_id": plant.id,
+        "water_history": [history.to_dict() for history in water_history],
+        "next": next_key
+    })
+
+####################
+# CLI Commands
+####################
+
+@app.cli.command('recalculate-schedules')
+@click.option('--user-id', type=int, default=None, help='Only recalculate the water schedules of this user.')
+def recalculate_schedules(user_id):
+    """Recalculate the next water date of every auto mode water schedule from the light forecast."""
+
+    count = recalculate_water_schedules(user_id)
+    click.echo(f'Recalculated {count} water schedules.')
+
+@app.cli.command('process-uploads')
+def process_uploads():
+    """Upload the plant images left in the upload spool directory (for example after a restart)."""
+
+    failed = 0
+    jobs = upload_queue.get_spooled_jobs()
+
+    for job in jobs:
+        try:
+            upload_queue.process(job)
+        except (StorageError, OSError) as e:
+            failed += 1
+            click.echo(f'Upload {job} failed: {e}')
+
+    click.echo(f'Uploaded {len(jobs) - failed} of {len(jobs)} spooled plant images.')
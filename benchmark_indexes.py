@@ -0,0 +1,100 @@
+"""A script to benchmark the query plans of the hot queries with and without the foreign key indexes.
+
+Fills a Postgres benchmark database with 1,000 users, 20,000 plants & water schedules and 1,000,000 water history rows,
+then prints the EXPLAIN ANALYZE plan of each hot query without the indexes (sequential scans) and with them (index scans).
+
+Create an empty database first, the tables in it are dropped and recreated:
+createdb water_mate_benchmark
+python3 benchmark_indexes.py"""
+
+import os
+from sqlalchemy import create_engine, text
+from models import db
+
+DATABASE_URL = os.getenv('BENCHMARK_DATABASE_URL', 'postgresql:///water_mate_benchmark')
+USERS = 1000
+PLANTS_PER_USER = 20
+HISTORY_PER_PLANT = 50
+
+#the hot queries run by the views, the water manager and delete account
+QUERIES = {
+    'dashboard plants by room': 'SELECT * FROM plants WHERE room_id = 500',
+    'dashboard lightsources by room': 'SELECT * FROM light_sources WHERE room_id = 500',
+    'user plants': 'SELECT * FROM plants WHERE user_id = 500',
+    'water manager due plants': """SELECT plants.*, water_schedules.* FROM plants
+        JOIN water_schedules ON water_schedules.plant_id = plants.id
+        WHERE plants.user_id = 500 AND water_schedules.next_water_date <= now()
+        ORDER BY water_schedules.next_water_date, plants.id""",
+    'plant water schedule': 'SELECT * FROM water_schedules WHERE plant_id = 10000',
+    'plant water history first page': 'SELECT * FROM water_history WHERE water_schedule_id = 10000 ORDER BY water_date DESC, id DESC LIMIT 26',
+    'plant water history next page': """SELECT * FROM water_history WHERE water_schedule_id = 10000 AND (water_date, id) < (
+            SELECT water_date, id FROM water_history WHERE water_schedule_id = 10000 ORDER BY water_date DESC, id DESC OFFSET 24 LIMIT 1)
+        ORDER BY water_date DESC, id DESC LIMIT 26""",
+    'delete plant history': 'SELECT id FROM water_history WHERE plant_id = 10000',
+}
+
+def get_indexes():
+    """Returns the (non unique) indexes declared on the models."""
+
+    return [index for table in db.metadata.sorted_tables for index in table.indexes if not index.unique]
+
+def seed(conn):
+    """Fills the tables with generated rows (ids are generated so every user owns one collection, room and lightsource)."""
+
+    plants = USERS * PLANTS_PER_USER
+
+    conn.execute(text("INSERT INTO light_types (id, type) VALUES (1, 'South')"))
+    conn.execute(text("INSERT INTO plant_types (id, name, base_water, base_sunlight, max_days_without_water) VALUES (1, 'Pothos', 7, 6, 21)"))
+    conn.execute(text("""INSERT INTO users (id, name, email, username, password)
+        SELECT i, 'User ' || i, 'user' || i || '@example.com', 'user' || i, 'password' FROM generate_series(1, :users) i"""), {'users': USERS})
+    conn.execute(text("INSERT INTO collections (id, name, user_id) SELECT i, 'Home', i FROM generate_series(1, :users) i"), {'users': USERS})
+    conn.execute(text("INSERT INTO rooms (id, name, collection_id) SELECT i, 'Kitchen', i FROM generate_series(1, :users) i"), {'users': USERS})
+    conn.execute(text("""INSERT INTO light_sources (id, type, type_id, daily_total, room_id)
+        SELECT i, 'South', 1, 8, i FROM generate_series(1, :users) i"""), {'users': USERS})
+    conn.execute(text("""INSERT INTO plants (id, name, image, user_id, type_id, room_id, light_id)
+        SELECT i, 'Plant ' || i, '/static/img/succulents.png', u, 1, u, u
+        FROM generate_series(1, :plants) i, LATERAL (SELECT (i - 1) / :per_user + 1 AS u) owner"""),
+        {'plants': plants, 'per_user': PLANTS_PER_USER})
+    conn.execute(text("""INSERT INTO water_schedules (id, water_date, next_water_date, water_interval, manual_mode, plant_id)
+        SELECT i, now() - interval '3 days', now() + (i % 14 - 7) * interval '1 day', 7, false, i
+        FROM generate_series(1, :plants) i"""), {'plants': plants})
+    conn.execute(text("""INSERT INTO water_history (water_date, snooze, notes, plant_id, water_schedule_id)
+        SELECT now() - h * interval '7 days', NULL, 'No notes added.', p, p
+        FROM generate_series(1, :plants) p, generate_series(1, :per_plant) h"""),
+        {'plants': plants, 'per_plant': HISTORY_PER_PLANT})
+    conn.execute(text('ANALYZE'))
+
+def explain(conn, title):
+    """Prints the EXPLAIN ANALYZE plan of each hot query."""
+
+    print(f'\n==== {title} ====')
+
+    for name, query in QUERIES.items():
+        plan = conn.execute(text(f'EXPLAIN ANALYZE {query}')).scalars().all()
+        print(f'\n-- {name}')
+        print('\n'.join(plan))
+
+def run():
+    """Seeds the benchmark database then explains the hot queries without and with the indexes."""
+
+    engine = create_engine(DATABASE_URL)
+    indexes = get_indexes()
+
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        for index in indexes:
+            index.drop(conn)
+
+        seed(conn)
+        explain(conn, 'without indexes')
+
+        for index in indexes:
+            index.create(conn)
+
+        conn.execute(text('ANALYZE'))
+        explain(conn, 'with indexes')
+
+if __name__ == '__main__':
+    run()
@@ -3,7 +3,7 @@ from wtforms import StringField, PasswordField, TextAreaField, DecimalField, Sel
 from wtforms.fields.html5 import DateField
 from wtforms.ext.sqlalchemy.fields import QuerySelectMultipleField, QuerySelectField, widgets
 from wtforms.validators import InputRequired, Email, Length, EqualTo, DataRequired, Optional
-from models import LightType, PlantType
+from reference import get_light_types, get_plant_types
 from flask_wtf.file import FileField, FileAllowed
 
 ####################
@@ -44,8 +44,8 @@ class AddRoomForm(FlaskForm):
     name = StringField('Room Name', validators=[InputRequired('You must add a name for your room')])
 
 def light_types():
-    """Get currently available light types from the LightType ORM."""
-    return LightType.query.all()
+    """Get currently available light types from the reference cache (LightTypes are only queried once per process)."""
+    return get_light_types()
 
 class MultiCheckboxField(QuerySelectMultipleField):
     """
@@ -63,8 +63,8 @@ class AddLightSource(FlaskForm):
     light_type = MultiCheckboxField('Light Source', query_factory=light_types, get_label='type', blank_text='Select all of the light sources in your room.', validators=[DataRequired(message="You must select a light type.")])
 
 def plant_types():
-    """Get currently available plant types from the PlantType ORM."""
-    return PlantType.query.all()
+    """Get currently available plant types from the reference cache (PlantTypes are only queried once per process)."""
+    return get_plant_types()
 
 class AddPlantForm(FlaskForm):
     """Form to add a new plant."""
@@ -0,0 +1,63 @@
+"""HTTP Client & helper methods.
+
+A shared keep-alive HTTP session used by the solar calculator and the user location geocoder."""
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Strict (connect, read) timeouts in seconds so a slow API can't hang a gunicorn worker.
+TIMEOUT = (3.05, 10)
+# Retry failed connections and server errors with an exponential backoff of 0.3s, 0.6s.
+# A read timeout is only retried once: each one costs the full 10s read timeout, so a request that times out
+# is given up after about 20s (instead of ~40s) and a forecast fanned out over the pool doesn't hold a worker for long.
+MAX_RETRIES = 2
+MAX_READ_RETRIES = 1
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Number of hosts to keep connection pools for, and the max connections kept open to each host.
+# POOL_MAXSIZE matches the solar calculator MAX_FETCH_WORKERS so every concurrent request reuses a connection.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 30
+
+_session = None
+_session_pid = None
+
+def create_session():
+    """Creates and returns a requests Session with connection pooling and bounded retries."""
+
+    retry = Retry(
+        total=MAX_RETRIES,
+        read=MAX_READ_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False)
+
+    # pool_block makes extra requests wait for a free connection instead of opening more than POOL_MAXSIZE per host.
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=True, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+def get_session():
+    """Returns the shared session for this process, creating it on first use.
+    A forked worker process creates its own session instead of sharing the parent's open connections."""
+
+    global _session, _session_pid
+
+    if _session is None or _session_pid != os.getpid():
+        _session = create_session()
+        _session_pid = os.getpid()
+
+    return _session
+
+def get(url, params=None, timeout=TIMEOUT):
+    """Sends a GET request with the shared session and returns the response.
+    Raises a requests.exceptions.RequestException if the request fails or times out after all retries."""
+
+    return get_session().get(url, params=params, timeout=timeout)
@@ -0,0 +1,152 @@
+"""Authenticated User Identity & helper methods."""
+
+import time
+from threading import Lock
+from collections import OrderedDict
+from models import db, User
+
+# The identity of the logged in user is kept in the signed session cookie and in a small process-wide cache,
+# both are refreshed from the database after IDENTITY_TTL seconds so changes made on another device show up quickly.
+# Requests that change data (POST etc.) always refresh the identity, so a user deleted or changed in another
+# worker process is logged out (or updated) before the write instead of writing with a stale identity.
+IDENTITY_KEY = 'current_user_identity'
+IDENTITY_TTL = 60
+MAX_IDENTITIES = 1024
+
+class UserIdentity:
+    """A lightweight copy of the logged in user's id, name, username, and location (without the password hash).
+    Most routes only need the user's id, name, or coordinates, so the identity is used as g.user instead of loading the User row.
+    Routes that change the user load the full User with load()."""
+
+    def __init__(self, id, name, username, latitude, longitude, cached_at=None):
+        self.id = id
+        self.name = name
+        self.username = username
+        self.latitude = latitude
+        self.longitude = longitude
+        self.cached_at = cached_at or time.time()
+
+    def __repr__(self):
+        return f'<UserIdentity #{self.id}: {self.name}>'
+
+    @classmethod
+    def from_user(cls, user):
+        """Create an identity from a User (or a row with the same columns)."""
+
+        return cls(
+            id=user.id,
+            name=user.name,
+            username=user.username,
+            # coordinates are stored as strings because Decimals can't be serialized in the session
+            latitude=None if user.latitude is None else str(user.latitude),
+            longitude=None if user.longitude is None else str(user.longitude))
+
+    @property
+    def get_coordinates(self):
+        """Get and return this user's coordinates (the same as User.get_coordinates)."""
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude
+        }
+
+    @property
+    def is_fresh(self):
+        """Returns True if the identity was cached less than IDENTITY_TTL seconds ago."""
+        return time.time() - self.cached_at < IDENTITY_TTL
+
+    def to_dict(self):
+        """Returns the identity as a dict that can be stored in the session."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "username": self.username,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "cached_at": self.cached_at
+        }
+
+    def load(self):
+        """Load and return the full User for this identity, for routes that change the user."""
+        return User.query.get_or_404(self.id)
+
+_identities = OrderedDict()
+_identities_lock = Lock()
+
+def cache_identity(identity):
+    """Stores an identity in the process-wide cache, evicting the least recently used identities when it is full."""
+
+    with _identities_lock:
+        _identities[identity.id] = identity
+        _identities.move_to_end(identity.id)
+        while len(_identities) > MAX_IDENTITIES:
+            _identities.popitem(last=False)
+
+def get_user_identity(user_id, refresh=False):
+    """Returns the identity for a user id from the process-wide cache, or from the database on a miss (or if it expired).
+    Set refresh to always load it from the database. Only the identity columns are loaded.
+    Returns None if the user doesn't exist (and removes any cached identity for it)."""
+
+    if not refresh:
+        with _identities_lock:
+            identity = _identities.get(user_id)
+            if identity and identity.is_fresh:
+                _identities.move_to_end(user_id)
+                return identity
+
+    user = (db.session.query(User.id, User.name, User.username, User.latitude, User.longitude)
+        .filter_by(id=user_id)
+        .first())
+
+    if user is None:
+        with _identities_lock:
+            _identities.pop(user_id, None)
+        return None
+
+    identity = UserIdentity.from_user(user)
+    cache_identity(identity)
+    return identity
+
+def get_current_identity(session, user_id, refresh=False):
+    """Returns the identity of the logged in user id from the signed session, the process-wide cache, or the database (in that order).
+    Set refresh to always load it from the database (before a request changes data).
+    Returns None and removes the identity from the session if the user doesn't exist (the user was deleted), so the user can be logged out."""
+
+    data = session.get(IDENTITY_KEY)
+
+    if not refresh and data and data['id'] == user_id and 'username' in data:
+        identity = UserIdentity(**data)
+        if identity.is_fresh:
+            return identity
+
+    identity = get_user_identity(user_id, refresh=refresh)
+
+    if identity is None:
+        session.pop(IDENTITY_KEY, None)
+        return None
+
+    session[IDENTITY_KEY] = identity.to_dict()
+    return identity
+
+def remember_user(session, user):
+    """Stores the identity of a user in the session and the process-wide cache after the user logs in or is changed.
+    Returns the new identity."""
+
+    identity = UserIdentity.from_user(user)
+    cache_identity(identity)
+    session[IDENTITY_KEY] = identity.to_dict()
+
+    return identity
+
+def forget_user(session, user_id):
+    """Removes the identity of a user from the session and the process-wide cache after the user logs out or is deleted."""
+
+    session.pop(IDENTITY_KEY, None)
+
+    with _identities_lock:
+        _identities.pop(user_id, None)
+
+def clear_identities():
+    """Clears all of the cached identities."""
+
+    with _identities_lock:
+        _identities.clear()
@@ -0,0 +1,95 @@
+"""Plant Image Processing & helper methods.
+
+Plant images are uploaded at full camera resolution but shown as small cards, so each uploaded image is resized
+into WebP and JPEG renditions at a few widths before it's saved to the upload storage. The renditions are saved
+without the EXIF data (camera details and GPS location) and are keyed by a hash of their content."""
+
+import hashlib
+from io import BytesIO
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Widths (in pixels) of the renditions, an image is never enlarged so smaller images get fewer renditions.
+RENDITION_WIDTHS = (320, 640, 1280)
+# (Pillow format, file extension, content type) of each rendition, browsers without WebP support use the JPEG.
+RENDITION_FORMATS = (('WEBP', 'webp', 'image/webp'), ('JPEG', 'jpg', 'image/jpeg'))
+QUALITY = 80
+# Number of characters of the content hash used in the keys.
+HASH_LENGTH = 16
+
+class ImageError(Exception):
+    """Raised when an upload isn't an image that can be resized."""
+
+class Rendition:
+    """A resized copy of an image that is ready to be saved to a storage key."""
+
+    def __init__(self, key, body, content_type, width):
+        self.key = key
+        self.body = body
+        self.content_type = content_type
+        self.width = width
+
+    def __repr__(self):
+        return f'<Rendition {self.key}>'
+
+    def to_dict(self, url):
+        """Returns the rendition as a dict that can be stored with the plant (Plant.image_renditions)."""
+        return {
+            "url": url,
+            "width": self.width,
+            "type": self.content_type
+        }
+
+def open_image(file):
+    """Opens an image file, rotates it upright by its EXIF orientation and returns it as an RGB image.
+    Raises an ImageError if the file isn't an image."""
+
+    try:
+        img = Image.open(file)
+        img.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageError(e)
+
+    #phone cameras store the rotation in the EXIF data, it's applied here because the EXIF data isn't kept
+    img = ImageOps.exif_transpose(img)
+
+    if img.mode in ('RGBA', 'LA', 'P'):
+        #JPEG has no transparency so transparent pixels are made white
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img.convert('RGBA'), mask=img.convert('RGBA').getchannel('A'))
+        return background
+
+    return img.convert('RGB')
+
+def get_widths(width):
+    """Returns the rendition widths for an image width, the largest rendition is never wider than the image."""
+
+    widths = {w for w in RENDITION_WIDTHS if w < width}
+    widths.add(min(width, RENDITION_WIDTHS[-1]))
+
+    return sorted(widths)
+
+def make_renditions(file, prefix):
+    """Resizes an image file into renditions at each width and format, keyed under a prefix (folder) by their content hash.
+    Returns a list of Renditions, raises an ImageError if the file isn't an image."""
+
+    img = open_image(file)
+    renditions = []
+
+    for width in get_widths(img.width):
+        height = max(1, round(img.height * width / img.width))
+        resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+
+        for format, extension, content_type in RENDITION_FORMATS:
+            buffer = BytesIO()
+            #no exif or icc_profile is passed to save, so the rendition has no metadata
+            resized.save(buffer, format, quality=QUALITY, optimize=True)
+            body = buffer.getvalue()
+
+            digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+            renditions.append(Rendition(
+                key=f'{prefix}{digest}-{width}w.{extension}',
+                body=body,
+                content_type=content_type,
+                width=width))
+
+    return renditions
@@ -0,0 +1,112 @@
+"""Light Forecast & helper methods."""
+
+import os
+import numpy as np
+from threading import Lock
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from requests.exceptions import RequestException
+from solar_calculator import SolarCalculator
+from solar_cache import SolarDayCache
+
+load_dotenv()  # take environment variables from .env
+
+# Set SOLAR_SOURCE=api to fetch the light forcast from the sunrise-sunset API instead of calculating it offline.
+SOLAR_OFFLINE = os.getenv('SOLAR_SOURCE', 'offline') != 'api'
+# Forecasts are kept in memory for a short time so a watering session (or a batch job) reuses them.
+MAX_FORECASTS = 256
+FORECAST_TTL = timedelta(minutes=10)
+# Errors of a forecast that can't be fetched from the API: the request failed, or the API answered with an error
+# page (like a 5xx, which isn't retried) that can't be parsed.
+FORECAST_ERRORS = (RequestException, KeyError, ValueError)
+
+class LightForecast:
+    """A light forecast holds the maximum daily sunlight of every light type for a location,
+    starting the day after the start date and covering the horizon (number of days).
+
+    All of a user's plants share one location, so one forecast is calculated and every plant and light type reads from it.
+    The daily sunlight of each light type is a numpy array of seconds."""
+
+    def __init__(self, user_location, start_date, horizon):
+        self.user_location = user_location
+        self.start_date = start_date
+        self.horizon = horizon
+        self.created_at = datetime.utcnow()
+
+        calculator = SolarCalculator(
+            user_location=user_location,
+            current_date=start_date,
+            water_interval=horizon,
+            light_type=None,
+            offline=SOLAR_OFFLINE,
+            cache=None if SOLAR_OFFLINE else SolarDayCache(),
+            concurrent=True)
+
+        if SOLAR_OFFLINE:
+            #the whole horizon is calculated in one numpy pass instead of one day at a time
+            self.daily_sunlight = calculator.get_daily_sunlight_arrays()
+        else:
+            self.daily_sunlight = {light_type: np.array(seconds, dtype=float)
+                for light_type, seconds in calculator.get_daily_sunlight_by_type().items()}
+
+    def get_daily_sunlight(self, light_type, days):
+        """Returns a numpy array of the maximum sunlight (in seconds) for a light type for the first number of days of the forecast."""
+
+        return self.daily_sunlight[light_type][:days]
+
+    def get_average_hours(self, light_types, days):
+        """Returns a numpy array of the average daily sunlight hours for arrays of light types and numbers of days
+        (like a group of water schedules). Each average is read from the cumulative sunlight of its light type,
+        so a whole group is calculated in one pass per light type."""
+
+        light_types = np.asarray(light_types)
+        days = np.asarray(days)
+        average_hours = np.empty(len(days))
+
+        for light_type in np.unique(light_types):
+            cumulative_sunlight = np.cumsum(self.daily_sunlight[light_type])
+            mask = light_types == light_type
+            type_days = np.clip(days[mask], 1, len(cumulative_sunlight))
+            average_hours[mask] = cumulative_sunlight[type_days - 1] / type_days / 3600
+
+        return average_hours
+
+_forecasts = OrderedDict()
+_forecasts_lock = Lock()
+
+def get_forecast_key(user_location, start_date):
+    """Returns the memo key (latitude, longitude, date) for a location and start date."""
+
+    start_date = start_date.date() if isinstance(start_date, datetime) else start_date
+    return (str(user_location['latitude']), str(user_location['longitude']), start_date)
+
+def get_light_forecast(user_location, start_date, horizon):
+    """Returns the light forecast for a location and start date that covers at least the horizon (number of days).
+
+    Forecasts are memoized per location and start date in a small process-wide LRU cache. A cached forecast with a longer
+    horizon is reused for shorter horizons, and expired forecasts (older than FORECAST_TTL) are recalculated."""
+
+    key = get_forecast_key(user_location, start_date)
+
+    with _forecasts_lock:
+        forecast = _forecasts.get(key)
+        if forecast and forecast.horizon >= horizon and forecast.created_at > datetime.utcnow() - FORECAST_TTL:
+            _forecasts.move_to_end(key)
+            return forecast
+
+    forecast = LightForecast(user_location, start_date, horizon)
+
+    with _forecasts_lock:
+        _forecasts[key] = forecast
+        _forecasts.move_to_end(key)
+        while len(_forecasts) > MAX_FORECASTS:
+            _forecasts.popitem(last=False)
+
+    return forecast
+
+def clear_light_forecasts():
+    """Clears all of the memoized light forecasts."""
+
+    with _forecasts_lock:
+        _forecasts.clear()
@@ -0,0 +1,72 @@
+"""Ownership checked loaders & helper methods.
+
+Each loader fetches a row together with its parent rows (up to the owning collection) in one joined query,
+then aborts with a 404 if the row doesn't exist or a 403 if the collection isn't owned by the current user."""
+
+from flask import g, abort
+from sqlalchemy.orm import contains_eager
+from models import db, Collection, Room, LightSource, Plant, WaterSchedule
+
+def check_owner(collection):
+    """Aborts with a 403 if the collection isn't owned by the current user."""
+
+    if g.user is None or collection.user_id != g.user.id:
+        abort(403)
+
+def load_collection(collection_id, *options):
+    """Returns the collection by id if the current user owns it.
+    Loader options (like joinedload(Collection.rooms)) can be passed to eager load the collection's relationships."""
+
+    collection = Collection.query.options(*options).filter_by(id=collection_id).first_or_404()
+    check_owner(collection)
+
+    return collection
+
+def load_room(room_id):
+    """Returns (room, collection) for a room id if the current user owns the room's collection."""
+
+    room, collection = (db.session.query(Room, Collection)
+        .join(Collection, Room.collection_id == Collection.id)
+        .filter(Room.id == room_id)
+        .first_or_404())
+    check_owner(collection)
+
+    return room, collection
+
+def load_lightsource(lightsource_id):
+    """Returns (lightsource, room, collection) for a lightsource id if the current user owns the lightsource's collection."""
+
+    lightsource, room, collection = (db.session.query(LightSource, Room, Collection)
+        .join(Room, LightSource.room_id == Room.id)
+        .join(Collection, Room.collection_id == Collection.id)
+        .filter(LightSource.id == lightsource_id)
+        .first_or_404())
+    check_owner(collection)
+
+    return lightsource, room, collection
+
+def load_plant(plant_id):
+    """Returns (plant, room, collection) for a plant id if the current user owns the plant's collection.
+    The plant's water schedule is loaded in the same query, so plant.water_schedule doesn't need another round-trip."""
+
+    plant, room, collection = (db.session.query(Plant, Room, Collection)
+        .outerjoin(Plant.water_schedule)
+        .options(contains_eager(Plant.water_schedule))
+        .join(Room, Plant.room_id == Room.id)
+        .join(Collection, Room.collection_id == Collection.id)
+        .filter(Plant.id == plant_id)
+        .first_or_404())
+    check_owner(collection)
+
+    return plant, room, collection
+
+def load_plant_schedule(plant_id):
+    """Returns (plant, water_schedule, room, collection) for a plant id if the current user owns the plant's collection.
+    A 404 is raised if the plant doesn't have a water schedule."""
+
+    plant, room, collection = load_plant(plant_id)
+
+    if plant.water_schedule is None:
+        abort(404)
+
+    return plant, plant.water_schedule, room, collection
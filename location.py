@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
-import requests, json
+import json
+import http_client
+from requests.exceptions import RequestException
 
 load_dotenv()  # take environment variables from .env
 
@@ -33,7 +35,7 @@ class UserLocation:
         Our target accuracy level is A5 (City level): https://developer.mapquest.com/documentation/geocoding-api/quality-codes/
 
         In order for the geocode pinpoint to meet criteria, the geocodeQualityCode must contain "A5",
-        otherwise we will return an error message to the user to try again.
+        otherwise we will return an error message to the user to try again. If the API times out we also return None.
 
         Example API response:
 
@@ -98,8 +100,12 @@ class UserLocation:
         if (self.city and not self.state and not self.country):
             return
         
-        response = requests.get(BASE_URL, params={'location': self._get_location()})
-        first_result = response.json()['results'][0]['locations'][0]
+        try:
+            response = http_client.get(BASE_URL, params={'location': self._get_location()})
+            first_result = response.json()['results'][0]['locations'][0]
+        except RequestException:
+            #the geocoding API could not be reached, the user will be asked to try again.
+            return
 
         if CITY_LEVEL in (first_result['geocodeQualityCode']):
             return first_result['latLng']
\ No newline at end of file
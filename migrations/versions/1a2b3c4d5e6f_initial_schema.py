@@ -0,0 +1,123 @@
+"""initial schema
+
+The tables as they were created by seed.py (db.create_all) before migrations were added.
+Existing databases can skip this revision with: flask db stamp 1a2b3c4d5e6f
+
+Revision ID: 1a2b3c4d5e6f
+Revises: 
+Create Date: 2021-06-01 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a2b3c4d5e6f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('light_types',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('type')
+    )
+    op.create_table('plant_types',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('base_water', sa.Integer(), nullable=False),
+    sa.Column('base_sunlight', sa.Integer(), nullable=False),
+    sa.Column('max_days_without_water', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('email', sa.Text(), nullable=False),
+    sa.Column('latitude', sa.Numeric(precision=8, scale=6), nullable=True),
+    sa.Column('longitude', sa.Numeric(precision=9, scale=6), nullable=True),
+    sa.Column('username', sa.Text(), nullable=False),
+    sa.Column('password', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('collections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'name')
+    )
+    op.create_table('rooms',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('collection_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['collection_id'], ['collections.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('collection_id', 'name')
+    )
+    op.create_table('light_sources',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Text(), nullable=False),
+    sa.Column('type_id', sa.Integer(), nullable=False),
+    sa.Column('daily_total', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['type'], ['light_types.type'], ),
+    sa.ForeignKeyConstraint(['type_id'], ['light_types.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('type_id', 'room_id')
+    )
+    op.create_table('plants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('image', sa.Text(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type_id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('light_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['light_id'], ['light_sources.id'], ),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.ForeignKeyConstraint(['type_id'], ['plant_types.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('water_schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('water_date', sa.DateTime(), nullable=False),
+    sa.Column('next_water_date', sa.DateTime(), nullable=False),
+    sa.Column('water_interval', sa.Integer(), nullable=False),
+    sa.Column('manual_mode', sa.Boolean(), nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('water_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('water_date', sa.DateTime(), nullable=False),
+    sa.Column('snooze', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.String(length=200), nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.Column('water_schedule_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ),
+    sa.ForeignKeyConstraint(['water_schedule_id'], ['water_schedules.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('water_history')
+    op.drop_table('water_schedules')
+    op.drop_table('plants')
+    op.drop_table('light_sources')
+    op.drop_table('rooms')
+    op.drop_table('collections')
+    op.drop_table('users')
+    op.drop_table('plant_types')
+    op.drop_table('light_types')
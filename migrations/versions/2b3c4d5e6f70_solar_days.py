@@ -0,0 +1,42 @@
+"""solar days
+
+Adds the solar_days cache of sunrise/sunset times (seconds from UTC midnight).
+Databases created with db.create_all after these changes can skip to this revision with: flask db stamp 2b3c4d5e6f70
+
+Revision ID: 2b3c4d5e6f70
+Revises: 1a2b3c4d5e6f
+Create Date: 2021-06-01 12:01:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b3c4d5e6f70'
+down_revision = '1a2b3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('solar_days',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('latitude', sa.Numeric(precision=4, scale=1), nullable=False),
+    sa.Column('longitude', sa.Numeric(precision=4, scale=1), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('sunrise', sa.Integer(), nullable=False),
+    sa.Column('sunset', sa.Integer(), nullable=False),
+    sa.Column('solar_noon', sa.Integer(), nullable=False),
+    sa.Column('day_length', sa.Integer(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.Column('accessed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('latitude', 'longitude', 'date')
+    )
+    op.create_index(op.f('ix_solar_days_accessed_at'), 'solar_days', ['accessed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_solar_days_accessed_at'), table_name='solar_days')
+    op.drop_table('solar_days')
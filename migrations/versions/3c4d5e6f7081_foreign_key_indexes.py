@@ -0,0 +1,43 @@
+"""foreign key indexes
+
+Indexes every foreign key and hot filter column so the dashboard, plant views, water manager
+and water history use index scans instead of sequential scans as the tables grow.
+Collection.user_id and Room.collection_id are already covered by their unique constraints,
+and WaterSchedule.plant_id is covered by its unique constraint (4d5e6f708192).
+
+Revision ID: 3c4d5e6f7081
+Revises: 2b3c4d5e6f70
+Create Date: 2021-06-01 12:02:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c4d5e6f7081'
+down_revision = '2b3c4d5e6f70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_light_sources_room_id'), 'light_sources', ['room_id'], unique=False)
+    op.create_index(op.f('ix_plants_light_id'), 'plants', ['light_id'], unique=False)
+    op.create_index(op.f('ix_plants_room_id'), 'plants', ['room_id'], unique=False)
+    op.create_index(op.f('ix_plants_type_id'), 'plants', ['type_id'], unique=False)
+    op.create_index(op.f('ix_plants_user_id'), 'plants', ['user_id'], unique=False)
+    op.create_index(op.f('ix_water_schedules_next_water_date'), 'water_schedules', ['next_water_date'], unique=False)
+    op.create_index(op.f('ix_water_history_plant_id'), 'water_history', ['plant_id'], unique=False)
+    op.create_index(op.f('ix_water_history_water_schedule_id'), 'water_history', ['water_schedule_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_water_history_water_schedule_id'), table_name='water_history')
+    op.drop_index(op.f('ix_water_history_plant_id'), table_name='water_history')
+    op.drop_index(op.f('ix_water_schedules_next_water_date'), table_name='water_schedules')
+    op.drop_index(op.f('ix_plants_user_id'), table_name='plants')
+    op.drop_index(op.f('ix_plants_type_id'), table_name='plants')
+    op.drop_index(op.f('ix_plants_room_id'), table_name='plants')
+    op.drop_index(op.f('ix_plants_light_id'), table_name='plants')
+    op.drop_index(op.f('ix_light_sources_room_id'), table_name='light_sources')
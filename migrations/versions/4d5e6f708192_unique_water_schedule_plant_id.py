@@ -0,0 +1,34 @@
+"""unique water schedule plant id
+
+Each plant has exactly one water schedule. Any extra schedules for a plant are removed
+(their history is moved to the plant's first schedule) before the unique constraint is added.
+
+Revision ID: 4d5e6f708192
+Revises: 3c4d5e6f7081
+Create Date: 2021-06-01 12:03:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d5e6f708192'
+down_revision = '3c4d5e6f7081'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""UPDATE water_history SET water_schedule_id = (
+            SELECT min(water_schedules.id) FROM water_schedules WHERE water_schedules.plant_id = water_history.plant_id)
+        WHERE water_schedule_id NOT IN (SELECT min(id) FROM water_schedules GROUP BY plant_id)""")
+    op.execute('DELETE FROM water_schedules WHERE id NOT IN (SELECT min(id) FROM water_schedules GROUP BY plant_id)')
+
+    with op.batch_alter_table('water_schedules') as batch_op:
+        batch_op.create_unique_constraint('water_schedules_plant_id_key', ['plant_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('water_schedules') as batch_op:
+        batch_op.drop_constraint('water_schedules_plant_id_key', type_='unique')
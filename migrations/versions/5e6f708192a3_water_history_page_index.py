@@ -0,0 +1,29 @@
+"""water history page index
+
+Replaces the water_schedule_id index on water_history with a (water_schedule_id, water_date, id) index
+so the water history view can read each page from the index.
+
+Revision ID: 5e6f708192a3
+Revises: 4d5e6f708192
+Create Date: 2021-06-01 12:04:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e6f708192a3'
+down_revision = '4d5e6f708192'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_water_history_water_schedule_id_water_date_id', 'water_history', ['water_schedule_id', 'water_date', 'id'], unique=False)
+    op.drop_index('ix_water_history_water_schedule_id', table_name='water_history')
+
+
+def downgrade():
+    op.create_index('ix_water_history_water_schedule_id', 'water_history', ['water_schedule_id'], unique=False)
+    op.drop_index('ix_water_history_water_schedule_id_water_date_id', table_name='water_history')
@@ -0,0 +1,26 @@
+"""plant image renditions
+
+Adds plants.image_renditions, the resized copies of an uploaded plant image.
+
+Revision ID: 6f708192a3b4
+Revises: 5e6f708192a3
+Create Date: 2021-06-03 10:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f708192a3b4'
+down_revision = '5e6f708192a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('plants', sa.Column('image_renditions', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('plants', 'image_renditions')
@@ -3,7 +3,7 @@
 from datetime import datetime
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, tuple_
 
 bcrypt = Bcrypt()
 db = SQLAlchemy()
@@ -113,6 +113,30 @@ class User(db.Model):
                 return user
         return False
     
+    @classmethod
+    def delete_account(cls, user_id):
+        """Delete a user and all of the user's data with one bulk delete per table, in foreign key order
+        (water history, water schedules, plants, light sources, rooms, collections, then the user).
+        The deletes are not committed, so the caller commits (or rolls back) the whole account in one transaction.
+        Returns the number of deleted plants."""
+
+        plant_ids = db.session.query(Plant.id).filter(Plant.user_id == user_id)
+        collection_ids = db.session.query(Collection.id).filter(Collection.user_id == user_id)
+        room_ids = db.session.query(Room.id).filter(Room.collection_id.in_(collection_ids))
+
+        WaterHistory.query.filter(WaterHistory.plant_id.in_(plant_ids)).delete(synchronize_session=False)
+        WaterSchedule.query.filter(WaterSchedule.plant_id.in_(plant_ids)).delete(synchronize_session=False)
+        deleted_plants = Plant.query.filter(Plant.user_id == user_id).delete(synchronize_session=False)
+        LightSource.query.filter(LightSource.room_id.in_(room_ids)).delete(synchronize_session=False)
+        Room.query.filter(Room.collection_id.in_(collection_ids)).delete(synchronize_session=False)
+        Collection.query.filter(Collection.user_id == user_id).delete(synchronize_session=False)
+        User.query.filter(User.id == user_id).delete(synchronize_session=False)
+
+        #the deleted rows may still be in the session, so expire them instead of flushing stale changes later
+        db.session.expire_all()
+
+        return deleted_plants
+
     @classmethod
     def changePassword(cls, user, curr_password, new_password):
         """ Validates that the current password is correct, and updates to new password if correct.
@@ -149,7 +173,41 @@ class LightSource(db.Model):
     type = db.Column(db.Text, db.ForeignKey('light_types.type'), nullable=False)
     type_id = db.Column(db.Integer, db.ForeignKey('light_types.id'), nullable=False)
     daily_total = db.Column(db.Integer, nullable=False, default=8) #default is 8 for cases where artificial light source is used
-    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id', ondelete='cascade'))
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id', ondelete='cascade'), index=True)
+
+####################
+# Solar Models
+####################
+
+class SolarDay(db.Model):
+    """A Solar Day caches the sunrise-sunset API data for a location and date.
+    Coordinates are rounded to 0.1 degrees (about 11 km) so users in the same city share rows.
+    The fetched_at and accessed_at dates are used to expire rows and evict the least recently used rows."""
+
+    __tablename__ = 'solar_days'
+    __table_args__ = (db.UniqueConstraint('latitude', 'longitude', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    latitude = db.Column(db.Numeric(4,1), nullable=False)
+    longitude = db.Column(db.Numeric(4,1), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    # times are stored in seconds from midnight UTC of the date, and the day length in seconds
+    sunrise = db.Column(db.Integer, nullable=False)
+    sunset = db.Column(db.Integer, nullable=False)
+    solar_noon = db.Column(db.Integer, nullable=False)
+    day_length = db.Column(db.Integer, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    accessed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    @property
+    def results(self):
+        """Returns the cached data in the same shape as the parsed API results."""
+        return {
+            "sunrise": self.sunrise,
+            "sunset": self.sunset,
+            "solar_noon": self.solar_noon,
+            "day_length": self.day_length
+        }
 
 ####################
 # Plant Models
@@ -177,14 +235,26 @@ class Plant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Text, nullable=False)
     image = db.Column(db.Text, nullable=False, default='/static/img/succulents.png')
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    type_id = db.Column(db.Integer, db.ForeignKey('plant_types.id'), nullable=False)
-    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=False)
-    light_id = db.Column(db.Integer, db.ForeignKey('light_sources.id'), nullable=False)
-
-    water_schedule = db.relationship('WaterSchedule', backref='plant', cascade='all, delete-orphan')
+    #the resized copies of an uploaded image ({"url", "width", "type"} dicts), image is the largest JPEG
+    image_renditions = db.Column(db.JSON)
+    #every foreign key is indexed, the views and the water manager filter plants by user, room, type and lightsource
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    type_id = db.Column(db.Integer, db.ForeignKey('plant_types.id'), nullable=False, index=True)
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=False, index=True)
+    light_id = db.Column(db.Integer, db.ForeignKey('light_sources.id'), nullable=False, index=True)
+
+    #each plant has exactly one water schedule
+    water_schedule = db.relationship('WaterSchedule', backref='plant', uselist=False, cascade='all, delete-orphan')
     light = db.relationship('LightSource', backref='plant')
 
+    def get_srcset(self, content_type='image/jpeg'):
+        """Returns the srcset of this plant's image renditions of a content type, or None if the image wasn't resized."""
+
+        if not self.image_renditions:
+            return None
+
+        return ', '.join(f'{r["url"]} {r["width"]}w' for r in self.image_renditions if r['type'] == content_type) or None
+
 ####################
 # Schedule Models
 ####################
@@ -196,13 +266,24 @@ class WaterSchedule(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     water_date = db.Column(db.DateTime, nullable=False)
-    next_water_date = db.Column(db.DateTime, nullable=False)
+    next_water_date = db.Column(db.DateTime, nullable=False, index=True)
     water_interval = db.Column(db.Integer, nullable=False)
     manual_mode = db.Column(db.Boolean, nullable=False, default=False)
-    plant_id = db.Column(db.Integer, db.ForeignKey('plants.id', ondelete='cascade'), nullable=False)
+    plant_id = db.Column(db.Integer, db.ForeignKey('plants.id', ondelete='cascade'), nullable=False, unique=True)
 
     water_history = db.relationship('WaterHistory', backref='water_schedule', cascade='all, delete-orphan')
 
+    @classmethod
+    def get_due_schedules(cls, user_id, date):
+        """Get a user's plants that are ready to water on the date (next_water_date is on or before the date).
+        Returns a list of (plant, water_schedule) tuples, the most overdue first."""
+
+        return (db.session.query(Plant, WaterSchedule)
+            .join(WaterSchedule, WaterSchedule.plant_id == Plant.id)
+            .filter(Plant.user_id == user_id, WaterSchedule.next_water_date <= date)
+            .order_by(WaterSchedule.next_water_date, Plant.id)
+            .all())
+
     @property
     def get_water_date(self):
         """Gets the current water_date and returns a string representation."""
@@ -217,15 +298,60 @@ class WaterHistory(db.Model):
     """A Water History has a water date, snooze amount, notes, and a plant and water schedule id."""
 
     __tablename__ = 'water_history'
+    # the water history view pages through a schedule's history newest first, this index is the page key
+    __table_args__ = (db.Index('ix_water_history_water_schedule_id_water_date_id', 'water_schedule_id', 'water_date', 'id'),)
 
     id = db.Column(db.Integer, primary_key=True)
     water_date = db.Column(db.DateTime, nullable=False)
     snooze = db.Column(db.Integer)
     notes = db.Column(db.String(200), nullable=False, default='No notes added.')
-    plant_id = db.Column(db.Integer, db.ForeignKey('plants.id'), nullable=False)
+    plant_id = db.Column(db.Integer, db.ForeignKey('plants.id'), nullable=False, index=True)
     water_schedule_id = db.Column(db.Integer, db.ForeignKey('water_schedules.id', ondelete='cascade'), nullable=False)
 
+    @classmethod
+    def get_page(cls, water_schedule_id, page_size, before=None):
+        """Get a page of a water schedule's history, newest first.
+        before is the (water_date, id) key of the last row on the previous page, the page starts after it.
+        Pages are read from the (water_schedule_id, water_date, id) index, so every page takes the same time no matter how long the history is.
+        Returns (history, next_key) where next_key is the key for the next page, or None if this is the last page."""
+
+        query = cls.query.filter(cls.water_schedule_id == water_schedule_id)
+
+        if before:
+            query = query.filter(tuple_(cls.water_date, cls.id) < tuple_(*before))
+
+        #get one extra row to find out if there is a next page
+        history = query.order_by(cls.water_date.desc(), cls.id.desc()).limit(page_size + 1).all()
+
+        if len(history) > page_size:
+            history = history[:page_size]
+            return history, history[-1].get_key
+
+        return history, None
+
+    @staticmethod
+    def parse_key(key):
+        """Parses a page key string (from get_key) and returns a (water_date, id) tuple.
+        Raises a ValueError if the key isn't valid."""
+
+        water_date, id = key.rsplit('_', 1)
+        return (datetime.fromisoformat(water_date), int(id))
+
+    @property
+    def get_key(self):
+        """Gets the page key of this history as a string, e.g. 2021-05-10T08:30:00_12"""
+        return f'{self.water_date.isoformat()}_{self.id}'
+
     @property
     def get_water_date(self):
         """Gets the current water_date and returns a string representation."""
-        return self.water_date.strftime("%m/%d/%Y, %H:%M:%S")
\ No newline at end of file
+        return self.water_date.strftime("%m/%d/%Y, %H:%M:%S")
+
+    def to_dict(self):
+        """Returns the history as a dict for JSON responses."""
+        return {
+            "id": self.id,
+            "water_date": self.water_date.isoformat(),
+            "snooze": self.snooze,
+            "notes": self.notes
+        }
\ No newline at end of file
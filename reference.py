@@ -0,0 +1,83 @@
+"""Reference Data Cache & helper methods.
+
+PlantTypes and LightTypes are shared seed data (seed.py) that users can't change, so they are loaded from the database
+once per process and served from memory to the forms and views. The cached rows are detached so they can be shared by
+every request (and thread) and are never expired by a commit. Call clear_reference after changing the seed data to
+load it again."""
+
+from threading import Lock
+from flask import abort
+from sqlalchemy.orm import Session
+from models import db, LightType, PlantType
+
+_reference = {}
+_reference_lock = Lock()
+
+class ReferenceData:
+    """The rows of a reference table in id order, and by id."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_id = {row.id: row for row in rows}
+
+    def __repr__(self):
+        return f'<ReferenceData {len(self.rows)} rows>'
+
+def load_reference(model):
+    """Loads every row of a reference table in its own session, so the rows aren't attached to (or expired by) a request's session.
+    Returns the rows as ReferenceData."""
+
+    #closing the session detaches the loaded rows
+    with Session(db.engine) as session:
+        rows = session.query(model).order_by(model.id).all()
+
+    return ReferenceData(rows)
+
+def get_reference(model):
+    """Returns the ReferenceData of a reference table from the process cache, loading it on the first use."""
+
+    with _reference_lock:
+        data = _reference.get(model)
+
+    if data is None:
+        data = load_reference(model)
+
+        with _reference_lock:
+            #another thread may have loaded it first, keep one copy
+            data = _reference.setdefault(model, data)
+
+    return data
+
+def preload_reference():
+    """Loads all of the reference tables into the process cache (at app startup, before the workers are forked)."""
+
+    for model in (LightType, PlantType):
+        get_reference(model)
+
+def clear_reference():
+    """Clears the cached reference tables, they are loaded again on the next use."""
+
+    with _reference_lock:
+        _reference.clear()
+
+def get_light_types():
+    """Returns all of the LightTypes."""
+    return get_reference(LightType).rows
+
+def get_plant_types():
+    """Returns all of the PlantTypes."""
+    return get_reference(PlantType).rows
+
+def get_plant_type(plant_type_id):
+    """Returns the PlantType by id, or None if it doesn't exist."""
+    return get_reference(PlantType).by_id.get(plant_type_id)
+
+def load_plant_type(plant_type_id):
+    """Returns the PlantType by id, aborts with a 404 if it doesn't exist."""
+
+    plant_type = get_plant_type(plant_type_id)
+
+    if plant_type is None:
+        abort(404)
+
+    return plant_type
@@ -1,11 +1,13 @@
 """A file to seed the database with tables and LightType and PlantType data."""
 
 from csv import DictReader
-from app import db
+from flask_migrate import upgrade
+from app import app, db
 from models import LightType, PlantType
 
-#create the tables
-db.create_all()
+#create the tables and indexes by running the migrations
+with app.app_context():
+    upgrade()
 
 #now seed the DB with our shared data
 artificial = LightType(type='Artificial')
@@ -0,0 +1,94 @@
+"""Solar Day Cache & helper methods."""
+
+import os
+from itertools import count
+from decimal import Decimal
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+from models import db, SolarDay
+
+load_dotenv()  # take environment variables from .env
+
+# Coordinates are rounded to 1 decimal place (about 0.1 degrees) to build the cache key.
+COORDINATE_PRECISION = 1
+MAX_ROWS = int(os.getenv('SOLAR_CACHE_MAX_ROWS', 100000))
+TTL_DAYS = int(os.getenv('SOLAR_CACHE_TTL_DAYS', 365))
+# The LRU bound is checked every EVICT_INTERVAL writes (in each process) instead of counting the table on every write,
+# so the table can grow past max_rows by up to EVICT_INTERVAL rows per process between checks.
+EVICT_INTERVAL = int(os.getenv('SOLAR_CACHE_EVICT_INTERVAL', 100))
+
+_writes = count(1)
+
+class SolarDayCache:
+    """A read-through cache of parsed sunrise-sunset API results (in seconds) stored in the SolarDay table.
+    Rows are keyed by coordinates rounded to 0.1 degrees and by date.
+
+    The table is bounded to max_rows, every evict_interval writes the least recently used rows past the bound are evicted.
+    Rows older than the ttl are treated as a miss and replaced with fresh data."""
+
+    def __init__(self, max_rows=MAX_ROWS, ttl=timedelta(days=TTL_DAYS), evict_interval=EVICT_INTERVAL):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.evict_interval = evict_interval
+
+    def get_key(self, latitude, longitude, day):
+        """Returns the cache key (rounded latitude, rounded longitude, date) for a location and date."""
+
+        return (
+            Decimal(str(round(float(latitude), COORDINATE_PRECISION))),
+            Decimal(str(round(float(longitude), COORDINATE_PRECISION))),
+            day.date() if isinstance(day, datetime) else day)
+
+    def get(self, latitude, longitude, day):
+        """Returns the cached API results for a location and date, or None if there is no fresh cached data.
+        A hit refreshes the row's accessed_at date so it is evicted last."""
+
+        latitude, longitude, date = self.get_key(latitude, longitude, day)
+        solar_day = SolarDay.query.filter_by(latitude=latitude, longitude=longitude, date=date).first()
+
+        if not solar_day:
+            return None
+
+        now = datetime.utcnow()
+        if solar_day.fetched_at < now - self.ttl:
+            db.session.delete(solar_day)
+            db.session.flush()
+            return None
+
+        solar_day.accessed_at = now
+        return solar_day.results
+
+    def set(self, latitude, longitude, day, results):
+        """Stores the API results for a location and date, and every evict_interval writes evicts the least recently used rows
+        if the cache is full.
+
+        Another request can store the same location and date at the same time. The insert runs in a savepoint, so if the
+        other row wins the unique key only the savepoint is rolled back and the other row is kept."""
+
+        latitude, longitude, date = self.get_key(latitude, longitude, day)
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(SolarDay(
+                    latitude=latitude,
+                    longitude=longitude,
+                    date=date,
+                    sunrise=results['sunrise'],
+                    sunset=results['sunset'],
+                    solar_noon=results['solar_noon'],
+                    day_length=results['day_length']))
+        except IntegrityError:
+            return
+
+        if next(_writes) % self.evict_interval == 0:
+            self.evict()
+
+    def evict(self):
+        """Deletes the least recently used rows until the cache is within max_rows."""
+
+        overflow = SolarDay.query.count() - self.max_rows
+
+        if overflow > 0:
+            lru_ids = db.session.query(SolarDay.id).order_by(SolarDay.accessed_at).limit(overflow)
+            SolarDay.query.filter(SolarDay.id.in_(lru_ids)).delete(synchronize_session=False)
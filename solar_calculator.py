@@ -1,21 +1,50 @@
 """Solar Calculator & helper methods."""
 
-import requests, json
-from datetime import date, datetime, timedelta
-from tzlocal import get_localzone
+import pytz
+import numpy as np
+import http_client
+from requests.exceptions import RequestException
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from solar_position import get_solar_times, get_solar_times_array, SECONDS_PER_DAY
 
 
 BASE_URL = 'https://api.sunrise-sunset.org/json'
+# Max number of API requests made in parallel in concurrent mode, enough for about a month of days in one round-trip.
+MAX_FETCH_WORKERS = 30
+
+# Fraction of the total daylight each light type recieves. East and West are not fractions of daylight,
+# East is sunrise-midday (soft morning light) and West is midday-sunset (hard afternoon light).
+NORTHERN_LIGHT_FRACTIONS = {
+    "North": 0.0625, #none to little sunlight - 1/16 of total daylight
+    "South": 0.875, #sunrise to sunset - 7/8 of total daylight
+    "Northeast": 0.125, # 1/8 of daily sun (soft morning light)
+    "Northwest": 0.125, # 1/8 of daily sun (hard afternoon light)
+    "Southeast": 0.75, #sunrise-midday (soft morning light) - 3/4 of total daylight
+    "Southwest": 0.75, #midday-sunset (hard afternoon light) - 3/4 of total daylight
+}
+
+SOUTHERN_LIGHT_FRACTIONS = {
+    "North": 0.875, #sunrise to sunset - 7/8 of total daylight
+    "South": 0.0625, #none to little sunlight - 1/16 of total daylight
+    "Northeast": 0.75, #sunrise-midday (soft morning light) - 3/4 of total daylight
+    "Northwest": 0.75, #midday-sunset (hard afternoon light) - 3/4 of total daylight
+    "Southeast": 0.125, # 1/8 of daily sun (soft morning light)
+    "Southwest": 0.125, # 1/8 of daily sun (hard afternoon light)
+}
 
 class SolarCalculator:
     """A class to get the solar forcast calculations based on a user' location,
     the current date, the water_interval (number of days between waterings), and the light type."""
 
-    def __init__(self, user_location, current_date, water_interval, light_type):
+    def __init__(self, user_location, current_date, water_interval, light_type, offline=False, cache=None, concurrent=False):
         self.user_location = user_location
         self.current_date = current_date
         self.water_interval = water_interval
         self.light_type = light_type
+        self.offline = offline
+        self.cache = cache
+        self.concurrent = concurrent
 
     def generate_dates(self):
         """Generate and return a list of dates starting with the day after the current date
@@ -28,64 +57,82 @@ class SolarCalculator:
 
         return dates
     
-    def convert_str_to_datetime(self, date, time):
-        """Takes a date object and a time string, combines both into a string then returns the datetime object."""
-
-        converted_time = None
-        if time[-2:] != 'AM' and time[-2:] != 'PM': #added this condition to account for total_daylight case which does not have AM/PM.
-            converted_time = time
-        elif time[1] == ':':
-            length = len(time)
-            new_time = time.zfill(length + 1)
-            converted_time = self.convert_12_to_24(new_time)
-        else:
-            converted_time = self.convert_12_to_24(time)
+    def generate_day_offsets(self):
+        """Generate and return a numpy array of day offsets from the current date, starting with the day after
+        the current date and ending at the water_interval count."""
 
-        date_time_str = date.strftime('%Y-%m-%d') + ' ' + converted_time
+        return np.arange(1, self.water_interval + 1)
 
-        return datetime.strptime(date_time_str, '%Y-%m-%d %H:%M:%S')
-    
-    def convert_12_to_24(self, string):
-        """Accepts a string, evaluates the string and converts from 12 hour to 24 hour time.
-        Solution found here: https://www.geeksforgeeks.org/python-program-convert-time-12-hour-24-hour-format/."""
-
-        #Check if last two elements of time is AM and first two elements are 12
-        if string[-2:] == 'AM' and string[:2] == '12':
-            return '00' + string[2:-3]
-        #remove the AM    
-        if string[-2:] == 'AM':
-            return string[:-3]
-        #Check if last two elements of time is PM and first two elements are 12   
-        if string[-2:] == 'PM' and string[:2] == '12':
-            return string[:-3]
-        #add 12 to hours and remove PM
-        return str(int(string[:2]) + 12) + string[2:8]
-
-    def get_utc_difference(self):
-        """Gets the local system timezone and returns the current timezone difference in hours from UTC."""
-        # get system timezone  
-        local_tz = get_localzone()
-        # get current date/timezone
-        date = datetime.now(local_tz);
-        # get the total seconds difference from UTC time
-        utc_offset =  date.utcoffset().total_seconds()
-        return utc_offset / 60 / 60
+    def get_data(self, day):
+        """Gets the solar data for a given date with the user_location from the Sunset and sunrise times API.
+        Returns the data in dict for this date/location.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}."""
 
+        solar_times = self.get_api_times(day)
 
-    def get_data(self, day):
+        if solar_times:
+            return self.convert_to_datetimes(day, solar_times)
+
+    def get_api_times(self, day):
+        """Gets the solar times for a given date with the user_location from the Sunset and sunrise times API.
+        Returns a dict of seconds measured from midnight UTC of the date, with the timezone adjustments described in adjust_for_timezone.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}.
+
+        If the calculator has a cache, the API results are read from the cache first and only fetched from the API on a miss.
+        """
+
+        solar_times = None
+        if self.cache:
+            solar_times = self.cache.get(self.user_location['latitude'], self.user_location['longitude'], day)
+
+        if solar_times is None:
+            solar_times = self.fetch_results(day)
+            if solar_times and self.cache:
+                self.cache.set(self.user_location['latitude'], self.user_location['longitude'], day, solar_times)
+
+        if solar_times:
+            return self.adjust_for_timezone(day, solar_times)
+
+    def fetch_results(self, day):
         """Calls the Sunset and sunrise times API for a given date with the user_location.
-        Returns the JSON data in dict for this date/location.
+        Returns the parsed API results (see parse_results), or None if the API status is not OK."""
+
+        # formatted=0 returns ISO 8601 timestamps and the day length in seconds instead of 12 hour time strings.
+        response = http_client.get(BASE_URL, params={
+            'lat': self.user_location['latitude'], 
+            'lng': self.user_location['longitude'], 
+            'date': day.date(),
+            'formatted': 0})
+
+        data = response.json()
+
+        if data['status'] == 'OK':
+            return self.parse_results(day, data['results'])
+
+    def parse_results(self, day, results):
+        """Converts the ISO 8601 API results for a given date into a dict of integer seconds measured from midnight UTC of the date.
+        {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}."""
+
+        midnight = datetime(day.year, day.month, day.day, tzinfo=pytz.utc)
+
+        solar_times = {key: int((datetime.fromisoformat(results[key]) - midnight).total_seconds())
+            for key in ('sunrise', 'sunset', 'solar_noon')}
+        solar_times['day_length'] = int(results['day_length'])
+
+        return solar_times
+
+    def adjust_for_timezone(self, day, solar_times):
+        """Returns the API solar times for a given date with the adjustments needed for the user's timezone.
         {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}.
 
-        The API will always return the data for the provided geocoordinates but in UTC time instead of the local time,
-        and our application only knows dates and times that are timezone naive and assume that sunrise/sunset will
-        fall on the same day (because they do).
+        The API will always return the data for the provided geocoordinates on the date in UTC instead of the local date,
+        so in some timezones sunset falls before sunrise and one of them has to be moved by a day so that our application
+        correctly calculates the time difference.
 
-        Therefore, adjustments are needed for different timezones to account for the fact that in some timezones sunset
-        falls on the next day in UTC and in other timezones, sunrise falls on the previous day in UTC.
+        Which time to move is decided from the parsed UTC times themselves (not the UTC difference, which can't tell
+        timezones like +5:30 apart): the day runs from sunrise through solar noon to sunset.
 
-        Timezones -12 to +5 must add 1 day to the sunset time so that our application correctly calculates the time difference.
-        This is because sunset time will fall on the following day in UTC time for these timezones.
+        When solar noon falls after sunrise, sunset falls on the following day in UTC time and 1 day is added to sunset.
 
         For example:
         - In Seattle, WA on 5/30/21 the UTC difference is -7
@@ -94,8 +141,7 @@ class SolarCalculator:
         - Our application thinks that sunrise is 12:16 PM and sunset is 3:57 AM on 5/30 which will calculate the time difference incorrectly
         so we add a day to our sunset time so our application knows we are working with 12:16 PM 5/30 to 3:57 AM 5/31.
 
-        Timezones +6 to +12 must subtract 1 day from the sunrise time so that our application correctly calculates the time difference.
-        This is because sunrise will fall on the previous day in UTC time for these timezones.
+        When solar noon falls before sunset, sunrise falls on the previous day in UTC time and 1 day is subtracted from sunrise.
 
         For example:
         - In Dhaka, Bangladesh on 5/30/21 the UTC difference is +6
@@ -103,112 +149,198 @@ class SolarCalculator:
         - Sunset in localtime is 6:40 PM on Sunday 5/20, but the API  provided time is 12:40 PM UTC.
         - Our application thinks that sunrise is 11:11 PM 5/30 and sunset is 12:40 PM 5/30 and this will calculate the time difference incorrectly
         so we subtract 1 day from sunrise so our application knows we are working with 11:11 PM 5/29 to 12:40 PM 5/30.
-        
+
+        Days where sunset already falls after sunrise (like Multan, Pakistan at +5) are not adjusted.
         """
-        
-        # convert the datetime.datetime object into a date with day.date()
-        response = requests.get(BASE_URL, params={
-            'lat': self.user_location['latitude'], 
-            'lng': self.user_location['longitude'], 
-            'date': day.date()})
-        
-        results = response.json()['results']
-
-        # Get the system time UTC difference in hours.
-        # This will tell us which timezone the current local time falls under and therefore which date modification to use in our time calculations.
-        utc_diff = self.get_utc_difference()
-
-        if response.json()['status'] == 'OK':
-            # If the utc_diff is -12 to 5 hours difference from UTC add 1 day to sunset calculation.
-            if utc_diff in range(-12, 6):
-                return {'date': day, 
-                    'sunrise': self.convert_str_to_datetime(day, results['sunrise']),
-                    'sunset': self.convert_str_to_datetime(day + timedelta(days=1), results['sunset']),
-                    'solar_noon': self.convert_str_to_datetime(day, results['solar_noon']),
-                    'day_length': self.convert_str_to_datetime(day, results['day_length'])}
-
-            # If the utc_diff is 6 to 12 hours difference from UTC subract 1 day from sunrise calculation.
-            if utc_diff in range(6, 13):
-                return {'date': day, 
-                    'sunrise': self.convert_str_to_datetime(day - timedelta(days=1), results['sunrise']),
-                    'sunset': self.convert_str_to_datetime(day, results['sunset']),
-                    'solar_noon': self.convert_str_to_datetime(day, results['solar_noon']),
-                    'day_length': self.convert_str_to_datetime(day, results['day_length'])}
+
+        adjusted_times = {'date': day, **solar_times}
+
+        if solar_times['sunset'] > solar_times['sunrise']:
+            return adjusted_times
+
+        # Solar noon is before sunset, so sunrise was on the previous day in UTC time.
+        if solar_times['solar_noon'] < solar_times['sunset']:
+            adjusted_times['sunrise'] -= SECONDS_PER_DAY
+        # Solar noon is after sunrise, so sunset is on the following day in UTC time.
+        else:
+            adjusted_times['sunset'] += SECONDS_PER_DAY
+
+        return adjusted_times
+
+    def get_concurrent_times(self, dates):
+        """Gets the API solar times for a list of dates and returns them in the same order as the dates.
+        Cached dates are read first, then every missing date is fetched from the API in parallel with a bounded
+        thread pool so the total wait is about one API round-trip instead of one round-trip per day.
+
+        Only the API requests run in the pool, the cache is read and written from the calling thread
+        because the database session is not shared between threads.
+
+        If any day can't be fetched the whole schedule fails: the fetch error is re-raised, and a day the API
+        answered without solar times (status not OK) raises a RequestException."""
+
+        latitude = self.user_location['latitude']
+        longitude = self.user_location['longitude']
+
+        results = [self.cache.get(latitude, longitude, day) if self.cache else None for day in dates]
+        misses = [i for i, result in enumerate(results) if result is None]
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=min(len(misses), MAX_FETCH_WORKERS)) as executor:
+                # executor.map returns the results in the order of the dates that were submitted
+                fetched_results = executor.map(self.fetch_results, [dates[i] for i in misses])
+
+                for i, fetched in zip(misses, fetched_results):
+                    if fetched is None:
+                        raise RequestException(f'The sunrise-sunset API has no solar times for {dates[i].date()}.')
+                    results[i] = fetched
+                    if fetched and self.cache:
+                        self.cache.set(latitude, longitude, dates[i], fetched)
+
+        return [self.adjust_for_timezone(day, result) for day, result in zip(dates, results)]
+
+    def get_offline_times(self, day):
+        """Calculates the solar times for a given date with the user_location using the offline NOAA solar position engine.
+        Returns a dict of seconds measured from midnight UTC of the date, rounded to whole seconds like the API data.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}.
+
+        The engine measures the times from midnight UTC of the date, so a sunset that falls on the next day in UTC
+        (or a sunrise that falls on the previous day) is already correct and no timezone adjustment is needed."""
+
+        solar_times = get_solar_times(self.user_location['latitude'], self.user_location['longitude'], day)
+
+        return {'date': day, **{key: round(seconds) for key, seconds in solar_times.items()}}
+
+    def get_offline_data(self, day):
+        """Calculates the solar data for a given date with the user_location using the offline NOAA solar position engine.
+        Returns the data in the same dict shape as get_data.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}."""
+
+        return self.convert_to_datetimes(day, self.get_offline_times(day))
+
+    def convert_to_datetimes(self, day, solar_times):
+        """Converts a dict of solar times in seconds from midnight UTC of a date into datetimes on that date."""
+
+        midnight = datetime(day.year, day.month, day.day)
+
+        # day_length is stored as a time of day, so a 24 hour day (midnight sun) is capped at 23:59:59.
+        day_length = min(solar_times['day_length'], SECONDS_PER_DAY - 1)
+
+        return {'date': day,
+            'sunrise': midnight + timedelta(seconds=solar_times['sunrise']),
+            'sunset': midnight + timedelta(seconds=solar_times['sunset']),
+            'solar_noon': midnight + timedelta(seconds=solar_times['solar_noon']),
+            'day_length': midnight + timedelta(seconds=day_length)}
+
+    def get_solar_times_schedule(self):
+        """Generates and returns a list of solar times in seconds from midnight UTC for given number of dates:
+        [{"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}, {etc.]
+
+        If the calculator is offline the times are calculated locally, otherwise they are fetched from the API.
+        In concurrent mode all of the API requests are made in parallel."""
+
+        dates = self.generate_dates()
+
+        if self.offline:
+            return [self.get_offline_times(day) for day in dates]
+        if self.concurrent:
+            return self.get_concurrent_times(dates)
+        return [self.get_api_times(day) for day in dates]
 
     def get_solar_schedule(self):
         """Generates and returns a list of data for given number of dates:
         [{"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}, {etc.]"""
 
-        solar_schedule = []
-        dates = self.generate_dates()
-
-        for day in dates:
-            data = self.get_data(day)
-            solar_schedule.append(data)
-        
-        return solar_schedule
+        return [self.convert_to_datetimes(day['date'], day) if day else None for day in self.get_solar_times_schedule()]
     
-    def get_fraction_of_time(self, time, fraction):
-        """ Accepts time (total daily hours), and a fraction that represents the fraction of total time we need. 
-        Converts time into a duration of time then gets the fraction of that time.
+    def get_light_duration(self, day, light_type, light_fractions):
+        """Calculates the maximum sunlight a light_type can recieve for one day of the solar forcast (in seconds).
+        Only the calculation for the requested light type is evaluated.
 
-        Returns the fraction of the duration of time.
-        
-        Calculation to convert point in time to duration found on https://stackoverflow.com/questions/35241643/convert-datetime-time-into-datetime-timedelta-in-python-3-4"""
+        For calculating East and West lightsource types the difference is the later time minus the first time.
+        Every other light type is a fraction of the total daylight from the hemisphere's light fractions table.
 
-        duration_of_time = datetime.combine(date.min, time) - datetime.min
-        fraction_of_total_time = duration_of_time * fraction
+        Returns the maximum potential sunlight for the day in seconds."""
 
-        return fraction_of_total_time
+        if light_type == 'East':
+            seconds = day['solar_noon'] - day['sunrise'] #sunrise-midday (soft morning light)
+        elif light_type == 'West':
+            seconds = day['sunset'] - day['solar_noon'] #midday-sunset (hard afternoon light)
+        else:
+            seconds = day['day_length'] * light_fractions[light_type]
+
+        return float(seconds)
 
     def get_daily_sunlight(self):
         """Calculates the maximum amount of light that a light_type can recieve given the user location, the date, and the type of light source. Uses data from the solar forecast to calculate the maximum sunlight potential for each day.
 
-        For calculating East and West lightsource types subtracting the later time from the first time difference = later_time - first_time creates a datetime object that only holds the difference.
-        
-        Returns a list of time deltas that equal the maximum potential sunlight for each day."""
-
-        solar_forcast = self.get_solar_schedule()
-        # print(solar_forcast)
-        
-        solar_noon_times = [date['solar_noon'] for date in solar_forcast]
-        sunrise_times = [date['sunrise'] for date in solar_forcast]
-        sunset_times = [date['sunset'] for date in solar_forcast]
-        day_lengths = [date['day_length'] for date in solar_forcast]
-
-        plant_max_daily_light = []
-
-        #put this in its own method, pull out the decimals as constants
-        #create a contstants.py file
-
-        for i in range(len(solar_forcast)):
-            nh_light_calculations = {
-                "North": self.get_fraction_of_time(day_lengths[i].time(), .0625), #none to little sunlight - 1/16 of total daylight
-                "East": solar_noon_times[i] - sunrise_times[i], #sunrise-midday (soft morning light)
-                "South": self.get_fraction_of_time(day_lengths[i].time(), 0.875), #sunrise to sunset - 7/8 of total daylight
-                "West": sunset_times[i] - solar_noon_times[i], #midday-sunset (hard afternoon light)
-                "Northeast": self.get_fraction_of_time(day_lengths[i].time(), .125), # 1/8 of daily sun (soft morning light)
-                "Northwest": self.get_fraction_of_time(day_lengths[i].time(), .125), # 1/8 of daily sun (hard afternoon light)
-                "Southeast": self.get_fraction_of_time(day_lengths[i].time(), .75), #sunrise-midday (soft morning light) - 3/4 of total daylight
-                "Southwest": self.get_fraction_of_time(day_lengths[i].time(), .75), #midday-sunset (hard afternoon light) - 3/4 of total daylight
-            }
-
-            sh_light_calculations = {
-                "North": self.get_fraction_of_time(day_lengths[i].time(), 0.875), #sunrise to sunset - 7/8 of total daylight
-                "East": solar_noon_times[i] - sunrise_times[i], #sunrise-midday (soft morning light)
-                "South": self.get_fraction_of_time(day_lengths[i].time(), .0625), #none to little sunlight - 1/16 of total daylight
-                "West": sunset_times[i] - solar_noon_times[i], #midday-sunset (hard afternoon light)
-                "Northeast": self.get_fraction_of_time(day_lengths[i].time(), .75), #sunrise-midday (soft morning light) - 3/4 of total daylight
-                "Northwest": self.get_fraction_of_time(day_lengths[i].time(), .75), #midday-sunset (hard afternoon light) - 3/4 of total daylight
-                "Southeast": self.get_fraction_of_time(day_lengths[i].time(), .125), # 1/8 of daily sun (soft morning light) 
-                "Southwest": self.get_fraction_of_time(day_lengths[i].time(), .125), # 1/8 of daily sun (hard afternoon light)
-            }
-
-            if float(self.user_location['latitude']) > 0:
-                #user is in the northern hemisphere
-                plant_max_daily_light.append(nh_light_calculations[self.light_type])
-            else:
-                #user is in the southern hemisphere
-                plant_max_daily_light.append(sh_light_calculations[self.light_type])
-            
-        return plant_max_daily_light      
\ No newline at end of file
+        Returns a list of the maximum potential sunlight for each day in seconds."""
+
+        solar_forcast = self.get_solar_times_schedule()
+        light_fractions = self.get_light_fractions()
+
+        return [self.get_light_duration(day, self.light_type, light_fractions) for day in solar_forcast]
+
+    def get_daily_sunlight_by_type(self):
+        """Calculates the maximum daily sunlight for every light type from one pass over the solar forecast,
+        for callers that need all of the light types (like a room with multiple light sources).
+
+        Returns a dict of lists of seconds for each light type: {"North": [seconds], "East": [seconds], etc.}"""
+
+        solar_forcast = self.get_solar_times_schedule()
+        light_fractions = self.get_light_fractions()
+        light_types = ['East', 'West', *light_fractions]
+
+        daily_sunlight = {light_type: [] for light_type in light_types}
+
+        for day in solar_forcast:
+            for light_type in light_types:
+                daily_sunlight[light_type].append(self.get_light_duration(day, light_type, light_fractions))
+
+        return daily_sunlight
+
+    def get_light_fractions(self):
+        """Returns the light fractions table for the hemisphere of the user location."""
+
+        if float(self.user_location['latitude']) > 0:
+            return NORTHERN_LIGHT_FRACTIONS
+        return SOUTHERN_LIGHT_FRACTIONS
+
+    def get_solar_arrays(self, offsets=None):
+        """Calculates the solar forcast for an array of day offsets from the current date in one numpy call (batched mode).
+        If no offsets are provided the forcast covers the water_interval.
+
+        Returns a dict of numpy arrays of seconds measured from midnight UTC of each date, rounded to whole seconds like get_offline_times:
+        {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}."""
+
+        if offsets is None:
+            offsets = self.generate_day_offsets()
+
+        solar_arrays = get_solar_times_array(
+            self.user_location['latitude'],
+            self.user_location['longitude'],
+            self.current_date,
+            offsets)
+
+        return {key: np.round(times) for key, times in solar_arrays.items()}
+
+    def get_daily_sunlight_arrays(self, offsets=None):
+        """Calculates the maximum daily sunlight of every light type for an array of day offsets (batched mode).
+        Uses the same light calculations as get_light_duration, so a whole horizon (like a plant type's max_days_without_water)
+        can be calculated in one pass.
+
+        Returns a dict of numpy arrays of seconds for each light type: {"North": seconds, "East": seconds, etc.}"""
+
+        solar_arrays = self.get_solar_arrays(offsets)
+
+        daily_sunlight = {light_type: solar_arrays['day_length'] * fraction for light_type, fraction in self.get_light_fractions().items()}
+        daily_sunlight['East'] = solar_arrays['solar_noon'] - solar_arrays['sunrise']
+        daily_sunlight['West'] = solar_arrays['sunset'] - solar_arrays['solar_noon']
+
+        return daily_sunlight
+
+    def get_sunlight_hours(self, offsets=None):
+        """Calculates the maximum daily sunlight hours of every light type for an array of day offsets (batched mode).
+
+        Returns a dict of numpy arrays of hours for each light type: {"North": hours, "East": hours, etc.}"""
+
+        return {light_type: seconds / 3600 for light_type, seconds in self.get_daily_sunlight_arrays(offsets).items()}
@@ -0,0 +1,157 @@
+"""Solar Position engine & helper methods.
+
+An offline implementation of the NOAA solar calculations (https://gml.noaa.gov/grad/solcalc/calcdetails.html)
+used to calculate sunrise, sunset, solar noon and day length for any location and date without calling a remote API."""
+
+import numpy as np
+from math import sin, cos, tan, asin, acos, radians, degrees
+
+# The sun's apparent altitude at sunrise/sunset, accounts for atmospheric refraction and the size of the solar disk.
+SUNRISE_ZENITH = 90.833
+SECONDS_PER_DAY = 86400
+# Julian day number at midnight UTC for date.toordinal() == 0.
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+def julian_day(day):
+    """Accepts a date or datetime and returns the julian day at midnight UTC for that date."""
+    return day.toordinal() + JULIAN_ORDINAL_OFFSET
+
+def sun_declination_and_equation_of_time(julian_date):
+    """Accepts a julian date (with a fractional day) and returns a tuple of the sun declination in degrees
+    and the equation of time in minutes."""
+
+    jc = (julian_date - 2451545) / 36525
+
+    mean_long = (280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360
+    mean_anom = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    mean_anom_rad = radians(mean_anom)
+    eq_of_center = (sin(mean_anom_rad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + sin(2 * mean_anom_rad) * (0.019993 - 0.000101 * jc)
+        + sin(3 * mean_anom_rad) * 0.000289)
+
+    omega = radians(125.04 - 1934.136 * jc)
+    apparent_long = mean_long + eq_of_center - 0.00569 - 0.00478 * sin(omega)
+
+    mean_obliq = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliq_corr = radians(mean_obliq + 0.00256 * cos(omega))
+
+    declination = degrees(asin(sin(obliq_corr) * sin(radians(apparent_long))))
+
+    var_y = tan(obliq_corr / 2) ** 2
+    mean_long_rad = radians(mean_long)
+    eq_of_time = 4 * degrees(var_y * sin(2 * mean_long_rad)
+        - 2 * eccent * sin(mean_anom_rad)
+        + 4 * eccent * var_y * sin(mean_anom_rad) * cos(2 * mean_long_rad)
+        - 0.5 * var_y * var_y * sin(4 * mean_long_rad)
+        - 1.25 * eccent * eccent * sin(2 * mean_anom_rad))
+
+    return declination, eq_of_time
+
+def sunrise_hour_angle(latitude, declination):
+    """Returns the sunrise hour angle in degrees for a latitude and sun declination.
+
+    Returns 0 during polar night (the sun never rises) and 180 during midnight sun (the sun never sets)."""
+
+    lat_rad = radians(latitude)
+    decl_rad = radians(declination)
+    cos_ha = cos(radians(SUNRISE_ZENITH)) / (cos(lat_rad) * cos(decl_rad)) - tan(lat_rad) * tan(decl_rad)
+
+    if cos_ha >= 1:
+        return 0.0
+    if cos_ha <= -1:
+        return 180.0
+    return degrees(acos(cos_ha))
+
+def get_solar_times(latitude, longitude, day):
+    """Calculates the solar times for a location and date.
+
+    Returns a dict of seconds measured from midnight UTC of the date:
+    {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}.
+
+    Because the times are measured from midnight UTC, a sunrise can be negative (it falls on the previous day in UTC)
+    and a sunset can be greater than 86400 (it falls on the following day in UTC), so no timezone adjustments are needed."""
+
+    latitude = float(latitude)
+    longitude = float(longitude)
+    midnight = julian_day(day)
+
+    # estimate solar noon from the longitude, then refine it with the equation of time at that estimate.
+    noon_minutes = 720 - 4 * longitude
+    declination, eq_of_time = sun_declination_and_equation_of_time(midnight + noon_minutes / 1440)
+    noon_minutes = 720 - 4 * longitude - eq_of_time
+    declination, eq_of_time = sun_declination_and_equation_of_time(midnight + noon_minutes / 1440)
+    noon_minutes = 720 - 4 * longitude - eq_of_time
+
+    # 1 degree of hour angle is 4 minutes of time
+    half_day_minutes = sunrise_hour_angle(latitude, declination) * 4
+
+    return {
+        'sunrise': (noon_minutes - half_day_minutes) * 60,
+        'sunset': (noon_minutes + half_day_minutes) * 60,
+        'solar_noon': noon_minutes * 60,
+        'day_length': half_day_minutes * 2 * 60}
+
+def sun_declination_and_equation_of_time_array(julian_dates):
+    """Vectorized version of sun_declination_and_equation_of_time.
+    Accepts a numpy array of julian dates and returns a tuple of declination (degrees) and equation of time (minutes) arrays.
+
+    Single days use the scalar version, NumPy's per-call overhead makes a one-element array about 14x slower."""
+
+    jc = (julian_dates - 2451545) / 36525
+
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    eq_of_center = (np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mean_anom) * 0.000289)
+
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = np.radians(np.degrees(mean_long) + eq_of_center - 0.00569 - 0.00478 * np.sin(omega))
+
+    mean_obliq = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliq_corr = np.radians(mean_obliq + 0.00256 * np.cos(omega))
+
+    declination = np.degrees(np.arcsin(np.sin(obliq_corr) * np.sin(apparent_long)))
+
+    var_y = np.tan(obliq_corr / 2) ** 2
+    eq_of_time = 4 * np.degrees(var_y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(mean_anom)
+        + 4 * eccent * var_y * np.sin(mean_anom) * np.cos(2 * mean_long)
+        - 0.5 * var_y * var_y * np.sin(4 * mean_long)
+        - 1.25 * eccent * eccent * np.sin(2 * mean_anom))
+
+    return declination, eq_of_time
+
+def get_solar_times_array(latitude, longitude, start_date, offsets):
+    """Calculates the solar times for a location for many dates in one pass.
+    Accepts a start date and an array of day offsets from the start date (1 is the day after the start date).
+
+    Returns a dict of numpy arrays of seconds measured from midnight UTC of each date:
+    {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}."""
+
+    latitude = float(latitude)
+    longitude = float(longitude)
+    midnights = julian_day(start_date) + np.asarray(offsets, dtype=float)
+
+    # estimate solar noon from the longitude, then refine it with the equation of time at that estimate.
+    noon_minutes = np.full(midnights.shape, 720 - 4 * longitude)
+    declination, eq_of_time = sun_declination_and_equation_of_time_array(midnights + noon_minutes / 1440)
+    noon_minutes = 720 - 4 * longitude - eq_of_time
+    declination, eq_of_time = sun_declination_and_equation_of_time_array(midnights + noon_minutes / 1440)
+    noon_minutes = 720 - 4 * longitude - eq_of_time
+
+    # clipping the hour angle handles polar night (0 degrees) and midnight sun (180 degrees)
+    lat_rad = radians(latitude)
+    decl_rad = np.radians(declination)
+    cos_ha = cos(radians(SUNRISE_ZENITH)) / (cos(lat_rad) * np.cos(decl_rad)) - tan(lat_rad) * np.tan(decl_rad)
+    half_day_minutes = np.degrees(np.arccos(np.clip(cos_ha, -1, 1))) * 4
+
+    return {
+        'sunrise': (noon_minutes - half_day_minutes) * 60,
+        'sunset': (noon_minutes + half_day_minutes) * 60,
+        'solar_noon': noon_minutes * 60,
+        'day_length': half_day_minutes * 2 * 60}
@@ -92,4 +92,67 @@ async function snoozePlant(plant_id, notes) {
         let card = document.querySelector(`div[data-col-id='${plant_id}']`);
         card.remove();
     }
-}
\ No newline at end of file
+}
+
+/* Selector for the Water All button.
+Clicking the Water All button will water every plant on the water manager with a batch request (including each plant's notes, if any).
+Plants are sent BATCH_SIZE at a time, so hundreds of plants take a few requests instead of one request each.
+Plants that couldn't be watered stay on the dashboard and are listed under the button. */
+
+const BATCH_SIZE = 100;
+const waterAllButton = document.getElementById('water_all_button');
+const waterAllMessage = document.getElementById('water_all_message');
+
+if (waterAllButton) {
+    waterAllButton.addEventListener('click', function() {
+        let cards = document.querySelectorAll('div[data-col-id]');
+        let plants = Array.from(cards).map(card => ({
+            "id": Number(card.getAttribute('data-col-id')),
+            "action": "water",
+            "notes": card.querySelector('textarea').value
+        }));
+        waterAllPlants(plants);
+    });
+}
+
+/* Makes calls to the batch API to water or snooze a list of plants. */
+async function waterAllPlants(plants) {
+    waterAllButton.disabled = true;
+    waterAllMessage.textContent = '';
+    let refused = [];
+
+    try {
+        for (let i = 0; i < plants.length; i += BATCH_SIZE) {
+            const batch = plants.slice(i, i + BATCH_SIZE);
+            try {
+                // send post request to server
+                const response = await axios.post(`${BASE_URL}water-manager/batch`, {"plants": batch});
+                console.log(response.status)
+                if (response.status === 201) {
+                    // remove the updated plants from the dashboard, plants that couldn't be updated stay on the dashboard
+                    for (let plant of response.data.plants) {
+                        if (plant.status === 'watered' || plant.status === 'snoozed') {
+                            let card = document.querySelector(`div[data-col-id='${plant.id}']`);
+                            card.remove();
+                        } else if (plant.status === 'refused') {
+                            refused.push(plant.id);
+                        }
+                    }
+                }
+            } catch (error) {
+                // the request failed (server error or network), none of the plants in this batch were watered
+                console.log(error)
+                refused.push(...batch.map(plant => plant.id));
+            }
+        }
+    } finally {
+        let remaining = document.querySelectorAll('div[data-col-id]').length;
+        waterAllButton.textContent = `Water All (${remaining})`;
+        waterAllButton.disabled = remaining === 0;
+    }
+
+    if (refused.length) {
+        let names = refused.map(id => document.querySelector(`div[data-col-id='${id}'] .card-title`).textContent.trim());
+        waterAllMessage.textContent = `Couldn't water ${names.join(', ')}, please try again later.`;
+    }
+}
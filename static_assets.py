@@ -0,0 +1,86 @@
+"""Fingerprinted Static Assets & helper methods.
+
+Static URLs (url_for('static', ...)) get a v= query argument with a hash of the file's content, and requests with
+the current hash are cached by the browser for a year without revalidating. A changed file gets a new hash (and URL),
+so browsers never use a stale copy. Static URLs without the current hash are not cached (SEND_FILE_MAX_AGE_DEFAULT)."""
+
+import os
+import hashlib
+from threading import Lock
+from flask import request
+from werkzeug.security import safe_join
+
+STATIC_PREFIX = '/static/'
+# Cache-Control of fingerprinted static files and content-addressed uploads.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Number of characters of the content hash used in the URLs.
+HASH_LENGTH = 12
+
+class StaticAssets:
+    """Adds content hashes to the app's static URLs and long-lived cache headers to fingerprinted static files."""
+
+    def __init__(self, app=None):
+        self._versions = {}
+        self._lock = Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.url_defaults(self.add_version)
+        app.after_request(self.add_cache_headers)
+        app.add_template_filter(self.versioned_url, 'versioned')
+        app.extensions['static_assets'] = self
+
+    def get_version(self, filename):
+        """Returns the content hash of a static file, or None if it doesn't exist.
+        Hashes are cached per process and recomputed when the file is modified."""
+
+        path = safe_join(self.app.static_folder, filename)
+
+        if path is None or not os.path.isfile(path):
+            return None
+
+        mtime = os.path.getmtime(path)
+
+        with self._lock:
+            cached = self._versions.get(filename)
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+        with open(path, 'rb') as file:
+            version = hashlib.sha256(file.read()).hexdigest()[:HASH_LENGTH]
+
+        with self._lock:
+            self._versions[filename] = (mtime, version)
+
+        return version
+
+    def add_version(self, endpoint, values):
+        """Adds the content hash to url_for('static', filename=...) URLs."""
+
+        if endpoint == 'static' and 'v' not in values:
+            version = self.get_version(values.get('filename', ''))
+            if version:
+                values['v'] = version
+
+    def versioned_url(self, url):
+        """Template filter that adds the content hash to a /static/ URL stored as a string (like a plant's default image).
+        Other URLs (uploads in S3, placeholders with a query) are returned unchanged."""
+
+        if not url or not url.startswith(STATIC_PREFIX) or '?' in url:
+            return url
+
+        version = self.get_version(url[len(STATIC_PREFIX):])
+        return f'{url}?v={version}' if version else url
+
+    def add_cache_headers(self, response):
+        """Caches static files requested with their current content hash for a year, as immutable."""
+
+        if (request.endpoint == 'static' and response.status_code in (200, 304) and
+                request.args.get('v') and request.args.get('v') == self.get_version(request.view_args.get('filename', ''))):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            response.headers.pop('Expires', None)
+
+        return response
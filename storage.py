@@ -0,0 +1,215 @@
+"""Upload Storage & helper methods.
+
+User uploads are saved through a storage backend with the same interface (make_folder, put, delete_prefix, get_url):
+S3Storage saves to the S3 bucket using one shared S3 client per process, LocalStorage saves to a folder on disk
+for development and tests. Any object with the same methods (like a moto backed S3Storage) can be set with set_storage."""
+
+import os
+import shutil
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Keys are saved under this prefix in the S3 bucket, S3_LOCATION is the public URL of this prefix.
+S3_PREFIX = 'uploads/user/'
+# Max connections kept open to S3, matches the gunicorn worker threads that may upload at the same time.
+MAX_POOL_CONNECTIONS = 30
+# Strict (connect, read) timeouts in seconds and bounded retries so a slow S3 request can't hang a worker.
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+MAX_ATTEMPTS = 3
+# S3 deletes at most 1000 keys in one request.
+DELETE_BATCH_SIZE = 1000
+
+_client = None
+_client_pid = None
+_storage = None
+
+class StorageError(Exception):
+    """Raised when an upload can't be saved or deleted."""
+
+def create_s3_client():
+    """Creates and returns an S3 client with a tuned connection pool, timeouts, and retries.
+    The credentials are read from the AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment variables."""
+
+    config = Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries={'max_attempts': MAX_ATTEMPTS, 'mode': 'standard'})
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        config=config)
+
+def get_s3_client():
+    """Returns the shared S3 client for this process, creating it on first use.
+    A forked worker process creates its own client instead of sharing the parent's open connections."""
+
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        _client = create_s3_client()
+        _client_pid = os.getpid()
+
+    return _client
+
+class S3Storage:
+    """Saves uploads to an S3 bucket under S3_PREFIX."""
+
+    def __init__(self, bucket, url, prefix=S3_PREFIX, client=None):
+        self.bucket = bucket
+        self.url = url
+        self.prefix = prefix
+        self.client = client
+
+    def __repr__(self):
+        return f'<S3Storage {self.bucket}/{self.prefix}>'
+
+    def get_client(self):
+        """Returns the client passed to this storage, or the shared S3 client for this process."""
+        return self.client or get_s3_client()
+
+    def get_url(self, key):
+        """Returns the public URL of a key."""
+        return f'{self.url}{key}'
+
+    def make_folder(self, key):
+        """Creates an empty folder (key ending in /) so the folder shows up in the bucket."""
+
+        try:
+            self.get_client().put_object(Bucket=self.bucket, Key=f'{self.prefix}{key}')
+        except (BotoCoreError, ClientError) as e:
+            raise StorageError(e)
+
+    def put(self, key, body, content_type=None, cache_control=None):
+        """Saves a file like object (or bytes) to a key and returns the public URL.
+        The cache_control is sent as the object's Cache-Control header when it is downloaded."""
+
+        extra = {}
+        if content_type:
+            extra['ContentType'] = content_type
+        if cache_control:
+            extra['CacheControl'] = cache_control
+
+        try:
+            self.get_client().put_object(Bucket=self.bucket, Key=f'{self.prefix}{key}', Body=body, **extra)
+        except (BotoCoreError, ClientError) as e:
+            raise StorageError(e)
+
+        return self.get_url(key)
+
+    def delete_prefix(self, prefix):
+        """Deletes every key under a prefix (folder). Keys are listed DELETE_BATCH_SIZE at a time and each page is
+        deleted with one delete_objects request. Returns the number of deleted keys."""
+
+        client = self.get_client()
+        deleted = 0
+
+        try:
+            pages = client.get_paginator('list_objects_v2').paginate(
+                Bucket=self.bucket,
+                Prefix=f'{self.prefix}{prefix}',
+                PaginationConfig={'PageSize': DELETE_BATCH_SIZE})
+
+            for page in pages:
+                keys = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+
+                if keys:
+                    #in quiet mode only the keys that failed to delete are returned
+                    res = client.delete_objects(Bucket=self.bucket, Delete={'Objects': keys, 'Quiet': True})
+                    deleted += len(keys) - len(res.get('Errors', []))
+
+        except (BotoCoreError, ClientError) as e:
+            raise StorageError(e)
+
+        return deleted
+
+class LocalStorage:
+    """Saves uploads to a folder on disk. Used for development without an S3 bucket, and for tests."""
+
+    def __init__(self, root, url):
+        self.root = root
+        self.url = url
+
+    def __repr__(self):
+        return f'<LocalStorage {self.root}>'
+
+    def get_path(self, key):
+        """Returns the path on disk of a key, keys can't point outside of the root folder."""
+
+        path = os.path.abspath(os.path.join(self.root, key))
+
+        if os.path.commonpath([path, os.path.abspath(self.root)]) != os.path.abspath(self.root):
+            raise StorageError(f'Invalid key: {key}')
+
+        return path
+
+    def get_url(self, key):
+        """Returns the URL of a key."""
+        return f'{self.url}{key}'
+
+    def make_folder(self, key):
+        """Creates a folder."""
+
+        try:
+            os.makedirs(self.get_path(key), exist_ok=True)
+        except OSError as e:
+            raise StorageError(e)
+
+    def put(self, key, body, content_type=None, cache_control=None):
+        """Saves a file like object (or bytes) to a key and returns the URL (files are served by Flask, so cache_control isn't used)."""
+
+        path = self.get_path(key)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                if isinstance(body, bytes):
+                    file.write(body)
+                else:
+                    shutil.copyfileobj(body, file)
+        except OSError as e:
+            raise StorageError(e)
+
+        return self.get_url(key)
+
+    def delete_prefix(self, prefix):
+        """Deletes every file under a prefix (folder) and returns the number of deleted files."""
+
+        path = self.get_path(prefix)
+
+        if not os.path.isdir(path):
+            return 0
+
+        deleted = sum(len(files) for _, _, files in os.walk(path))
+        shutil.rmtree(path, ignore_errors=True)
+
+        return deleted
+
+def create_storage():
+    """Creates the storage from the environment: S3Storage if S3_BUCKET is set, otherwise LocalStorage in /static/uploads/user."""
+
+    if os.getenv('S3_BUCKET'):
+        return S3Storage(bucket=os.getenv('S3_BUCKET'), url=os.getenv('S3_LOCATION'))
+
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads', 'user')
+    return LocalStorage(root=root, url='/static/uploads/user/')
+
+def get_storage():
+    """Returns the storage for uploads, creating it on first use."""
+
+    global _storage
+
+    if _storage is None:
+        _storage = create_storage()
+
+    return _storage
+
+def set_storage(storage):
+    """Sets the storage for uploads (for example a LocalStorage in a temporary folder for tests)."""
+
+    global _storage
+    _storage = storage
@@ -11,6 +11,7 @@ from models import *
 os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
 
 from app import *
+from test_utils import count_queries
 
 #disable WTForms CSRF validation
 app.config['WTF_CSRF_ENABLED'] = False
@@ -114,6 +115,28 @@ class TestCollectionViews(TestCase):
             self.assertEqual(res.status_code, 200)
             self.assertIn('Home', str(res.data))
             self.assertIn('Add a Room', str(res.data))
+
+    def test_view_collection_query_count(self):
+        """View a collection and its rooms in a fixed number of queries."""
+
+        db.session.add_all([Room(id=2, name='Bedroom', collection_id=1), Room(id=3, name='Office', collection_id=1)])
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user1.id
+
+            #the first request caches the user's identity in the session
+            c.get('/collections/1')
+
+            with count_queries() as statements:
+                res = c.get('/collections/1')
+
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Kitchen', str(res.data))
+            self.assertIn('Office', str(res.data))
+            #the collection joined with its rooms
+            self.assertEqual(len(statements), 1)
     
     def test_add_collection_form(self):
         """Show add a new collection form."""
@@ -0,0 +1,40 @@
+"""HTTP Client Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_http_client.py
+
+from unittest import TestCase
+from unittest.mock import patch
+import http_client
+
+class TestHttpClient(TestCase):
+    """Tests for the shared HTTP client."""
+
+    def test_create_session(self):
+        """Test the session pools connections and retries failed requests with a backoff."""
+
+        session = http_client.create_session()
+        adapter = session.get_adapter('https://api.sunrise-sunset.org/json')
+
+        self.assertEqual(adapter._pool_maxsize, http_client.POOL_MAXSIZE)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(adapter.max_retries.total, http_client.MAX_RETRIES)
+        self.assertEqual(adapter.max_retries.read, http_client.MAX_READ_RETRIES)
+        self.assertEqual(adapter.max_retries.backoff_factor, http_client.BACKOFF_FACTOR)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+
+    def test_get_session(self):
+        """Test the session is shared in a process and recreated in a forked process."""
+
+        session = http_client.get_session()
+        self.assertIs(http_client.get_session(), session)
+
+        with patch('os.getpid', return_value=-1):
+            self.assertIsNot(http_client.get_session(), session)
+
+    def test_get_timeout(self):
+        """Test every request is sent with the connect and read timeouts."""
+
+        with patch.object(http_client.get_session(), 'get') as get:
+            http_client.get('https://api.sunrise-sunset.org/json', params={'lat': 47.6})
+
+        get.assert_called_once_with('https://api.sunrise-sunset.org/json', params={'lat': 47.6}, timeout=http_client.TIMEOUT)
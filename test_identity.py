@@ -0,0 +1,138 @@
+"""User Identity Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_identity.py
+
+import os
+import time
+from unittest import TestCase
+from models import *
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app
+import identity
+from identity import UserIdentity, IDENTITY_KEY, get_user_identity, get_current_identity, remember_user, forget_user, clear_identities
+from test_utils import count_queries
+
+class TestIdentity(TestCase):
+    """Tests for the cached identity of the logged in user."""
+
+    def setUp(self):
+        """Setup a test user and clear any cached identities."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        clear_identities()
+
+        self.user = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+        self.user.id = 1000
+        db.session.commit()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+
+        db.session.rollback()
+        db.session.remove()
+
+    def test_from_user(self):
+        """Test creating an identity from a user and storing it as a session dict."""
+
+        user_identity = UserIdentity.from_user(self.user)
+
+        self.assertEqual(user_identity.get_coordinates, {"latitude": "47.466748", "longitude": "-122.347220"})
+        self.assertEqual(user_identity.username, 'peppercat')
+        self.assertEqual(UserIdentity(**user_identity.to_dict()).to_dict(), user_identity.to_dict())
+        self.assertEqual(user_identity.load(), self.user)
+
+    def test_get_user_identity(self):
+        """Test the identity is loaded from the database once, then read from the process cache until it expires."""
+
+        with count_queries() as statements:
+            user_identity = get_user_identity(1000)
+            self.assertEqual(user_identity.name, 'Pepper Cat')
+            self.assertEqual(len(statements), 1)
+
+            self.assertIs(get_user_identity(1000), user_identity)
+            self.assertEqual(len(statements), 1)
+
+            user_identity.cached_at = time.time() - identity.IDENTITY_TTL
+            self.assertIsNot(get_user_identity(1000), user_identity)
+            self.assertEqual(len(statements), 2)
+
+        self.assertIsNone(get_user_identity(99))
+
+    def test_get_current_identity(self):
+        """Test the identity is read from the session without a query, and loaded into the session on a miss."""
+
+        session = {}
+
+        with app.test_request_context():
+            user_identity = get_current_identity(session, 1000)
+            self.assertEqual(session[IDENTITY_KEY]['name'], 'Pepper Cat')
+
+            clear_identities()
+            with count_queries() as statements:
+                self.assertEqual(get_current_identity(session, 1000).to_dict(), user_identity.to_dict())
+            self.assertEqual(len(statements), 0)
+
+            #a deleted user's identity is removed from the session so the user can be logged out
+            session = {IDENTITY_KEY: dict(user_identity.to_dict(), id=99, cached_at=1)}
+            self.assertIsNone(get_current_identity(session, 99))
+            self.assertNotIn(IDENTITY_KEY, session)
+
+    def test_refresh_identity(self):
+        """Test a refresh loads the identity from the database, so a user deleted by another process isn't served from the cache."""
+
+        session = {}
+        get_current_identity(session, 1000)
+
+        with count_queries() as statements:
+            self.assertEqual(get_current_identity(session, 1000, refresh=True).username, 'peppercat')
+        self.assertEqual(len(statements), 1)
+
+        #delete the user without forgetting the identity, like a delete in another worker process
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        self.assertEqual(get_current_identity(session, 1000).id, 1000)
+        self.assertIsNone(get_current_identity(session, 1000, refresh=True))
+        self.assertIsNone(get_user_identity(1000))
+        self.assertNotIn(IDENTITY_KEY, session)
+
+    def test_remember_and_forget_user(self):
+        """Test the session and cached identity are updated after a user changes, and removed on logout."""
+
+        session = {}
+        get_user_identity(1000)
+
+        self.user.name = 'Pepper'
+        db.session.commit()
+        remember_user(session, self.user)
+
+        with count_queries() as statements:
+            self.assertEqual(get_user_identity(1000).name, 'Pepper')
+            self.assertEqual(session[IDENTITY_KEY]['name'], 'Pepper')
+            self.assertEqual(len(statements), 0)
+
+            forget_user(session, 1000)
+            self.assertNotIn(IDENTITY_KEY, session)
+            self.assertEqual(get_user_identity(1000).name, 'Pepper')
+            self.assertEqual(len(statements), 1)
@@ -0,0 +1,73 @@
+"""Plant Image Processing Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_images.py
+
+from io import BytesIO
+from unittest import TestCase
+from PIL import Image
+from images import make_renditions, get_widths, ImageError
+
+def make_image(width, height, format='JPEG', mode='RGB', exif=None):
+    """Returns the bytes of a test image."""
+
+    img = Image.new(mode, (width, height), (40, 120, 40) if mode == 'RGB' else (40, 120, 40, 0))
+    buffer = BytesIO()
+    img.save(buffer, format, **({'exif': exif} if exif else {}))
+    return buffer.getvalue()
+
+class TestImages(TestCase):
+    """Tests for resizing plant images into renditions."""
+
+    def test_get_widths(self):
+        """Test images are never enlarged."""
+
+        self.assertEqual(get_widths(4032), [320, 640, 1280])
+        self.assertEqual(get_widths(800), [320, 640, 800])
+        self.assertEqual(get_widths(200), [200])
+
+    def test_make_renditions(self):
+        """Test an image is resized to WebP and JPEG renditions with content hashed keys."""
+
+        renditions = make_renditions(BytesIO(make_image(2000, 1500)), '1000/')
+
+        self.assertEqual([(r.width, r.content_type) for r in renditions], [
+            (320, 'image/webp'), (320, 'image/jpeg'),
+            (640, 'image/webp'), (640, 'image/jpeg'),
+            (1280, 'image/webp'), (1280, 'image/jpeg')])
+        self.assertRegex(renditions[0].key, r'^1000/[0-9a-f]{16}-320w\.webp$')
+        self.assertRegex(renditions[1].key, r'^1000/[0-9a-f]{16}-320w\.jpg$')
+
+        img = Image.open(BytesIO(renditions[1].body))
+        self.assertEqual((img.format, img.size), ('JPEG', (320, 240)))
+
+        #the same image gets the same keys
+        self.assertEqual([r.key for r in make_renditions(BytesIO(make_image(2000, 1500)), '1000/')], [r.key for r in renditions])
+
+    def test_exif_is_removed(self):
+        """Test the EXIF data is removed, and the image is rotated by its EXIF orientation first."""
+
+        exif = Image.Exif()
+        exif[0x0112] = 6 #rotated 90 degrees
+        exif[0x010f] = 'Pepper Cat Camera'
+
+        renditions = make_renditions(BytesIO(make_image(400, 300, exif=exif)), '1000/')
+
+        for rendition in renditions:
+            img = Image.open(BytesIO(rendition.body))
+            self.assertEqual(img.size, (300, 400))
+            self.assertNotIn('exif', img.info)
+            self.assertEqual(len(img.getexif()), 0)
+
+    def test_transparent_image(self):
+        """Test a transparent PNG is saved with a white background."""
+
+        renditions = make_renditions(BytesIO(make_image(100, 100, format='PNG', mode='RGBA')), '1000/')
+        img = Image.open(BytesIO(renditions[-1].body))
+
+        self.assertEqual(img.mode, 'RGB')
+        self.assertEqual(img.getpixel((50, 50)), (255, 255, 255))
+
+    def test_not_an_image(self):
+        """Test a file that isn't an image raises an ImageError."""
+
+        self.assertRaises(ImageError, make_renditions, BytesIO(b'hoya'), '1000/')
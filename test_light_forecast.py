@@ -0,0 +1,66 @@
+"""Light Forecast Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_light_forecast.py
+
+from unittest import TestCase
+from datetime import datetime, timedelta
+import light_forecast
+from light_forecast import LightForecast, get_light_forecast, clear_light_forecasts
+from solar_calculator import SolarCalculator
+
+SEATTLE = {"latitude": "47.466748", "longitude": "-122.34722"}
+PORTLAND = {"latitude": "45.520247", "longitude": "-122.674195"}
+
+class TestLightForecast(TestCase):
+    """Tests for the shared Light Forecast."""
+
+    def setUp(self):
+        """Clear the memoized forecasts."""
+        clear_light_forecasts()
+
+    def test_create_light_forecast(self):
+        """Test a light forecast holds every light type and matches the solar calculator."""
+
+        forecast = LightForecast(SEATTLE, datetime(2021, 5, 1), 10)
+        calculator = SolarCalculator(SEATTLE, datetime(2021, 5, 1), 7, 'West', offline=True)
+
+        self.assertEqual(len(forecast.daily_sunlight), 8)
+        self.assertEqual(len(forecast.get_daily_sunlight('North', 10)), 10)
+        self.assertEqual(list(forecast.get_daily_sunlight('West', 7)), calculator.get_daily_sunlight())
+
+        calculator.light_type = 'North'
+        self.assertEqual(list(forecast.get_daily_sunlight('North', 7)), calculator.get_daily_sunlight())
+
+    def test_get_average_hours(self):
+        """Test the average hours of a group of light types and intervals match averaging each slice of the forecast."""
+
+        forecast = LightForecast(SEATTLE, datetime(2021, 5, 1), 10)
+        average_hours = forecast.get_average_hours(['West', 'North', 'West'], [7, 10, 3])
+
+        for (light_type, days), hours in zip([('West', 7), ('North', 10), ('West', 3)], average_hours):
+            daily_sunlight = forecast.get_daily_sunlight(light_type, days)
+            self.assertAlmostEqual(hours, sum(daily_sunlight) / len(daily_sunlight) / 3600)
+
+    def test_get_light_forecast(self):
+        """Test forecasts are shared per location and start date, and a longer horizon is reused for shorter horizons."""
+
+        forecast1 = get_light_forecast(SEATTLE, datetime(2021, 5, 1, 9, 30), 14)
+        forecast2 = get_light_forecast(SEATTLE, datetime(2021, 5, 1, 17, 45), 7)
+        forecast3 = get_light_forecast(SEATTLE, datetime(2021, 5, 1), 21)
+        forecast4 = get_light_forecast(PORTLAND, datetime(2021, 5, 1), 7)
+        forecast5 = get_light_forecast(SEATTLE, datetime(2021, 5, 2), 7)
+
+        self.assertIs(forecast1, forecast2)
+        self.assertIsNot(forecast1, forecast3)
+        self.assertEqual(forecast3.horizon, 21)
+        self.assertIs(get_light_forecast(SEATTLE, datetime(2021, 5, 1), 14), forecast3)
+        self.assertIsNot(forecast4, forecast3)
+        self.assertIsNot(forecast5, forecast3)
+
+    def test_forecast_expiry(self):
+        """Test expired forecasts are recalculated."""
+
+        forecast = get_light_forecast(SEATTLE, datetime(2021, 5, 1), 7)
+        forecast.created_at = datetime.utcnow() - light_forecast.FORECAST_TTL - timedelta(seconds=1)
+
+        self.assertIsNot(get_light_forecast(SEATTLE, datetime(2021, 5, 1), 7), forecast)
@@ -0,0 +1,148 @@
+"""Ownership Checked Loader Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_loaders.py
+
+import os
+from unittest import TestCase
+from flask import g
+from werkzeug.exceptions import NotFound, Forbidden
+from models import *
+from datetime import datetime, timedelta
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app
+from loaders import load_collection, load_room, load_lightsource, load_plant, load_plant_schedule
+from test_utils import count_queries
+
+class TestLoaders(TestCase):
+    """Tests for the ownership checked loaders."""
+
+    def setUp(self):
+        """Setup DB rows and clear any old data."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        #delete any old data from the tables
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        #set up test user accounts
+        user1 = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+        user1.id = 1000
+
+        user2 = User.signup(
+            name='Kittenz Meow',
+            email='kittenz@gmail.com',
+            latitude='45.520247',
+            longitude='-122.674195',
+            username='kittenz',
+            password='meowmeow')
+        user2.id = 1200
+        db.session.commit()
+
+        db.session.add(Collection(id=1, name='Home', user_id=1000))
+        db.session.commit()
+        db.session.add(Room(id=1, name='Kitchen', collection_id=1))
+        db.session.commit()
+        db.session.add(LightSource(id=1, type='East', type_id=3, daily_total=8, room_id=1))
+        db.session.commit()
+        db.session.add(Plant(id=1, name='Calathea', user_id=1000, type_id=17, room_id=1, light_id=1))
+        db.session.commit()
+        db.session.add(WaterSchedule(id=1, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 8), water_interval=7, plant_id=1))
+        db.session.commit()
+
+        self.user1 = User.query.get(1000)
+        self.user2 = User.query.get(1200)
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def test_load_owned_rows(self):
+        """Test loading a row and its parent rows for the owner."""
+
+        with app.test_request_context():
+            g.user = self.user1
+
+            self.assertEqual(load_collection(1).name, 'Home')
+
+            room, collection = load_room(1)
+            self.assertEqual((room.id, collection.id), (1, 1))
+
+            lightsource, room, collection = load_lightsource(1)
+            self.assertEqual((lightsource.id, room.id, collection.id), (1, 1, 1))
+
+            plant, room, collection = load_plant(1)
+            self.assertEqual((plant.name, room.name, collection.name), ('Calathea', 'Kitchen', 'Home'))
+
+            plant, water_schedule, room, collection = load_plant_schedule(1)
+            self.assertEqual(water_schedule.plant_id, plant.id)
+            self.assertEqual(water_schedule.water_interval, 7)
+
+    def test_load_plant_with_schedule(self):
+        """Test the plant's one water schedule is loaded in the same query as the plant."""
+
+        with app.test_request_context():
+            g.user = self.user1
+            #expire the plant rows so they are loaded again (the user is refreshed before counting)
+            db.session.expire_all()
+            self.user1.id
+
+            with count_queries() as statements:
+                plant, room, collection = load_plant(1)
+                self.assertEqual(plant.water_schedule.id, 1)
+                self.assertIs(plant.water_schedule.plant, plant)
+
+            self.assertEqual(len(statements), 1)
+
+    def test_load_missing_rows(self):
+        """Test a 404 is raised for rows that don't exist."""
+
+        with app.test_request_context():
+            g.user = self.user1
+
+            self.assertRaises(NotFound, load_collection, 99)
+            self.assertRaises(NotFound, load_room, 99)
+            self.assertRaises(NotFound, load_lightsource, 99)
+            self.assertRaises(NotFound, load_plant, 99)
+            self.assertRaises(NotFound, load_plant_schedule, 99)
+
+    def test_load_forbidden_rows(self):
+        """Test a 403 is raised for rows owned by another user."""
+
+        with app.test_request_context():
+            g.user = self.user2
+
+            self.assertRaises(Forbidden, load_collection, 1)
+            self.assertRaises(Forbidden, load_room, 1)
+            self.assertRaises(Forbidden, load_lightsource, 1)
+            self.assertRaises(Forbidden, load_plant, 1)
+            self.assertRaises(Forbidden, load_plant_schedule, 1)
+
+    def test_forbidden_json(self):
+        """Test JSON requests for rows owned by another user get a JSON 403 response."""
+
+        with app.test_client() as client:
+            with client.session_transaction() as session:
+                session['current_user'] = 1200
+
+            res = client.post('/water-manager/1/snooze', json={'notes': 'Not my plant!'})
+
+            self.assertEqual(res.status_code, 403)
+            self.assertEqual(res.json, {"access": "DENIED"})
@@ -48,4 +48,4 @@ class TestUserLocation(TestCase):
         self.assertEqual(self.bejing.get_coordinates(), {'lat': 39.905963, 'lng': 116.391248})
 
         self.assertIsNone(self.vague_city.get_coordinates())
-        self.assertIsNone(self.fake_city.get_coordinates())
\ No newline at end of file
+        self.assertIsNone(self.fake_city.get_coordinates())
@@ -5,6 +5,7 @@
 import os
 from io import BytesIO
 # from csv import DictReader
+import tempfile
 from unittest import TestCase
 from models import *
 from datetime import datetime, timedelta
@@ -13,10 +14,16 @@ from datetime import datetime, timedelta
 os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
 
 from app import *
+from storage import LocalStorage, set_storage, get_storage
 
 #disable WTForms CSRF validation
 app.config['WTF_CSRF_ENABLED'] = False
 
+#save uploads to a temporary folder instead of the S3 bucket
+set_storage(LocalStorage(root=tempfile.mkdtemp(), url='/static/uploads/user/'))
+#upload images in the request instead of the background worker
+app.config['UPLOAD_ASYNC'] = False
+
 class TestPlantViews(TestCase):
     """A class to test plant views and functionality in the app."""
 
@@ -106,13 +113,9 @@ class TestPlantViews(TestCase):
         db.session.rollback()
         db.session.remove()
 
-        #delete the s3 folders that were created for test_add_plant and test_edit_plant
-        s3 = boto3.resource('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-        bucket = s3.Bucket(BUCKET_NAME)
-        for key in bucket.objects.filter(Prefix=f'uploads/user/{1000}/'):
-            key.delete()
-        for key in bucket.objects.filter(Prefix=f'uploads/user/{1200}/'):
-            key.delete()
+        #delete the upload folders that were created for test_add_plant and test_edit_plant
+        get_storage().delete_prefix('1000/')
+        get_storage().delete_prefix('1200/')
 
     def test_view_plant_details(self):
         """View a plant's details by plant ID."""
@@ -0,0 +1,87 @@
+"""Reference Data Cache Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_reference.py
+
+import os
+from unittest import TestCase
+from werkzeug.exceptions import NotFound
+from models import *
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app
+from forms import AddPlantForm, AddLightSource
+from reference import get_plant_types, get_light_types, get_plant_type, load_plant_type, preload_reference, clear_reference
+from test_utils import count_queries
+
+app.config['WTF_CSRF_ENABLED'] = False
+
+class TestReference(TestCase):
+    """Tests for the cached PlantTypes and LightTypes."""
+
+    def setUp(self):
+        """Clear the reference cache."""
+
+        db.session.rollback()
+        db.session.remove()
+        clear_reference()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+
+        clear_reference()
+        db.session.rollback()
+        db.session.remove()
+
+    def test_preload_reference(self):
+        """Test each reference table is queried once, then served from the cache."""
+
+        with count_queries() as statements:
+            preload_reference()
+        self.assertEqual(len(statements), 2)
+
+        self.assertEqual([light.type for light in get_light_types()], [light.type for light in LightType.query.order_by(LightType.id)])
+        self.assertEqual(len(get_plant_types()), PlantType.query.count())
+
+        with count_queries() as statements:
+            self.assertEqual(get_plant_type(37).name, PlantType.query.get(37).name)
+            self.assertIsNone(get_plant_type(99999))
+            self.assertRaises(NotFound, load_plant_type, 99999)
+        self.assertEqual(len(statements), 1)
+
+    def test_cached_rows_are_detached(self):
+        """Test the cached rows can be read after a commit expires the session."""
+
+        plant_type = get_plant_type(37)
+        db.session.commit()
+        db.session.remove()
+
+        self.assertEqual(plant_type.name, PlantType.query.get(37).name)
+
+    def test_clear_reference(self):
+        """Test the reference tables are loaded again after the cache is cleared."""
+
+        get_plant_types()
+        clear_reference()
+
+        with count_queries() as statements:
+            get_plant_types()
+        self.assertEqual(len(statements), 1)
+
+    def test_forms(self):
+        """Test the plant and light forms render and validate their choices from the cache."""
+
+        get_plant_types()
+        get_light_types()
+
+        with app.test_request_context(method='POST', data={'light_type': ['1', '3']}), count_queries() as statements:
+            form = AddLightSource()
+            self.assertIn('North', form.light_type())
+            self.assertTrue(form.validate())
+            self.assertEqual([light.id for light in form.light_type.data], [1, 3])
+
+            form = AddPlantForm()
+            self.assertIn(get_plant_type(37).name, form.plant_type())
+
+            self.assertEqual(len(statements), 0)
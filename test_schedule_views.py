@@ -5,6 +5,7 @@
 import os
 from io import BytesIO
 from dotenv import load_dotenv
+import tempfile
 from unittest import TestCase
 from models import *
 from datetime import datetime, timedelta, date
@@ -13,10 +14,16 @@ from datetime import datetime, timedelta, date
 os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
 
 from app import *
+from storage import LocalStorage, set_storage, get_storage
 
 #disable WTForms CSRF validation
 app.config['WTF_CSRF_ENABLED'] = False
 
+#save uploads to a temporary folder instead of the S3 bucket
+set_storage(LocalStorage(root=tempfile.mkdtemp(), url='/static/uploads/user/'))
+#upload images in the request instead of the background worker
+app.config['UPLOAD_ASYNC'] = False
+
 class TestScheduleViews(TestCase):
     """A class to test the schedule views and functionality in the app."""
 
@@ -96,11 +103,8 @@ class TestScheduleViews(TestCase):
         db.session.rollback()
         db.session.remove()
 
-        #delete the s3 folders that were created for test_create_water_schedule
-        s3 = boto3.resource('s3', aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'), aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-        bucket = s3.Bucket(BUCKET_NAME)
-        for key in bucket.objects.filter(Prefix=f'uploads/user/{1000}/'):
-            key.delete()
+        #delete the upload folders that were created for test_create_water_schedule
+        get_storage().delete_prefix('1000/')
     
     def test_create_water_schedule(self):
         """Test that a new water schedule is created when a new plant is created."""
@@ -147,6 +151,33 @@ class TestScheduleViews(TestCase):
             self.assertIn('Calathea', str(res.data))
             self.assertNotIn('Hoya', str(res.data))
 
+    def test_view_water_manager_user_plants(self):
+        """Test that the Water Manager only shows the user's own plants that are ready to water."""
+
+        #user1's plant that is ready to water.
+        plant1 = Plant(id=1, name='Hoya', user_id=1000, type_id=37, room_id=1, light_id=1)
+        ws1 = WaterSchedule(id=1, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 5), water_interval=7, plant_id=1)
+
+        #user2's plant that is ready to water.
+        plant2 = Plant(id=2, name='Calathea', user_id=1200, type_id=17, room_id=2, light_id=2)
+        ws2 = WaterSchedule(id=2, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 5), water_interval=7, plant_id=2)
+
+        db.session.add_all([plant1, plant2, ws1, ws2])
+        db.session.commit()
+
+        due_schedules = WaterSchedule.get_due_schedules(1000, datetime.today())
+        self.assertEqual([(plant.id, schedule.id) for plant, schedule in due_schedules], [(1, 1)])
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user1.id
+
+            res = c.get('/water-manager')
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Hoya', str(res.data))
+            self.assertIn('Last watered 05/01/2021', str(res.data))
+            self.assertNotIn('Calathea', str(res.data))
+
     def test_water_plant(self):
         """Test that a plant's water schedule is updated when a plant is watered."""
 
@@ -246,6 +277,73 @@ class TestScheduleViews(TestCase):
     
             self.assertEqual(wh.notes, 'Watering my test Hoya!')
             self.assertEqual(wh.water_date, ws.water_date)
+
+    def test_water_plants_batch(self):
+        """Test that a batch of plants is watered and snoozed in one request, and another user's plant isn't changed."""
+
+        #an auto schedule with a natural light source, a manual schedule, and a plant to snooze
+        plants = [Plant(id=i, name=f'Calathea {i}', user_id=1000, type_id=17, room_id=1, light_id=1) for i in range(2, 5)]
+        schedules = [
+            WaterSchedule(id=2, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 5), water_interval=7, plant_id=2),
+            WaterSchedule(id=3, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 5), water_interval=5, manual_mode=True, plant_id=3),
+            WaterSchedule(id=4, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 5), water_interval=7, plant_id=4)]
+        hoya = Plant(id=1, name='Hoya', user_id=1200, type_id=37, room_id=2, light_id=2)
+        hoya_schedule = WaterSchedule(id=1, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 5), water_interval=10, plant_id=1)
+
+        db.session.add_all(plants + [hoya])
+        db.session.commit()
+        db.session.add_all(schedules + [hoya_schedule])
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user1.id
+
+            res = c.post('/water-manager/batch', json={'plants': [
+                {'id': 2, 'action': 'water', 'notes': 'Watering my test Calathea!'},
+                {'id': 3, 'action': 'water'},
+                {'id': 4, 'action': 'snooze', 'notes': 'Still damp.'},
+                {'id': 1, 'action': 'water'}]})
+
+            self.assertEqual(res.status_code, 201)
+            self.assertEqual([(plant['id'], plant['status']) for plant in res.json['plants']],
+                [(2, 'watered'), (3, 'watered'), (4, 'snoozed'), (1, 'not_found')])
+
+            db.session.expire_all()
+
+            #the auto schedule's interval is recalculated, the manual schedule's interval is kept
+            ws2, ws3, ws4 = WaterSchedule.query.get(2), WaterSchedule.query.get(3), WaterSchedule.query.get(4)
+            self.assertNotEqual(ws2.water_date, datetime(2021, 5, 1))
+            self.assertNotEqual(ws2.water_interval, 7)
+            self.assertEqual(ws3.water_interval, 5)
+            self.assertEqual(ws3.next_water_date, ws3.water_date + timedelta(days=5))
+            self.assertEqual(ws4.water_date, datetime(2021, 5, 1))
+            self.assertEqual(ws4.next_water_date.date(), (datetime.today() + timedelta(days=3)).date())
+
+            self.assertEqual(WaterHistory.query.filter_by(plant_id=2).one().notes, 'Watering my test Calathea!')
+            self.assertEqual(WaterHistory.query.filter_by(plant_id=4).one().snooze, 3)
+            self.assertEqual(WaterHistory.query.filter_by(plant_id=1).count(), 0)
+            self.assertEqual(WaterSchedule.query.get(1).next_water_date, datetime(2021, 5, 5))
+
+    def test_water_plants_batch_invalid(self):
+        """Test that an invalid batch is rejected without changing any plants."""
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user1.id
+
+            for data in [{}, {'plants': []}, {'plants': [{'id': 'two'}]}, {'plants': [{'id': 2, 'action': 'prune'}]},
+                    {'plants': [{'id': 2}, {'id': 2}]}, {'plants': [{'id': 2, 'notes': 'x' * 201}]}]:
+                res = c.post('/water-manager/batch', json=data)
+                self.assertEqual(res.status_code, 400)
+                self.assertEqual(res.json['status'], 'INVALID')
+
+            app.config['WATER_MANAGER_MAX_BATCH'] = 2
+            res = c.post('/water-manager/batch', json={'plants': [{'id': i} for i in range(3)]})
+            app.config['WATER_MANAGER_MAX_BATCH'] = 500
+            self.assertEqual(res.status_code, 400)
+
+            self.assertEqual(WaterHistory.query.count(), 0)
     
     def test_edit_water_schedule_form(self):
         """View a form to edit a Water Schedule."""
@@ -325,3 +423,76 @@ class TestScheduleViews(TestCase):
             self.assertIn('05/10/2021', str(res.data))
             self.assertIn('Watered my plant.', str(res.data))
 
+
+    def test_view_water_history_pages(self):
+        """View a plant's water history one page at a time, newest first."""
+
+        plant1 = Plant(id=1, name='Hoya', user_id=1200, type_id=37, room_id=2, light_id=2)
+        ws1 = WaterSchedule(id=1, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 10), water_interval=10, plant_id=1)
+        db.session.add_all([plant1, ws1])
+        db.session.commit()
+
+        #30 days of history, two events on the last day
+        history = [WaterHistory(id=i, water_date=datetime(2021, 4, i), notes=f'Note {i}.', plant_id=1, water_schedule_id=1) for i in range(1, 31)]
+        history.append(WaterHistory(id=31, water_date=datetime(2021, 4, 30), snooze=3, notes='Note 31.', plant_id=1, water_schedule_id=1))
+        db.session.add_all(history)
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user2.id
+
+            res = c.get('/collection/room/plant/1/water-history')
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Note 31.', str(res.data))
+            self.assertIn('Note 7.', str(res.data))
+            self.assertNotIn('Note 6.', str(res.data))
+            self.assertIn('Older', str(res.data))
+            self.assertIn('before=2021-04-07T00%3A00%3A00_7', str(res.data))
+
+            res = c.get('/collection/room/plant/1/water-history?before=2021-04-07T00:00:00_7')
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Note 6.', str(res.data))
+            self.assertNotIn('Note 7.', str(res.data))
+            self.assertNotIn('Older', str(res.data))
+
+            res = c.get('/collection/room/plant/1/water-history?before=yesterday')
+            self.assertEqual(res.status_code, 400)
+
+    def test_get_water_history_json(self):
+        """Get a plant's water history as JSON pages."""
+
+        plant1 = Plant(id=1, name='Hoya', user_id=1200, type_id=37, room_id=2, light_id=2)
+        ws1 = WaterSchedule(id=1, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 10), water_interval=10, plant_id=1)
+        db.session.add_all([plant1, ws1])
+        db.session.commit()
+
+        db.session.add_all([WaterHistory(id=i, water_date=datetime(2021, 4, i), notes=f'Note {i}.', plant_id=1, water_schedule_id=1) for i in range(1, 6)])
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user2.id
+
+            res = c.get('/collection/room/plant/1/water-history/json?per_page=2')
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual([history['id'] for history in res.json['water_history']], [5, 4])
+            self.assertEqual(res.json['water_history'][0], {"id": 5, "water_date": "2021-04-05T00:00:00", "snooze": None, "notes": "Note 5."})
+            self.assertEqual(res.json['next'], '2021-04-04T00:00:00_4')
+
+            ids = []
+            before = None
+            while True:
+                res = c.get('/collection/room/plant/1/water-history/json', query_string={'per_page': 2, 'before': before} if before else {'per_page': 2})
+                ids.extend(history['id'] for history in res.json['water_history'])
+                before = res.json['next']
+                if before is None:
+                    break
+
+            self.assertEqual(ids, [5, 4, 3, 2, 1])
+
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = 1000
+
+            res = c.get('/collection/room/plant/1/water-history/json')
+            self.assertEqual(res.status_code, 403)
@@ -0,0 +1,105 @@
+"""Solar Day Cache Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_solar_cache.py
+
+import os
+from unittest import TestCase
+from datetime import datetime, timedelta
+from models import db, SolarDay
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app
+from solar_cache import SolarDayCache
+
+RESULTS = {'sunrise': 46212, 'sunset': 12121, 'solar_noon': 72367, 'day_length': 52309}
+
+class TestSolarDayCache(TestCase):
+    """Tests for the Solar Day Cache."""
+
+    def setUp(self):
+        """Clear any old cached solar days and create a small cache."""
+
+        db.session.rollback()
+        db.session.query(SolarDay).delete()
+        db.session.commit()
+
+        self.cache = SolarDayCache(max_rows=3, ttl=timedelta(days=30), evict_interval=1)
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def test_get_key(self):
+        """Test rounding coordinates to 0.1 degrees and converting datetimes into dates."""
+
+        key1 = self.cache.get_key('47.466748', '-122.34722', datetime(2021, 5, 1, 13, 30))
+        key2 = self.cache.get_key(47.45, -122.31, datetime(2021, 5, 1))
+
+        self.assertEqual(key1, key2)
+        self.assertEqual(str(key1[0]), '47.5')
+        self.assertEqual(str(key1[1]), '-122.3')
+
+    def test_get_and_set(self):
+        """Test reading through the cache. Nearby coordinates on the same date share cached data."""
+
+        self.assertIsNone(self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 1)))
+
+        self.cache.set('47.466748', '-122.34722', datetime(2021, 5, 1), RESULTS)
+        db.session.commit()
+
+        self.assertEqual(self.cache.get('47.45', '-122.31', datetime(2021, 5, 1)), RESULTS)
+        self.assertIsNone(self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 2)))
+
+    def test_lru_eviction(self):
+        """Test the least recently used rows are evicted when the cache is full."""
+
+        for day in range(1, 4):
+            self.cache.set('47.466748', '-122.34722', datetime(2021, 5, day), RESULTS)
+        db.session.commit()
+
+        # read the oldest row so it becomes the most recently used
+        self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 1))
+        self.cache.set('47.466748', '-122.34722', datetime(2021, 5, 4), RESULTS)
+        db.session.commit()
+
+        self.assertEqual(SolarDay.query.count(), 3)
+        self.assertIsNotNone(self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 1)))
+        self.assertIsNone(self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 2)))
+
+    def test_evict_interval(self):
+        """Test the LRU bound is only checked every evict_interval writes."""
+
+        cache = SolarDayCache(max_rows=1, ttl=timedelta(days=30), evict_interval=1000000)
+
+        for day in range(1, 4):
+            cache.set('47.466748', '-122.34722', datetime(2021, 5, day), RESULTS)
+        db.session.commit()
+
+        self.assertEqual(SolarDay.query.count(), 3)
+
+    def test_set_existing_day(self):
+        """Test storing a day that another request already stored keeps the stored row and doesn't roll back the session."""
+
+        other = SolarDay(latitude=47.5, longitude=-122.3, date=datetime(2021, 5, 1).date(), **RESULTS)
+        db.session.add(other)
+        db.session.flush()
+
+        self.cache.set('47.466748', '-122.34722', datetime(2021, 5, 1), {**RESULTS, 'sunrise': 1})
+        db.session.commit()
+
+        self.assertEqual(SolarDay.query.count(), 1)
+        self.assertEqual(self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 1)), RESULTS)
+
+    def test_ttl_expiry(self):
+        """Test rows older than the ttl are treated as a miss."""
+
+        self.cache.set('47.466748', '-122.34722', datetime(2021, 5, 1), RESULTS)
+        solar_day = SolarDay.query.first()
+        solar_day.fetched_at = datetime.utcnow() - timedelta(days=31)
+        db.session.commit()
+
+        self.assertIsNone(self.cache.get('47.466748', '-122.34722', datetime(2021, 5, 1)))
+        self.assertEqual(SolarDay.query.count(), 0)
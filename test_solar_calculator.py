@@ -2,9 +2,12 @@
 
 # FLASK_ENV=production python3 -m unittest test_solar_calculator.py
 
+import time
+import numpy as np
 from unittest import TestCase
-from datetime import date, datetime, timedelta, timezone
-from tzlocal import get_localzone
+from unittest.mock import patch
+from requests.exceptions import ConnectionError, RequestException
+from datetime import datetime, timedelta
 from solar_calculator import SolarCalculator
 
 BASE_URL = 'https://api.sunrise-sunset.org/json'
@@ -125,37 +128,59 @@ class TestSolarCalculator(TestCase):
         self.assertIsInstance(list1[5], datetime)
         self.assertIsInstance(list2[12], datetime)
     
-    def test_convert_str_to_datetime(self):
-        """Test taking a datetime object and a string and combining both into a datetime object."""
+    def test_generate_day_offsets(self):
+        """Test generating an array of day offsets for the batched mode."""
 
-        date1 = datetime(1990, 1, 5)
-        date2 = datetime(2021, 4, 21)
-        time1 = '1:30:20 PM'
-        time2 = '9:55:17 AM'
+        offsets = self.test1.generate_day_offsets()
 
-        conversion1 = self.test1.convert_str_to_datetime(date1, time1)
-        conversion2 = self.test2.convert_str_to_datetime(date2, time2)
+        self.assertEqual(len(offsets), 10)
+        self.assertEqual(offsets[0], 1)
+        self.assertEqual(offsets[9], 10)
+
+    def test_adjust_for_fractional_timezone(self):
+        """Test adjusting the API results in a fractional timezone like +5:30 (not dropped because it is not a whole number of hours)."""
+
+        kolkata = SolarCalculator(
+            user_location={"latitude": "22.572645", "longitude": "88.363892"},
+            current_date=datetime(2021, 3, 10),
+            water_interval=7,
+            light_type="East")
+
+        results = {'sunrise': '2021-03-13T00:27:47+00:00', 'sunset': '2021-03-13T12:22:31+00:00', 'solar_noon': '2021-03-13T06:25:09+00:00', 'day_length': 42884}
+        day = kolkata.adjust_for_timezone(datetime(2021, 3, 13), kolkata.parse_results(datetime(2021, 3, 13), results))
+        self.assertIsNotNone(day)
+        self.assertEqual(day['sunrise'], 27 * 60 + 47)
+        self.assertEqual(day['sunset'], 12 * 3600 + 22 * 60 + 31)
+
+        # in May sunrise in Kolkata (+5:30) is on the previous day in UTC time, so sunrise is moved back instead of sunset moving forward
+        results = {'sunrise': '2021-05-30T23:22:10+00:00', 'sunset': '2021-05-30T12:47:20+00:00', 'solar_noon': '2021-05-30T06:04:45+00:00', 'day_length': 48310}
+        day = kolkata.adjust_for_timezone(datetime(2021, 5, 30), kolkata.parse_results(datetime(2021, 5, 30), results))
+        self.assertEqual(day['sunrise'], 84130 - 86400)
+        self.assertEqual(day['sunset'], 46040)
+        self.assertEqual(kolkata.get_light_duration(day, 'East', {}), 24155)
+        self.assertEqual(kolkata.get_light_duration(day, 'West', {}), 24155)
+
+    def test_parse_results(self):
+        """Test converting the ISO 8601 API results into seconds from midnight UTC and adjusting them for the timezone."""
+
+        results = {'sunrise': '2021-05-01T12:50:12+00:00', 'sunset': '2021-05-01T03:22:01+00:00', 'solar_noon': '2021-05-01T20:06:07+00:00', 'day_length': 52309}
+        seattle = self.test1.parse_results(datetime(2021, 5, 1), results)
+
+        self.assertEqual(seattle, {'sunrise': 46212, 'sunset': 12121, 'solar_noon': 72367, 'day_length': 52309})
+
+        # sunset falls on the following day in UTC time for timezones -12 to +5
+        day1 = self.test1.adjust_for_timezone(datetime(2021, 5, 1), seattle)
+        self.assertEqual(day1['sunset'], 12121 + 86400)
+        self.assertEqual(day1['sunrise'], 46212)
+        self.assertEqual(self.test1.get_light_duration(day1, 'West', {}), 26154)
+
+        # sunrise falls on the previous day in UTC time for timezones +6 to +14
+        results = {'sunrise': '2021-05-30T20:50:27+00:00', 'sunset': '2021-05-30T06:54:02+00:00', 'solar_noon': '2021-05-30T01:52:15+00:00', 'day_length': 36215}
+        day2 = self.sydney.adjust_for_timezone(datetime(2021, 5, 30), self.sydney.parse_results(datetime(2021, 5, 30), results))
+        self.assertEqual(day2['sunrise'], 75027 - 86400)
+        self.assertEqual(day2['sunset'], 24842)
+        self.assertEqual(self.sydney.get_light_duration(day2, 'East', {}), 18108)
 
-        self.assertIsInstance(conversion1, datetime)
-        self.assertIsInstance(conversion2, datetime)
-        self.assertEqual(conversion1, datetime(1990, 1, 5, 13, 30, 20))
-        self.assertEqual(conversion2, datetime(2021, 4, 21, 9, 55, 17))
-    
-    def test_convert_12_to_24(self):
-        """Test converting a 12-hour format string time into a 24-hour format string time."""
-
-        time1 = '01:09:55 PM'
-        time2 = '03:17:20 PM'
-        time3 = '12:40:01 PM'
-        time4 = '10:30:45 AM'
-        time5 = '12:00:59 AM'
-
-        self.assertEqual(self.test1.convert_12_to_24(time1), '13:09:55')
-        self.assertEqual(self.test1.convert_12_to_24(time2), '15:17:20')
-        self.assertEqual(self.test1.convert_12_to_24(time3), '12:40:01')
-        self.assertEqual(self.test1.convert_12_to_24(time4), '10:30:45')
-        self.assertEqual(self.test1.convert_12_to_24(time5), '00:00:59')
-    
     def test_get_data(self):
         """Test getting data from the sunrise/sunset API for a specific day/time."""
 
@@ -195,6 +220,81 @@ class TestSolarCalculator(TestCase):
         self.assertEqual(day3['sunset'].hour, 6)
         self.assertEqual(day3['sunset'].minute, 54)
 
+    def test_get_concurrent_data(self):
+        """Test fetching the solar schedule from the API in parallel.
+        The API is replaced by a slow fake so the test checks the order of the results and the total wait time."""
+
+        def slow_fetch(day):
+            time.sleep(0.2)
+            return {'sunrise': 46212, 'sunset': 12121, 'solar_noon': 72367, 'day_length': 52309}
+
+        self.test1.concurrent = True
+
+        with patch.object(self.test1, 'fetch_results', side_effect=slow_fetch):
+            start = time.perf_counter()
+            solar_schedule = self.test1.get_solar_schedule()
+            elapsed = time.perf_counter() - start
+
+        # 10 sequential requests would take at least 2 seconds
+        self.assertLess(elapsed, 1)
+        self.assertEqual(len(solar_schedule), 10)
+        self.assertEqual([day['date'] for day in solar_schedule], self.test1.generate_dates())
+        self.assertEqual(solar_schedule[0]['solar_noon'], datetime(2021, 5, 2, 20, 6, 7))
+
+    def test_get_concurrent_data_failed_day(self):
+        """Test a day that can't be fetched fails the whole concurrent schedule with a RequestException instead of a missing day."""
+
+        results = {'sunrise': 46212, 'sunset': 12121, 'solar_noon': 72367, 'day_length': 52309}
+        failed_day = self.test1.generate_dates()[3]
+
+        def failing_fetch(day):
+            if day == failed_day:
+                raise ConnectionError('Connection refused')
+            return results
+
+        def not_ok_fetch(day):
+            return None if day == failed_day else results
+
+        self.test1.concurrent = True
+
+        for fetch in (failing_fetch, not_ok_fetch):
+            with patch.object(self.test1, 'fetch_results', side_effect=fetch):
+                with self.assertRaises(RequestException):
+                    self.test1.get_daily_sunlight()
+
+    def test_get_offline_data(self):
+        """Test calculating the solar data for a specific day/time with the offline solar position engine."""
+
+        day1 = self.test1.get_offline_data(datetime(2021, 5, 2))
+        day2 = self.sydney.get_offline_data(datetime(2021, 5, 30))
+
+        self.assertEqual(day1['date'], datetime(2021, 5, 2))
+        self.assertIsInstance(day1['sunrise'], datetime)
+        self.assertIsInstance(day1['day_length'], datetime)
+
+        # "latitude": "47.466748", "longitude": "-122.34722"
+        # sunset falls on the next day in UTC time
+        self.assertEqual(day1['sunrise'].day, 2)
+        self.assertEqual(day1['sunrise'].hour, 12)
+        self.assertEqual(day1['solar_noon'].day, 2)
+        self.assertEqual(day1['solar_noon'].hour, 20)
+        self.assertEqual(day1['sunset'].day, 3)
+        self.assertEqual(day1['sunset'].hour, 3)
+        self.assertEqual(day1['day_length'].hour, 14)
+
+        # "latitude": "-33.865143", "longitude": "151.209900"
+        # sunrise falls on the previous day in UTC time
+        self.assertEqual(day2['sunrise'].day, 29)
+        self.assertEqual(day2['sunrise'].hour, 20)
+        self.assertEqual(day2['sunset'].day, 30)
+        self.assertEqual(day2['sunset'].hour, 6)
+        self.assertAlmostEqual(day2['sunset'] - day2['sunrise'], day2['day_length'] - datetime(2021, 5, 30), delta=timedelta(seconds=1))
+
+        self.test1.offline = True
+        solar_schedule = self.test1.get_solar_schedule()
+        self.assertEqual(len(solar_schedule), 10)
+        self.assertEqual(solar_schedule[0], day1)
+
 
     def test_get_solar_schedule(self):
         """Test calculating and building the solar schedule a list containting:
@@ -212,54 +312,10 @@ class TestSolarCalculator(TestCase):
         self.assertEqual(solar_schedule2[0]['date'], datetime(2021, 5, 2))
         self.assertEqual(solar_schedule2[20]['date'], datetime(2021, 5, 22))
     
-    def test_get_fraction_of_time(self): 
-        """Take a timedelta and a fraction and return a timedelta that is a fraction of that time."""
-
-        solar_schedule1 = self.test1.get_solar_schedule()
-        solar_schedule2 = self.test2.get_solar_schedule()
-
-        day_length1 = solar_schedule1[0]['day_length'].time() # 14:34:31
-        day_length2 = solar_schedule1[1]['day_length'].time() # 14:37:26
-        day_length3 = solar_schedule1[2]['day_length'].time() # 14:40:19
-        day_length4 = solar_schedule2[0]['day_length'].time() # 14:24:19
-        day_length5 = solar_schedule2[1]['day_length'].time() # 14:27:02
-        day_length6 = solar_schedule2[2]['day_length'].time() # 14:29:42
-
-        fraction1 = 0.0625 # 1/16
-        fraction2 = 0.125 # 1/8
-        fraction3 = 0.75 # 3/4
-        fraction4 = 0.875 # 7/8
-        fraction5 = 0.50 # 1/2
-        #use http://www.csgnetwork.com/fracttimeconv.html to check math
-
-        # 14.575277777777778 * 0.875 = 12.7533 = 12:45:10
-        #12:45:12.125000 = timedelta(seconds=45912, microseconds=125000)
-        self.assertEqual(self.test1.get_fraction_of_time(day_length1, fraction4), timedelta(seconds=45912, microseconds=125000))
-
-        # 14.623888888888889 * 0.0625 = 0.9139 = 0:54:50
-        #0:54:50.375000 = timedelta(seconds=3290, microseconds=375000)
-        self.assertEqual(self.test1.get_fraction_of_time(day_length2, fraction1), timedelta(seconds=3290, microseconds=375000))
-
-        # 14.671944444444444 * 0.125 = 1.8339 = 1:50:02
-        # 1:50:02.375000 = timedelta(seconds=6602, microseconds=375000)
-        self.assertEqual(self.test1.get_fraction_of_time(day_length3, fraction2), timedelta(seconds=6602, microseconds=375000))
-
-        # 14.405277777777778 * 0.75 = 10.8039 = 10:48:10
-        # 10:48:14.250000 = timedelta(seconds=38894, microseconds=250000)
-        self.assertEqual(self.test2.get_fraction_of_time(day_length4, fraction3), timedelta(seconds=38894, microseconds=250000))
-    
-        # 14.450555555555555 * 0.5 = 7.2252 = 7:13:30
-        # 7:13:31 = timedelta(seconds=26011, microseconds=0)
-        self.assertEqual(self.test2.get_fraction_of_time(day_length5, fraction5), timedelta(seconds=26011, microseconds=0))
-
-        # 14.495 * 0.75 = 10.8712 = 10:52:15
-        # 10:52:16.500000 = timedelta(seconds=39136, microseconds=500000)
-        self.assertEqual(self.test2.get_fraction_of_time(day_length6, fraction3), timedelta(seconds=39136, microseconds=500000))
-
     def test_get_daily_sunlight(self):
         """This is the main function of this class that uses all of the other functions to calculate the max daily
         total hours a plant recieves given the user location, current date (the water date), water interval (how many days
-        until the next water), and light type. Calculates a timedelta list for the max hours for each day."""
+        until the next water), and light type. Calculates a list of the max seconds of light for each day."""
 
 
         daily_sunlight1 = self.test1.get_daily_sunlight()
@@ -282,9 +338,9 @@ class TestSolarCalculator(TestCase):
         # print('Solar Noon: ', solar_schedule1[0]['solar_noon'].time())
         # print('Sunset: ', solar_schedule1[0]['sunset'].time())
         #
-        # light type is West. Calculation is (sunset_times[i] - solar_noon_times[i]) = timedelta
+        # light type is West. Calculation is (sunset_times[i] - solar_noon_times[i]) = seconds
         # (solar_noon = 20:06:15 5/2/21) to (sunset = 03:23:31 5/3/21) ~ 7:17:16
-        self.assertEqual(daily_sunlight1[0], timedelta(seconds=26236))
+        self.assertEqual(daily_sunlight1[0], 26236)
 
         # for day in daily_sunlight1:
         #     print(day)
@@ -292,10 +348,10 @@ class TestSolarCalculator(TestCase):
         # solar_schedule3 = self.test3.get_solar_schedule()
         # print('Sunrise: ', solar_schedule3[0]['sunrise'].time())
         # print('Solar Noon: ', solar_schedule3[0]['solar_noon'].time())
-        #light type is East. Calculation is sunrise_times[i] - solar_noon_times[i] = timedelta
+        #light type is East. Calculation is sunrise_times[i] - solar_noon_times[i] = seconds
         # (sunrise = 05:55:24) - (solar_noon = 13:07:34) = 7:12:10
 
-        self.assertEqual(daily_sunlight3[0], timedelta(seconds=25930))
+        self.assertEqual(daily_sunlight3[0], 25930)
 
         # for day in daily_sunlight3:
         #     print(day)
@@ -304,10 +360,10 @@ class TestSolarCalculator(TestCase):
         # print('Solar Noon: ', solar_schedule2[0]['solar_noon'].time())
         # print('Sunset: ', solar_schedule2[0]['sunset'].time())
         #
-        # light type is West. Calculation is (sunset_times[i] - solar_noon_times[i]) = timedelta
+        # light type is West. Calculation is (sunset_times[i] - solar_noon_times[i]) = seconds
         # (sunset = 06:54:50 5/30/21) - (solar_noon = 01:52:45 5/30/21) ~ 5:02:06
 
-        # self.assertEqual(daily_sunlight2[0], timedelta(seconds=18126)) #this is for Sydney Australia +10 UTC. this will fail with current local TZ but will pass if 1 day is subtracted from sunrise and 0 days change from sunset
+        # self.assertEqual(daily_sunlight2[0], 18126) #this is for Sydney Australia +10 UTC. this will fail with current local TZ but will pass if 1 day is subtracted from sunrise and 0 days change from sunset
 
         print('######## SYDNEY, AUSTRALIA UTC +10 ########')
         for day in daily_sunlight2:
@@ -317,10 +373,10 @@ class TestSolarCalculator(TestCase):
         # print('Solar Noon: ', solar_schedule4[0]['solar_noon'].time())
         # print('Sunrise: ', solar_schedule4[0]['sunrise'].time())
         #
-        # light type is East. Calculation is solar_noon_times[i]) - (sunrise_times[i]) = timedelta
+        # light type is East. Calculation is solar_noon_times[i]) - (sunrise_times[i]) = seconds
         # (solar_noon = 14:58:38 5/30/21) - (sunrise = 05:49:55 5/30/21) ~ 9:08:43
 
-        self.assertEqual(daily_sunlight4[0], timedelta(seconds=32923))  # nanortalik greenland, -2 UTC
+        self.assertEqual(daily_sunlight4[0], 32923)  # nanortalik greenland, -2 UTC
 
         print('######## NANORTALIK, GREENLAND UTC -2 ########')
         for day in daily_sunlight4:
@@ -330,10 +386,10 @@ class TestSolarCalculator(TestCase):
         # print('Solar Noon: ', solar_schedule5[0]['solar_noon'].time())
         # print('Sunset: ', solar_schedule5[0]['sunset'].time())
         #
-        # light type is West. Calculation is (sunset_times[i] - solar_noon_times[i]) = timedelta
+        # light type is West. Calculation is (sunset_times[i] - solar_noon_times[i]) = seconds
         # (sunset = 05:09:21 5/30/21) - (solar_noon = 22:29:09 5/31/21) ~ 6:40:12
 
-        self.assertEqual(daily_sunlight5[0], timedelta(seconds=24012))  # Honolulu, HI, -10 UTC
+        self.assertEqual(daily_sunlight5[0], 24012)  # Honolulu, HI, -10 UTC
         
         print('######## HONOLULU, HI UTC -10 ########')
         for day in daily_sunlight5:
@@ -344,10 +400,10 @@ class TestSolarCalculator(TestCase):
         # print('Solar Noon: ', solar_schedule6[0]['solar_noon'].time())
         # print('Sunrise: ', solar_schedule6[0]['sunrise'].time())
         #
-        # light type is East. Calculation is solar_noon_times[i]) - (sunrise_times[i]) = timedelta
+        # light type is East. Calculation is solar_noon_times[i]) - (sunrise_times[i]) = seconds
         # (solar_noon = 07:11:32 5/30/21) - (sunrise = 00:13:11 5/31/21) ~ 6:58:21
 
-        self.assertEqual(daily_sunlight6[0], timedelta(seconds=25101))  # Mutan, Pakistan +5 UTC
+        self.assertEqual(daily_sunlight6[0], 25101)  # Mutan, Pakistan +5 UTC
 
         print('######## MULTAN, PAKISTAN UTC +5 ########')
         for day in daily_sunlight6:
@@ -404,11 +460,52 @@ class TestSolarCalculator(TestCase):
         print('Solar Noon: ', solar_schedule12[0]['solar_noon'].time())
         print('Sunrise: ', solar_schedule12[0]['sunrise'].time())
         #
-        # light type is East. Calculation is solar_noon_times[i]) - (sunrise_times[i]) = timedelta
+        # light type is East. Calculation is solar_noon_times[i]) - (sunrise_times[i]) = seconds
         # (solar_noon =  17:18:11 5/30/21) - (sunrise =  09:46:42 5/30/21) ~ 7:31:29
 
-        self.assertEqual(daily_sunlight12[0], timedelta(seconds=27089))  # Eerie PA, -4 UTC
+        self.assertEqual(daily_sunlight12[0], 27089)  # Eerie PA, -4 UTC
         
         print('######## EERIE, PA UTC -4 ########')
         for day in daily_sunlight12:
-            print(day)
\ No newline at end of file
+            print(day)
+
+    def test_get_sunlight_hours(self):
+        """Test calculating the daily sunlight hours of every light type for a batch of day offsets in one pass.
+        The batched mode matches the offline per-day calculation of get_daily_sunlight."""
+
+        self.test1.offline = True
+        self.sydney.offline = True
+
+        sunlight_hours = self.test1.get_sunlight_hours()
+        self.assertEqual(len(sunlight_hours['West']), 10)
+        self.assertEqual(set(sunlight_hours), {'North', 'East', 'South', 'West', 'Northeast', 'Northwest', 'Southeast', 'Southwest'})
+
+        daily_sunlight = self.test1.get_daily_sunlight()
+        for i in range(10):
+            self.assertAlmostEqual(sunlight_hours['West'][i], daily_sunlight[i] / 3600, delta=1 / 3600)
+
+        # a 60 day horizon in the southern hemisphere
+        sunlight_hours = self.sydney.get_sunlight_hours(offsets=np.arange(1, 61))
+        daily_sunlight = self.sydney.get_daily_sunlight()
+        self.assertEqual(len(sunlight_hours['North']), 60)
+        self.assertAlmostEqual(sunlight_hours['West'][0], daily_sunlight[0] / 3600, delta=1 / 3600)
+        self.assertGreater(sunlight_hours['North'][0], sunlight_hours['South'][0])
+
+    def test_get_daily_sunlight_by_type(self):
+        """Test calculating the daily sunlight of every light type from one pass over the solar forecast.
+        Each light type matches the single light type calculation of get_daily_sunlight."""
+
+        self.test1.offline = True
+        self.sydney.offline = True
+
+        daily_sunlight = self.test1.get_daily_sunlight_by_type()
+        self.assertEqual(set(daily_sunlight), {'North', 'East', 'South', 'West', 'Northeast', 'Northwest', 'Southeast', 'Southwest'})
+        self.assertEqual(daily_sunlight['West'], self.test1.get_daily_sunlight())
+
+        self.test1.light_type = 'South'
+        self.assertEqual(daily_sunlight['South'], self.test1.get_daily_sunlight())
+
+        # the southern hemisphere uses the southern light fractions
+        daily_sunlight = self.sydney.get_daily_sunlight_by_type()
+        self.assertEqual(daily_sunlight['West'], self.sydney.get_daily_sunlight())
+        self.assertGreater(daily_sunlight['North'][0], daily_sunlight['South'][0])
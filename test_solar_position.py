@@ -0,0 +1,66 @@
+"""Solar Position Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_solar_position.py
+
+from unittest import TestCase
+import numpy as np
+from datetime import date, datetime, timedelta
+from solar_position import julian_day, sunrise_hour_angle, get_solar_times, get_solar_times_array, SECONDS_PER_DAY
+
+class TestSolarPosition(TestCase):
+    """Tests for the offline NOAA solar position engine."""
+
+    def test_julian_day(self):
+        """Test converting a date into a julian day at midnight UTC."""
+
+        self.assertEqual(julian_day(date(2000, 1, 1)), 2451544.5)
+        self.assertEqual(julian_day(datetime(2021, 5, 1, 13, 30)), 2459335.5)
+
+    def test_sunrise_hour_angle(self):
+        """Test the sunrise hour angle including polar night and midnight sun."""
+
+        # at the equator the sun is up for about 12 hours at an equinox
+        self.assertAlmostEqual(sunrise_hour_angle(0, 0), 90.83, places=2)
+        # polar night and midnight sun
+        self.assertEqual(sunrise_hour_angle(78, -23.4), 0.0)
+        self.assertEqual(sunrise_hour_angle(78, 23.4), 180.0)
+
+    def test_get_solar_times(self):
+        """Test calculating solar times in seconds from midnight UTC.
+        Expected times are from the NOAA solar calculator and are checked to within a minute."""
+
+        # Seattle, WA on 5/2/21: sunrise 12:49 UTC, solar noon 20:06 UTC, sunset 3:22 UTC on 5/3
+        seattle = get_solar_times('47.466748', '-122.34722', datetime(2021, 5, 2))
+        self.assertAlmostEqual(seattle['sunrise'], 12 * 3600 + 49 * 60, delta=60)
+        self.assertAlmostEqual(seattle['solar_noon'], 20 * 3600 + 6 * 60, delta=60)
+        self.assertAlmostEqual(seattle['sunset'], SECONDS_PER_DAY + 3 * 3600 + 22 * 60, delta=60)
+        self.assertAlmostEqual(seattle['day_length'], seattle['sunset'] - seattle['sunrise'])
+
+        # Sydney, AU on 5/30/21: sunrise 20:50 UTC on 5/29, solar noon 1:52 UTC, sunset 6:54 UTC
+        sydney = get_solar_times('-33.865143', '151.209900', datetime(2021, 5, 30))
+        self.assertAlmostEqual(sydney['sunrise'], -(3 * 3600 + 10 * 60), delta=60)
+        self.assertAlmostEqual(sydney['solar_noon'], 1 * 3600 + 52 * 60, delta=60)
+        self.assertAlmostEqual(sydney['sunset'], 6 * 3600 + 54 * 60, delta=60)
+
+        # Longyearbyen, Svalbard has midnight sun in June and polar night in December
+        summer = get_solar_times(78.22, 15.65, date(2021, 6, 21))
+        winter = get_solar_times(78.22, 15.65, date(2021, 12, 21))
+        self.assertEqual(summer['day_length'], SECONDS_PER_DAY)
+        self.assertEqual(winter['day_length'], 0)
+
+    def test_get_solar_times_array(self):
+        """Test calculating solar times for an array of day offsets in one pass matches the per-day calculation."""
+
+        start_date = datetime(2021, 5, 1)
+        offsets = np.arange(1, 61)
+        solar_times = get_solar_times_array('47.466748', '-122.34722', start_date, offsets)
+
+        self.assertEqual(len(solar_times['sunrise']), 60)
+
+        for i in (0, 29, 59):
+            day = get_solar_times('47.466748', '-122.34722', start_date + timedelta(days=int(offsets[i])))
+            for key in ('sunrise', 'sunset', 'solar_noon', 'day_length'):
+                self.assertAlmostEqual(solar_times[key][i], day[key], places=6)
+
+        polar = get_solar_times_array(78.22, 15.65, date(2021, 6, 20), [1, 184])
+        self.assertEqual(list(polar['day_length']), [SECONDS_PER_DAY, 0])
@@ -0,0 +1,62 @@
+"""Fingerprinted Static Assets Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_static_assets.py
+
+import os
+import re
+from unittest import TestCase
+from flask import url_for
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app, static_assets
+from static_assets import IMMUTABLE_CACHE_CONTROL
+
+app.config['TESTING'] = True
+
+class TestStaticAssets(TestCase):
+    """Tests for the content hashed static URLs and their cache headers."""
+
+    def test_static_urls(self):
+        """Test static URLs have the content hash of the file."""
+
+        version = static_assets.get_version('app.js')
+        self.assertRegex(version, r'^[0-9a-f]{12}$')
+
+        with app.test_request_context():
+            self.assertEqual(url_for('static', filename='app.js'), f'/static/app.js?v={version}')
+
+        self.assertIsNone(static_assets.get_version('missing.js'))
+        self.assertIsNone(static_assets.get_version('../app.py'))
+
+    def test_versioned_filter(self):
+        """Test stored /static/ URLs get the content hash, other URLs are unchanged."""
+
+        version = static_assets.get_version('img/succulents.png')
+
+        self.assertEqual(static_assets.versioned_url('/static/img/succulents.png'), f'/static/img/succulents.png?v={version}')
+        self.assertEqual(static_assets.versioned_url('/static/img/uploading.svg?upload=1'), '/static/img/uploading.svg?upload=1')
+        self.assertEqual(static_assets.versioned_url('https://water-mate.s3.amazonaws.com/uploads/user/1000/0123abcd-320w.jpg'),
+            'https://water-mate.s3.amazonaws.com/uploads/user/1000/0123abcd-320w.jpg')
+
+    def test_cache_headers(self):
+        """Test static files with the current content hash are cached as immutable, other static files aren't cached."""
+
+        with app.test_client() as c:
+            res = c.get('/about')
+            url = re.search(r'src="(/static/app\.js\?v=[0-9a-f]+)"', res.get_data(as_text=True)).group(1)
+
+            res = c.get(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+            self.assertNotIn('Expires', res.headers)
+            res.close()
+
+            res = c.get('/static/app.js?v=000000000000')
+            self.assertNotIn('immutable', res.headers['Cache-Control'])
+            res.close()
+
+            res = c.get('/static/app.js')
+            self.assertNotIn('immutable', res.headers['Cache-Control'])
+            res.close()
@@ -0,0 +1,113 @@
+"""Upload Storage Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_storage.py
+
+import os
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+from botocore.stub import Stubber
+import storage
+from storage import S3Storage, LocalStorage, StorageError
+
+class TestS3Storage(TestCase):
+    """Tests for the shared S3 client and the S3 storage."""
+
+    def setUp(self):
+        """Setup an S3 storage with a stubbed client."""
+
+        self.client = storage.create_s3_client()
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        self.storage = S3Storage(bucket='water-mate', url='https://water-mate.s3.amazonaws.com/uploads/user/', client=self.client)
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def test_create_s3_client(self):
+        """Test the client pools connections and retries failed requests."""
+
+        self.assertEqual(self.client.meta.config.max_pool_connections, storage.MAX_POOL_CONNECTIONS)
+        self.assertEqual(self.client.meta.config.connect_timeout, storage.CONNECT_TIMEOUT)
+        self.assertEqual(self.client.meta.config.read_timeout, storage.READ_TIMEOUT)
+        self.assertEqual(self.client.meta.config.retries['mode'], 'standard')
+
+    def test_get_s3_client(self):
+        """Test the client is shared in a process and recreated in a forked process."""
+
+        client = storage.get_s3_client()
+        self.assertIs(storage.get_s3_client(), client)
+
+        with patch('os.getpid', return_value=-1):
+            self.assertIsNot(storage.get_s3_client(), client)
+
+    def test_put(self):
+        """Test an upload is saved under the uploads prefix and the public URL is returned."""
+
+        self.stubber.add_response('put_object', {}, {'Bucket': 'water-mate', 'Key': 'uploads/user/1000/hoya.png', 'Body': b'img', 'ContentType': 'image/png'})
+
+        url = self.storage.put('1000/hoya.png', b'img', content_type='image/png')
+
+        self.assertEqual(url, 'https://water-mate.s3.amazonaws.com/uploads/user/1000/hoya.png')
+        self.stubber.assert_no_pending_responses()
+
+    def test_put_cache_control(self):
+        """Test a content-addressed upload is saved with a long-lived Cache-Control header."""
+
+        self.stubber.add_response('put_object', {}, {'Bucket': 'water-mate', 'Key': 'uploads/user/1000/0123abcd-320w.jpg', 'Body': b'img',
+            'ContentType': 'image/jpeg', 'CacheControl': 'public, max-age=31536000, immutable'})
+
+        self.storage.put('1000/0123abcd-320w.jpg', b'img', content_type='image/jpeg', cache_control='public, max-age=31536000, immutable')
+        self.stubber.assert_no_pending_responses()
+
+    def test_put_error(self):
+        """Test a failed upload raises a StorageError."""
+
+        self.stubber.add_client_error('put_object', service_error_code='AccessDenied', http_status_code=403)
+
+        self.assertRaises(StorageError, self.storage.put, '1000/hoya.png', b'img')
+
+    def test_delete_prefix(self):
+        """Test every key under a prefix is deleted with one request per 1000 keys."""
+
+        page1 = [{'Key': f'uploads/user/1000/{i}.png'} for i in range(1000)]
+        page2 = [{'Key': f'uploads/user/1000/{i}.png'} for i in range(1000, 1500)]
+
+        self.stubber.add_response('list_objects_v2', {'Contents': page1, 'IsTruncated': True, 'NextContinuationToken': 'next'})
+        self.stubber.add_response('delete_objects', {}, {'Bucket': 'water-mate', 'Delete': {'Objects': page1, 'Quiet': True}})
+        self.stubber.add_response('list_objects_v2', {'Contents': page2, 'IsTruncated': False})
+        self.stubber.add_response('delete_objects', {}, {'Bucket': 'water-mate', 'Delete': {'Objects': page2, 'Quiet': True}})
+
+        self.assertEqual(self.storage.delete_prefix('1000/'), 1500)
+        self.stubber.assert_no_pending_responses()
+
+class TestLocalStorage(TestCase):
+    """Tests for the local folder storage."""
+
+    def setUp(self):
+        """Setup a local storage in a temporary folder."""
+
+        self.root = tempfile.mkdtemp()
+        self.storage = LocalStorage(root=self.root, url='/static/uploads/user/')
+
+    def test_put_and_delete_prefix(self):
+        """Test uploads are saved in the folder and deleted by prefix."""
+
+        self.storage.make_folder('1000/')
+        self.assertEqual(self.storage.put('1000/hoya.png', BytesIO(b'img')), '/static/uploads/user/1000/hoya.png')
+        self.storage.put('1000/calathea.png', b'img')
+        self.storage.put('1200/cactus.png', b'img')
+
+        with open(os.path.join(self.root, '1000', 'hoya.png'), 'rb') as img:
+            self.assertEqual(img.read(), b'img')
+
+        self.assertEqual(self.storage.delete_prefix('1000/'), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.root, '1000')))
+        self.assertTrue(os.path.exists(os.path.join(self.root, '1200', 'cactus.png')))
+        self.assertEqual(self.storage.delete_prefix('1000/'), 0)
+
+    def test_invalid_key(self):
+        """Test keys can't point outside of the storage folder."""
+
+        self.assertRaises(StorageError, self.storage.put, '../hoya.png', b'img')
@@ -0,0 +1,203 @@
+"""Background Image Upload Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_uploads.py
+
+import os
+import json
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+from werkzeug.datastructures import FileStorage
+from models import *
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app
+from storage import LocalStorage, StorageError, set_storage, get_storage
+from uploads import UploadQueue, PLACEHOLDER_IMAGE, DEFAULT_IMAGE, MAX_ATTEMPTS
+from test_images import make_image
+
+class FailingStorage:
+    """A storage that can't be reached."""
+
+    def put(self, key, body, content_type=None, cache_control=None):
+        raise StorageError('S3 is down')
+
+class TestUploadQueue(TestCase):
+    """Tests for the background image uploads."""
+
+    def setUp(self):
+        """Setup a plant, a temporary upload storage and spool directory."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        user = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+        user.id = 1000
+        db.session.commit()
+
+        db.session.add(Collection(id=1, name='Home', user_id=1000))
+        db.session.commit()
+        db.session.add(Room(id=1, name='Kitchen', collection_id=1))
+        db.session.commit()
+        db.session.add(LightSource(id=1, type='East', type_id=3, daily_total=8, room_id=1))
+        db.session.commit()
+        db.session.add(Plant(id=1, name='Hoya', user_id=1000, type_id=37, room_id=1, light_id=1))
+        db.session.commit()
+
+        self.storage = LocalStorage(root=tempfile.mkdtemp(), url='/static/uploads/user/')
+        set_storage(self.storage)
+
+        self.upload_queue = UploadQueue(spool_dir=tempfile.mkdtemp())
+        self.upload_queue.app = app
+
+    def tearDown(self):
+        """Rollback any sessions."""
+
+        app.config['UPLOAD_ASYNC'] = False
+        db.session.rollback()
+        db.session.remove()
+
+    def spool_image(self, data=None):
+        """Spools a test image for plant 1 and sets the plant's image to the job's placeholder."""
+
+        img = FileStorage(stream=BytesIO(data or make_image(800, 600)), filename='hoya.jpg', content_type='image/jpeg')
+        job = self.upload_queue.spool(img, prefix='1000/')
+
+        Plant.query.get(1).image = job.placeholder
+        db.session.commit()
+
+        return job
+
+    def get_image(self):
+        db.session.expire_all()
+        return Plant.query.get(1).image
+
+    def assertUploaded(self):
+        """Asserts plant 1's image is the largest uploaded JPEG rendition."""
+
+        db.session.expire_all()
+        plant = Plant.query.get(1)
+        self.assertRegex(plant.image, r'^/static/uploads/user/1000/[0-9a-f]{16}-800w\.jpg$')
+        self.assertEqual(len(plant.image_renditions), 6)
+        self.assertIn(f'{plant.image} 800w', plant.get_srcset())
+
+    def test_spool_and_upload(self):
+        """Test the plant shows a placeholder until the spooled image is uploaded."""
+
+        app.config['UPLOAD_ASYNC'] = False
+        job = self.spool_image()
+
+        self.assertTrue(os.path.exists(job.path))
+        self.assertTrue(self.get_image().startswith(PLACEHOLDER_IMAGE))
+
+        self.upload_queue.submit(job, 1)
+
+        self.assertUploaded()
+        self.assertFalse(os.path.exists(job.path))
+        self.assertEqual(self.upload_queue.get_spooled_jobs(), [])
+        self.assertEqual(len(os.listdir(os.path.join(self.storage.root, '1000'))), 6)
+
+    def test_background_upload(self):
+        """Test the worker thread uploads queued images."""
+
+        app.config['UPLOAD_ASYNC'] = True
+        job = self.spool_image()
+
+        self.upload_queue.submit(job, 1)
+        self.upload_queue.join()
+
+        self.assertUploaded()
+
+    def test_upload_keeps_newer_image(self):
+        """Test a finished upload doesn't replace an image that was changed after it was queued."""
+
+        app.config['UPLOAD_ASYNC'] = False
+        job = self.spool_image()
+
+        Plant.query.get(1).image = '/static/img/succulents.png'
+        db.session.commit()
+
+        self.upload_queue.submit(job, 1)
+
+        self.assertEqual(self.get_image(), '/static/img/succulents.png')
+
+    def test_failed_upload_is_spooled(self):
+        """Test a failed upload keeps the spooled image, so it can be uploaded later."""
+
+        app.config['UPLOAD_ASYNC'] = False
+        set_storage(FailingStorage())
+        job = self.spool_image()
+
+        self.assertRaises(StorageError, self.upload_queue.submit, job, 1)
+        self.assertEqual([spooled.id for spooled in self.upload_queue.get_spooled_jobs()], [job.id])
+
+        set_storage(self.storage)
+        for spooled in self.upload_queue.get_spooled_jobs():
+            self.upload_queue.process(spooled)
+
+        self.assertUploaded()
+        self.assertEqual(self.upload_queue.get_spooled_jobs(), [])
+
+    @patch('uploads.time.sleep')
+    def test_abandoned_upload(self, sleep):
+        """Test an upload that fails every attempt is abandoned without waiting after the last attempt,
+        and the plant gets the default image instead of the placeholder."""
+
+        app.config['UPLOAD_ASYNC'] = True
+        set_storage(FailingStorage())
+        job = self.spool_image()
+
+        self.upload_queue.submit(job, 1)
+        self.upload_queue.join()
+
+        self.assertEqual(sleep.call_count, MAX_ATTEMPTS - 1)
+        self.assertEqual(self.get_image(), DEFAULT_IMAGE)
+        self.assertEqual(self.upload_queue.get_spooled_jobs(), [])
+
+    def test_spooled_manifests(self):
+        """Test unknown keys in a manifest are ignored, and manifests that can't be read are skipped."""
+
+        app.config['UPLOAD_ASYNC'] = False
+        job = self.spool_image()
+
+        with open(job.manifest_path, 'w') as manifest:
+            json.dump({"id": job.id, "prefix": "1000/", "path": job.path, "content_type": "image/jpeg", "plant_id": 1}, manifest)
+
+        with open(os.path.join(self.upload_queue.spool_dir, 'broken.json'), 'w') as manifest:
+            manifest.write('{"id": ')
+
+        jobs = self.upload_queue.get_spooled_jobs()
+        self.assertEqual([(spooled.id, spooled.prefix, spooled.plant_id) for spooled in jobs], [(job.id, '1000/', 1)])
+
+        self.upload_queue.process(jobs[0])
+        self.assertUploaded()
+
+    def test_upload_not_an_image(self):
+        """Test a file that isn't an image isn't uploaded, and the plant gets the default image."""
+
+        app.config['UPLOAD_ASYNC'] = False
+        job = self.spool_image(b'hoya')
+
+        self.upload_queue.submit(job, 1)
+
+        self.assertEqual(self.get_image(), DEFAULT_IMAGE)
+        self.assertEqual(self.upload_queue.get_spooled_jobs(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.storage.root, '1000')))
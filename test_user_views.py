@@ -11,6 +11,8 @@ from decimal import *
 os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
 
 from app import *
+from identity import clear_identities
+from test_utils import count_queries
 
 #disable WTForms CSRF validation
 app.config['WTF_CSRF_ENABLED'] = False
@@ -48,6 +50,9 @@ class TestUserViews(TestCase):
         db.session.query(User).delete()
         db.session.commit()
 
+        #the users are recreated with the same ids, so forget their cached identities
+        clear_identities()
+
         #set up test user accounts
         self.user1 = User.signup(
             name='Pepper Cat',
@@ -126,6 +131,38 @@ class TestUserViews(TestCase):
             self.assertIn('Southwest', str(res.data))
             self.assertIn('Cactus', str(res.data))
 
+    def test_view_dashboard_query_count(self):
+        """The dashboard should load the collection tree in a fixed number of queries no matter how many rooms there are."""
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user2.id
+
+            #the first request caches the user's identity in the session
+            c.get('/dashboard')
+
+            with count_queries() as statements:
+                c.get('/dashboard')
+            query_count = len(statements)
+
+            #add more rooms with light sources and plants to the collection
+            for i in range(3, 6):
+                db.session.add(Room(id=i, name=f'Room {i}', collection_id=2))
+                db.session.commit()
+                db.session.add(LightSource(id=i, type='Southwest', type_id=9, daily_total=8, room_id=i))
+                db.session.commit()
+                db.session.add(Plant(id=i, name=f'Plant {i}', image=None, user_id=1200, type_id=16, room_id=i, light_id=i))
+                db.session.commit()
+
+            with count_queries() as statements:
+                res = c.get('/dashboard')
+
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Plant 5', str(res.data))
+            #the collections, rooms, light sources and plants
+            self.assertEqual(query_count, 4)
+            self.assertEqual(len(statements), query_count)
+
     
     def test_view_profile(self):
         """Test that the user profile view shows the user details."""
@@ -142,6 +179,43 @@ class TestUserViews(TestCase):
             self.assertIn('peppercat', str(res.data))
             self.assertIn('Home', str(res.data))
     
+    def test_navbar_username(self):
+        """Test that the navbar links to the profile with the logged in user's username, and shows the new username after an edit."""
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user2.id
+
+            res = c.get('/dashboard')
+            self.assertIn('href="/profile">kittenz</a>', str(res.data))
+
+            c.post('/profile/edit', data={'name': 'Kittenz Meow', 'username': 'kittenzmeow', 'email': 'kittenz@gmail.com', 'password': 'meowmeow'})
+
+            res = c.get('/dashboard')
+            self.assertIn('href="/profile">kittenzmeow</a>', str(res.data))
+
+    def test_deleted_user_is_logged_out(self):
+        """Test that a user deleted by another process is logged out before a write, instead of writing with the cached identity."""
+
+        with self.client as c:
+            with c.session_transaction() as session:
+                session[CURRENT_USER_KEY] = self.user1.id
+
+            #the identity is cached in the session and the process
+            c.get('/dashboard')
+
+            User.delete_account(1000)
+            db.session.commit()
+
+            res = c.post('/collections/add-collection', data={'name': 'Office'}, follow_redirects=True)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Access unauthorized.', str(res.data))
+            self.assertEqual(Collection.query.filter_by(name='Office').count(), 0)
+
+            with c.session_transaction() as session:
+                self.assertNotIn(CURRENT_USER_KEY, session)
+
     def test_view_edit_profile(self):
         """Test that the edit profile form displays and the default user data is present."""
 
@@ -233,6 +307,29 @@ class TestUserViews(TestCase):
             self.assertEqual(updated_user.latitude, Decimal('25.774266'))
             self.assertEqual(updated_user.longitude, Decimal('-80.193659'))
 
+    def test_delete_account(self):
+        """Test deleting all of a user's rows with bulk deletes, without touching other users' rows."""
+
+        db.session.add_all([
+            WaterSchedule(id=1, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 8), water_interval=7, plant_id=1),
+            WaterSchedule(id=2, water_date=datetime(2021, 5, 1), next_water_date=datetime(2021, 5, 8), water_interval=7, plant_id=2)])
+        db.session.commit()
+        db.session.add_all([
+            WaterHistory(water_date=datetime(2021, 5, 1), notes='Watered.', plant_id=1, water_schedule_id=1),
+            WaterHistory(water_date=datetime(2021, 5, 1), notes='Watered.', plant_id=2, water_schedule_id=2)])
+        db.session.commit()
+
+        self.assertEqual(User.delete_account(1000), 1)
+        db.session.commit()
+
+        self.assertIsNone(User.query.get(1000))
+        self.assertEqual([c.id for c in Collection.query.all()], [2])
+        self.assertEqual([r.id for r in Room.query.all()], [2])
+        self.assertEqual([l.id for l in LightSource.query.all()], [2])
+        self.assertEqual([p.id for p in Plant.query.all()], [2])
+        self.assertEqual([ws.id for ws in WaterSchedule.query.all()], [2])
+        self.assertEqual([wh.plant_id for wh in WaterHistory.query.all()], [2])
+
     def test_delete_profile(self):
         """Test deleting a user's profile."""
 
@@ -0,0 +1,21 @@
+"""Test helpers shared by the test modules."""
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db
+
+@contextmanager
+def count_queries():
+    """Records the SQL statements sent to the database inside the with block.
+    Yields the list of statements, clear it to start counting again."""
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
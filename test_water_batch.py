@@ -0,0 +1,81 @@
+"""Water Manager Batch Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_water_batch.py
+
+from unittest import TestCase
+from unittest.mock import patch
+from collections import namedtuple
+from datetime import datetime
+from requests.exceptions import ConnectionError
+from models import WaterSchedule, PlantType
+from water_batch import parse_batch, calculate_water_intervals, BatchError
+
+Row = namedtuple('Row', ['WaterSchedule', 'type_id', 'light_type'])
+
+class FakeForecast:
+    """A light forecast with 8 hours of light every day for every light type."""
+
+    def get_daily_sunlight(self, light_type, days):
+        return [8 * 3600.0] * days
+
+    def get_average_hours(self, light_types, days):
+        return [8.0] * len(days)
+
+class TestWaterBatch(TestCase):
+    """Tests for validating batches and sharing light forecasts."""
+
+    def test_parse_batch(self):
+        """Test a batch is validated, with water as the default action and empty notes."""
+
+        batch = parse_batch({'plants': [{'id': 1}, {'id': 2, 'action': 'snooze', 'notes': 'Still damp.'}]}, 10)
+
+        self.assertEqual(batch, [
+            {"id": 1, "action": "water", "notes": ""},
+            {"id": 2, "action": "snooze", "notes": "Still damp."}])
+
+    def test_parse_batch_invalid(self):
+        """Test invalid batches raise a BatchError."""
+
+        for data in [None, [], {'plants': {}}, {'plants': [{'id': True}]}, {'plants': [{'id': 1, 'notes': 5}]}]:
+            self.assertRaises(BatchError, parse_batch, data, 10)
+
+        self.assertRaises(BatchError, parse_batch, {'plants': [{'id': 1}, {'id': 2}]}, 1)
+
+    @patch('water_batch.get_plant_type')
+    @patch('water_batch.get_light_forecast')
+    def test_calculate_water_intervals(self, get_light_forecast, get_plant_type):
+        """Test plants with the same last water date share one light forecast covering the longest interval."""
+
+        get_light_forecast.return_value = FakeForecast()
+        get_plant_type.return_value = PlantType(id=1, name='Pothos', base_water=7, base_sunlight=6, max_days_without_water=21)
+        user_location = {"latitude": "47.466748", "longitude": "-122.347220"}
+
+        rows = [
+            Row(WaterSchedule(id=1, water_date=datetime(2021, 5, 1, 8), water_interval=7), 1, 'East'),
+            Row(WaterSchedule(id=2, water_date=datetime(2021, 5, 1, 18), water_interval=10), 1, 'South'),
+            Row(WaterSchedule(id=3, water_date=datetime(2021, 5, 3), water_interval=7), 1, 'North')]
+
+        water_intervals = calculate_water_intervals(user_location, rows)
+
+        #8 hours of light is 2 hours more than the base sunlight, so each interval is 1 day shorter
+        self.assertEqual(water_intervals, {1: 6, 2: 9, 3: 6})
+        self.assertEqual(get_light_forecast.call_count, 2)
+        self.assertEqual(get_light_forecast.call_args_list[0].kwargs['horizon'], 10)
+
+    @patch('water_batch.get_plant_type')
+    @patch('water_batch.get_light_forecast')
+    def test_calculate_water_intervals_refused(self, get_light_forecast, get_plant_type):
+        """Test groups whose forecast request fails, or whose API response can't be parsed (like a 5xx error page), are left out."""
+
+        get_plant_type.return_value = PlantType(id=1, name='Pothos', base_water=7, base_sunlight=6, max_days_without_water=21)
+        user_location = {"latitude": "47.466748", "longitude": "-122.347220"}
+
+        rows = [
+            Row(WaterSchedule(id=1, water_date=datetime(2021, 5, 1), water_interval=7), 1, 'East'),
+            Row(WaterSchedule(id=2, water_date=datetime(2021, 5, 2), water_interval=7), 1, 'East'),
+            Row(WaterSchedule(id=3, water_date=datetime(2021, 5, 3), water_interval=7), 1, 'East'),
+            Row(WaterSchedule(id=4, water_date=datetime(2021, 5, 4), water_interval=7), 1, 'East')]
+
+        get_light_forecast.side_effect = [ConnectionError(), ValueError('Expecting value'), KeyError('status'), FakeForecast()]
+
+        self.assertEqual(calculate_water_intervals(user_location, rows), {4: 6})
@@ -5,7 +5,8 @@
 from unittest import TestCase
 from solar_calculator import SolarCalculator
 from datetime import datetime, timedelta
-from water_calculator import WaterCalculator
+import numpy as np
+from water_calculator import WaterCalculator, get_water_adjustment, get_water_adjustments, adjust_water_interval, adjust_water_intervals
 from models import User, PlantType, WaterSchedule, LightType
 
 class TestWaterCalculator(TestCase):
@@ -93,75 +94,48 @@ class TestWaterCalculator(TestCase):
         self.assertEqual(len(light_forcast1), 10)
         self.assertEqual(len(light_forcast2), 5)
 
-        self.assertIsInstance(light_forcast1[0], timedelta)
-        self.assertIsInstance(light_forcast1[7], timedelta)
-        self.assertIsInstance(light_forcast1[9], timedelta)
-        self.assertIsInstance(light_forcast2[0], timedelta)
-        self.assertIsInstance(light_forcast2[2], timedelta)
-        self.assertIsInstance(light_forcast2[4], timedelta)
+        self.assertIsInstance(light_forcast1[0], float)
+        self.assertIsInstance(light_forcast1[7], float)
+        self.assertIsInstance(light_forcast1[9], float)
+        self.assertIsInstance(light_forcast2[0], float)
+        self.assertIsInstance(light_forcast2[2], float)
+        self.assertIsInstance(light_forcast2[4], float)
+
+    def test_light_forcast_seconds(self):
+        """Test the light forcast is the maximum daily sunlight in seconds."""
 
-    def test_convert_timedelta_to_float(self):
-        """Test converting a datetime.timedelta object into a float."""
-        
         light_forcast1 = self.wc1.get_light_forcast()
         light_forcast2 = self.wc2.get_light_forcast()
 
-        time1 = light_forcast1[0] # 11:55:48.500000 = 42948 seconds and 500000 microseconds
-        time2 = light_forcast1[5] # 12:10:03.375000 = 43803 seconds and 375000 microseconds
-        time3 = light_forcast2[0] # 7:09:45 = 25785 seconds and 0 micoseconds
-        time4 = light_forcast2[3] # 7:14:17 = 26057 seconds and 0 micoseconds
-
-        float1 = self.wc1.convert_timedelta_to_float(time1)
-        float2 = self.wc1.convert_timedelta_to_float(time2)
-        float3 = self.wc2.convert_timedelta_to_float(time3)
-        float4 = self.wc2.convert_timedelta_to_float(time4)
-
-        # (500000 / 1000000 + 42948 / 60) / 60 = 11.938333333333333
-        self.assertEqual(float1, 11.938333333333333)
-        
-        # (375000 / 1000000 + 43803 / 60) / 60 = 12.17375
-        self.assertEqual(float2, 12.17375)
-
-        # (0 / 1000000 + 25785 / 60) / 60 = 7.1625
-        self.assertEqual(float3, 7.1625)
+        # South light is 7/8 of the day length: 11:54:10.5 = 42850.5 seconds and 12:08:27.125 = 43707.125 seconds
+        self.assertEqual(light_forcast1[0], 42850.5)
+        self.assertEqual(light_forcast1[5], 43707.125)
 
-        # (0 / 1000000 + 26057 / 60) / 60 = 7.238055555555556
-        self.assertEqual(float4, 7.238055555555556)
+        # East light is sunrise to solar noon: 7:08:53 = 25733 seconds and 7:13:26 = 26006 seconds
+        self.assertEqual(light_forcast2[0], 25733)
+        self.assertEqual(light_forcast2[3], 26006)
 
     def test_calculate_average_hours(self):
         """Test calculatimg the average hours from a list of max daylight forcast. The list of max daylight is
-        a list of floats representing the max hours of daylight."""
+        a list of seconds of daylight."""
 
         light_forcast1 = self.wc1.get_light_forcast()
-
-        #LIGHT FORCAST 1 CONVERTED TO FLOATS
-        temp_ls1 = []
-        for time in light_forcast1:
-            flt = self.wc1.convert_timedelta_to_float(time)
-            temp_ls1.append(flt)
-        
-        #[11.938333333333333, 11.990555555555554, 12.03, 12.087638888888888, 12.130694444444446, 12.17375, 12.220416666666667, 12.267083333333334, 12.31736111111111, 12.367638888888887]
+        #[42850.5, 43023.75, 43195.25, 43366.75, 43537.375, 43707.125, 43876.0, 44044.0, 44211.125, 44377.375]
 
         average1 = self.wc1.calculate_average_hours(light_forcast1)
-        # (11.938333333333333 + 11.990555555555554 + 12.03 + 12.087638888888888 + 12.130694444444446 + 12.17375 + 12.220416666666667 + 12.267083333333334 + 12.31736111111111 + 12.367638888888887) / 10 = 12.152347222222222
+        # 436189.25 / 10 / 3600 = 12.116368055555556
+        # (the old timedelta conversion added the fractional seconds as minutes, which gave 12.121694444444445)
 
-        self.assertEqual(average1, 12.152347222222222)
+        self.assertAlmostEqual(average1, 12.116368055555556)
         self.assertIsInstance(average1, float)
 
         light_forcast2 = self.wc2.get_light_forcast()
-
-        #LIGHT FORCAST 1 CONVERTED TO FLOATS
-        temp_ls2 = []
-        for time in light_forcast2:
-            flt = self.wc2.convert_timedelta_to_float(time)
-            temp_ls2.append(flt)
-
-        #[7.1625, 7.188055555555556, 7.213333333333334, 7.238055555555556, 7.263055555555556]
+        #in hours: [7.148055555555556, 7.173333333333333, 7.198611111111111, 7.223888888888889, 7.248888888888889]
 
         average2 = self.wc1.calculate_average_hours(light_forcast2)
-        # (7.1625 + 7.188055555555556 + 7.213333333333334 + 7.238055555555556 + 7.263055555555556) / 5 = 7.212999999999999
+        # (7.148055555555556 + 7.173333333333333 + 7.198611111111111 + 7.223888888888889 + 7.248888888888889) / 5 = 7.198555555555555
 
-        self.assertEqual(average2, 7.212999999999999)
+        self.assertAlmostEqual(average2, 7.198555555555555)
         self.assertIsInstance(average2, float)
 
     def test_calculate_water_interval(self):
@@ -171,10 +145,10 @@ class TestWaterCalculator(TestCase):
         of thresholds. The water interval that is calculated is the plant's current water interval +/- the threshold."""
 
         water_interval1 = self.wc1.calculate_water_interval()
-        # 1.The AVG for this plant's schedule is 12.152347222222222 hours per day in the current watering period.
+        # 1.The AVG for this plant's schedule is 12.116368055555556 hours per day in the current watering period.
 
         #2. The plant type's base light requirements are 14 hours per day of light.
-        # We check the difference by average_hours - base_light: 12.152347222222222 - 14 = -1.84
+        # We check the difference by average_hours - base_light: 12.116368055555556 - 14 = -1.88
         # A negative result means the plant is not recieving enough light. Therefore we need to increase the amount of time between watering to avoid overwatering this plant.
 
         #3. We use the negative_threshold calculations in this case and will pull the value from the threshold key that is true. res <= -1 and res > -3 therefore the current water schedule interval will increase by 1 days. 10 + 1 = 11
@@ -184,14 +158,52 @@ class TestWaterCalculator(TestCase):
         self.assertEqual(water_interval1, 11)
 
         water_interval2 = self.wc2.calculate_water_interval()
-         # 1.The AVG for this plant's schedule is 7.212999999999999 hours per day in the current watering period.
+         # 1.The AVG for this plant's schedule is 7.198555555555555 hours per day in the current watering period.
 
         #2. The plant type's base light requirements are 4 hours per day of light.
-        # We check the difference by average_hours - base_light: 7.212999999999999 - 4 = 3.21
+        # We check the difference by average_hours - base_light: 7.198555555555555 - 4 = 3.20
         # A postive result means the plant is recieving enough, or possibly too much light. Therefore we need to decrease the amount of time between watering to prevent the plant from drying up.
 
         #3. We use the positive_threshold calculations in this case and will pull the value from the threshold key that is true. res >= 3 and res < 6   therefore the current water schedule interval will decrease by -2 days. 5 - 2 = 3
 
         #check that the new water interval is not below 0, and is not greater than the plant type's max days without water. Both are false so we will return 3.
 
-        self.assertEqual(water_interval2, 3)
\ No newline at end of file
+        self.assertEqual(water_interval2, 3)
+
+    def test_get_water_adjustment(self):
+        """Test looking up the water interval adjustment in the threshold table, including the band edges."""
+
+        self.assertEqual(get_water_adjustment(0), 0)
+        self.assertEqual(get_water_adjustment(0.99), 0)
+        self.assertEqual(get_water_adjustment(1), -1)
+        self.assertEqual(get_water_adjustment(3.2), -2)
+        self.assertEqual(get_water_adjustment(6), -7)
+        # 9-10 hours was a gap in the old threshold dicts and made no adjustment
+        self.assertEqual(get_water_adjustment(9.5), -7)
+        self.assertEqual(get_water_adjustment(10), -20)
+
+        self.assertEqual(get_water_adjustment(-0.5), 0)
+        self.assertEqual(get_water_adjustment(-1), 1)
+        self.assertEqual(get_water_adjustment(-1.88), 1)
+        self.assertEqual(get_water_adjustment(-6), 7)
+        self.assertEqual(get_water_adjustment(-9.5), 7)
+        self.assertEqual(get_water_adjustment(-12), 20)
+
+    def test_get_water_adjustments(self):
+        """Test the vectorized threshold lookup matches the single value lookup."""
+
+        res = np.linspace(-12, 12, 481)
+        adjustments = get_water_adjustments(res)
+
+        self.assertEqual(list(adjustments), [get_water_adjustment(value) for value in res])
+
+    def test_adjust_water_intervals(self):
+        """Test the vectorized water interval adjustment matches adjust_water_interval, including the bounds."""
+
+        water_intervals = np.array([10, 5, 2, 85])
+        average_hours = np.array([12.121694444444445, 18.2, 25, 2])
+        new_water_intervals = adjust_water_intervals(water_intervals, average_hours, 14, 90)
+
+        self.assertEqual(list(new_water_intervals), [11, 3, 3, 90])
+        self.assertEqual(list(new_water_intervals), [adjust_water_interval(water_interval, hours, 14, 90)
+            for water_interval, hours in zip(water_intervals, average_hours)])
@@ -0,0 +1,169 @@
+"""Water Recalculator Tests."""
+
+# FLASK_ENV=production python3 -m unittest test_water_recalculator.py
+
+import os
+from unittest import TestCase
+from models import *
+from datetime import datetime, timedelta
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_test'
+
+from app import app
+from light_forecast import clear_light_forecasts
+from water_calculator import WaterCalculator
+from water_recalculator import get_auto_schedules, group_schedules, recalculate_water_schedules
+
+class TestWaterRecalculator(TestCase):
+    """Tests for the batch Water Recalculator."""
+
+    def setUp(self):
+        """Setup DB rows and clear any old data."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        #delete any old data from the tables
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        clear_light_forecasts()
+
+        #set up test user accounts
+        user1 = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+        user1.id = 1000
+
+        user2 = User.signup(
+            name='Kittenz Meow',
+            email='kittenz@gmail.com',
+            latitude='-33.865143',
+            longitude='151.209900',
+            username='kittenz',
+            password='meowmeow')
+        user2.id = 1200
+        db.session.commit()
+
+        db.session.add_all([Collection(id=1, name='Home', user_id=1000), Collection(id=2, name='My House', user_id=1200)])
+        db.session.commit()
+
+        db.session.add_all([Room(id=1, name='Kitchen', collection_id=1), Room(id=2, name='Bedroom', collection_id=2)])
+        db.session.commit()
+
+        db.session.add_all([
+            LightSource(id=1, type='East', type_id=3, daily_total=8, room_id=1),
+            LightSource(id=2, type='Artificial', type_id=1, daily_total=8, room_id=1),
+            LightSource(id=3, type='North', type_id=2, daily_total=8, room_id=2)])
+        db.session.commit()
+
+        water_date = datetime(2021, 5, 1)
+
+        #auto mode plants with natural light, in the same location and with the same water date
+        plant1 = Plant(id=1, name='Calathea', user_id=1000, type_id=17, room_id=1, light_id=1)
+        plant2 = Plant(id=2, name='Hoya', user_id=1000, type_id=37, room_id=1, light_id=1)
+        #manual mode plant and a plant with an artificial light source are not recalculated
+        plant3 = Plant(id=3, name='Pothos', user_id=1000, type_id=17, room_id=1, light_id=1)
+        plant4 = Plant(id=4, name='Monstera', user_id=1000, type_id=17, room_id=1, light_id=2)
+        #auto mode plant in the southern hemisphere
+        plant5 = Plant(id=5, name='Fern', user_id=1200, type_id=17, room_id=2, light_id=3)
+        db.session.add_all([plant1, plant2, plant3, plant4, plant5])
+        db.session.commit()
+
+        db.session.add_all([
+            WaterSchedule(id=1, water_date=water_date, next_water_date=water_date + timedelta(days=99), water_interval=99, plant_id=1),
+            WaterSchedule(id=2, water_date=water_date, next_water_date=water_date + timedelta(days=99), water_interval=99, plant_id=2),
+            WaterSchedule(id=3, water_date=water_date, next_water_date=water_date + timedelta(days=99), water_interval=99, manual_mode=True, plant_id=3),
+            WaterSchedule(id=4, water_date=water_date, next_water_date=water_date + timedelta(days=99), water_interval=99, plant_id=4),
+            WaterSchedule(id=5, water_date=water_date, next_water_date=water_date + timedelta(days=99), water_interval=99, plant_id=5)])
+        db.session.commit()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def test_get_auto_schedules(self):
+        """Test loading only the auto mode water schedules with natural light sources."""
+
+        schedules = get_auto_schedules()
+        self.assertEqual(sorted(schedule.id for schedule in schedules), [1, 2, 5])
+
+        schedules = get_auto_schedules(user_id=1200)
+        self.assertEqual([schedule.id for schedule in schedules], [5])
+        self.assertEqual(schedules[0].light_type, 'North')
+
+    def test_group_schedules(self):
+        """Test grouping the schedules that share a location and water date."""
+
+        groups = group_schedules(get_auto_schedules())
+
+        self.assertEqual(len(groups), 2)
+        self.assertEqual(sorted(len(schedules) for schedules in groups.values()), [1, 2])
+
+    def test_recalculate_water_schedules(self):
+        """Test recalculating and bulk updating the auto mode water schedules."""
+
+        count = recalculate_water_schedules()
+        self.assertEqual(count, 3)
+
+        for schedule_id in (1, 2, 5):
+            water_schedule = WaterSchedule.query.get(schedule_id)
+            max_days_without_water = water_schedule.plant.type.max_days_without_water
+            days = (water_schedule.next_water_date - water_schedule.water_date).days
+
+            self.assertGreater(days, 0)
+            self.assertLessEqual(days, max_days_without_water)
+            #the water date and interval are not changed because the plant was not watered
+            self.assertEqual(water_schedule.water_date, datetime(2021, 5, 1))
+            self.assertEqual(water_schedule.water_interval, 99)
+
+        #manual mode and artificial light schedules are not changed
+        self.assertEqual(WaterSchedule.query.get(3).next_water_date, datetime(2021, 5, 1) + timedelta(days=99))
+        self.assertEqual(WaterSchedule.query.get(4).next_water_date, datetime(2021, 5, 1) + timedelta(days=99))
+
+        #recalculating again does not compound the adjustments
+        next_water_dates = [WaterSchedule.query.get(schedule_id).next_water_date for schedule_id in (1, 2, 5)]
+        recalculate_water_schedules()
+        self.assertEqual([WaterSchedule.query.get(schedule_id).next_water_date for schedule_id in (1, 2, 5)], next_water_dates)
+
+    def test_recalculate_keeps_adjusted_interval(self):
+        """Test a schedule whose interval was adjusted away from its plant type's base_water is recalculated from the adjusted interval,
+        with the same result as watering the plant on its water date."""
+
+        water_schedule = WaterSchedule.query.get(1)
+        water_schedule.water_interval = water_schedule.plant.type.base_water + 4
+        db.session.commit()
+
+        expected = WaterCalculator(
+            user=User.query.get(1000),
+            plant_type=water_schedule.plant.type,
+            water_schedule=water_schedule,
+            light_type='East').calculate_water_interval()
+
+        recalculate_water_schedules(user_id=1000)
+        db.session.expire_all()
+
+        water_schedule = WaterSchedule.query.get(1)
+        self.assertEqual(water_schedule.water_interval, water_schedule.plant.type.base_water + 4)
+        self.assertEqual(water_schedule.next_water_date, datetime(2021, 5, 1) + timedelta(days=expected))
+
+    def test_recalculate_user_water_schedules(self):
+        """Test recalculating only one user's water schedules."""
+
+        count = recalculate_water_schedules(user_id=1200)
+
+        self.assertEqual(count, 1)
+        self.assertNotEqual(WaterSchedule.query.get(5).next_water_date, datetime(2021, 5, 1) + timedelta(days=99))
+        self.assertEqual(WaterSchedule.query.get(1).next_water_date, datetime(2021, 5, 1) + timedelta(days=99))
@@ -0,0 +1,224 @@
+"""Background Image Uploads & helper methods.
+
+Plant images are saved to a local spool directory during the request, then resized and uploaded to the upload storage
+(S3 bucket) by a background worker thread, so the response doesn't wait on S3. Until the upload finishes the plant's
+image is a placeholder, then the worker replaces it with the uploaded image renditions.
+
+Each job writes a small JSON manifest next to its spooled file. If a process stops before its jobs finish, the
+leftover jobs can be uploaded with flask process-uploads."""
+
+import os
+import json
+import time
+import uuid
+import queue
+import tempfile
+import threading
+from models import db, Plant
+from storage import get_storage, StorageError
+from images import make_renditions, ImageError
+from static_assets import IMMUTABLE_CACHE_CONTROL
+
+PLACEHOLDER_IMAGE = '/static/img/uploading.svg'
+# The plant's image if the upload isn't an image that can be resized.
+DEFAULT_IMAGE = '/static/img/succulents.png'
+SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'water_mate_uploads'))
+# Failed uploads are retried with a backoff of RETRY_DELAY, 2 * RETRY_DELAY, ... seconds.
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 2
+
+class UploadJob:
+    """An image waiting in the spool directory to be resized and uploaded under a storage prefix (folder) for a plant."""
+
+    def __init__(self, id, prefix, path, plant_id=None):
+        self.id = id
+        self.prefix = prefix
+        self.path = path
+        self.plant_id = plant_id
+
+    def __repr__(self):
+        return f'<UploadJob {self.id}: {self.prefix}>'
+
+    @property
+    def placeholder(self):
+        """The plant's image until the upload finishes. It is unique to this job, so a finished upload
+        only replaces its own placeholder (and not a newer image)."""
+        return f'{PLACEHOLDER_IMAGE}?upload={self.id}'
+
+    @property
+    def manifest_path(self):
+        return f'{self.path}.json'
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "prefix": self.prefix,
+            "path": self.path,
+            "plant_id": self.plant_id
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns the UploadJob of a manifest. Unknown keys are ignored."""
+
+        return cls(id=data['id'], prefix=data['prefix'], path=data['path'], plant_id=data.get('plant_id'))
+
+class UploadQueue:
+    """Uploads spooled images in a background worker thread (one per process).
+    Set UPLOAD_ASYNC to False to upload in the request instead (used by tests)."""
+
+    def __init__(self, app=None, spool_dir=SPOOL_DIR):
+        self.spool_dir = spool_dir
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('UPLOAD_ASYNC', True)
+        app.extensions['upload_queue'] = self
+
+    def spool(self, img, prefix):
+        """Saves an uploaded file (werkzeug FileStorage) to the spool directory and returns a new UploadJob for it.
+        Set the plant's image to job.placeholder, then submit the job once the plant is saved."""
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        job_id = uuid.uuid4().hex
+        job = UploadJob(id=job_id, prefix=prefix, path=os.path.join(self.spool_dir, job_id))
+        img.save(job.path)
+
+        return job
+
+    def submit(self, job, plant_id):
+        """Queues a spooled job to upload the image and set it as the plant's image."""
+
+        job.plant_id = plant_id
+
+        #the manifest is written before queueing, so a job lost with its process can still be uploaded later
+        with open(job.manifest_path, 'w') as manifest:
+            json.dump(job.to_dict(), manifest)
+
+        if not self.app.config['UPLOAD_ASYNC']:
+            self.process(job)
+            return
+
+        self.get_queue().put(job)
+
+    def get_queue(self):
+        """Returns the job queue for this process, starting the worker thread on first use.
+        A forked worker process starts its own thread instead of sharing the parent's queue."""
+
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                threading.Thread(target=self.work, args=(self._queue,), name='upload-worker', daemon=True).start()
+
+            return self._queue
+
+    def work(self, jobs):
+        """Runs in the worker thread, uploads queued jobs one at a time, retrying failed uploads with a backoff.
+        A job that still fails after MAX_ATTEMPTS is abandoned."""
+
+        while True:
+            job = jobs.get()
+
+            for attempt in range(MAX_ATTEMPTS):
+                try:
+                    self.process(job)
+                    break
+                except StorageError as e:
+                    self.app.logger.warning(f'Upload {job} failed (attempt {attempt + 1}): {e}')
+                    #don't wait after the last attempt
+                    if attempt + 1 < MAX_ATTEMPTS:
+                        time.sleep(RETRY_DELAY * 2 ** attempt)
+                except Exception:
+                    self.app.logger.exception(f'Upload {job} failed')
+                    self.abandon(job)
+                    break
+            else:
+                self.abandon(job)
+
+            jobs.task_done()
+
+    def abandon(self, job):
+        """Gives up on a job that can't be uploaded: the plant's placeholder is replaced with the default image
+        (so it isn't shown as uploading forever) and the spooled files are deleted."""
+
+        self.app.logger.error(f'Upload {job} abandoned, plant {job.plant_id} gets the default image')
+
+        try:
+            self.set_image(job, DEFAULT_IMAGE, None)
+            self.remove_spooled(job)
+        except Exception:
+            self.app.logger.exception(f'Upload {job} could not be abandoned')
+
+    def process(self, job):
+        """Resizes and uploads a job's image, replaces the plant's placeholder image with the uploaded renditions, and deletes the spooled files.
+        Returns the plant's new image URL. Raises a StorageError if the upload fails (the spooled files are kept so the job can be retried)."""
+
+        try:
+            with open(job.path, 'rb') as img:
+                renditions = make_renditions(img, job.prefix)
+        except ImageError as e:
+            #retrying won't help, the plant gets the default image instead
+            self.app.logger.warning(f'Upload {job} is not an image: {e}')
+            image, image_renditions = DEFAULT_IMAGE, None
+        else:
+            storage = get_storage()
+            #the keys are content hashes, a key's content never changes so browsers can cache it forever
+            image_renditions = [r.to_dict(storage.put(r.key, r.body, content_type=r.content_type, cache_control=IMMUTABLE_CACHE_CONTROL))
+                for r in renditions]
+            #the largest JPEG is the fallback for browsers without srcset
+            image = [r['url'] for r in image_renditions if r['type'] == 'image/jpeg'][-1]
+
+        self.set_image(job, image, image_renditions)
+        self.remove_spooled(job)
+
+        return image
+
+    def set_image(self, job, image, image_renditions):
+        """Replaces the job's placeholder with the plant's new image."""
+
+        #only replace this job's placeholder, the plant may have been deleted or given a newer image.
+        #the update uses its own connection so it doesn't touch the session of a request (or need an app context in the worker thread)
+        with db.engine.begin() as conn:
+            conn.execute(Plant.__table__.update()
+                .where(Plant.id == job.plant_id, Plant.image == job.placeholder)
+                .values(image=image, image_renditions=image_renditions))
+
+    def remove_spooled(self, job):
+        """Deletes a job's spooled image and manifest."""
+
+        for path in (job.path, job.manifest_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def join(self):
+        """Waits until every queued job in this process is finished."""
+
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def get_spooled_jobs(self):
+        """Returns the jobs that are still in the spool directory (queued, or lost when a process stopped).
+        Manifests that can't be read are logged and skipped, so they don't stop the other jobs."""
+
+        if not os.path.isdir(self.spool_dir):
+            return []
+
+        jobs = []
+
+        for filename in sorted(os.listdir(self.spool_dir)):
+            if filename.endswith('.json'):
+                try:
+                    with open(os.path.join(self.spool_dir, filename)) as manifest:
+                        jobs.append(UploadJob.from_dict(json.load(manifest)))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self.app.logger.warning(f'Skipping upload manifest {filename}: {e!r}')
+
+        return jobs
@@ -0,0 +1,172 @@
+"""Water Manager Batch & helper methods.
+
+The water manager can water or snooze many plants in one request. The plants are loaded in one joined query,
+plants that share a location and last water date share one light forecast, and every change is saved in one transaction."""
+
+import numpy as np
+from collections import defaultdict
+from datetime import timedelta
+from models import db, Plant, LightSource, WaterSchedule, WaterHistory
+from light_forecast import get_light_forecast, get_forecast_key, FORECAST_ERRORS
+from water_calculator import adjust_water_intervals
+from reference import get_plant_type
+
+ACTIONS = ('water', 'snooze')
+# Number of days a snooze pushes back the next water date (the same as the snooze route).
+SNOOZE_DAYS = 3
+# The same limit as the AddWaterHistoryNotes form.
+MAX_NOTES_LENGTH = 200
+
+class BatchError(ValueError):
+    """Raised when a batch request isn't valid."""
+
+def parse_batch(data, max_size):
+    """Validates a batch request: {"plants": [{"id": 1, "action": "water", "notes": "..."}, {etc.}]}.
+    The action defaults to water and the notes are optional.
+
+    Returns a list of dicts: [{"id": id, "action": action, "notes": notes}, {etc.}], raises a BatchError if the request isn't valid."""
+
+    items = data.get('plants') if isinstance(data, dict) else None
+
+    if not isinstance(items, list) or not items:
+        raise BatchError('plants must be a list of plants to water or snooze.')
+
+    if len(items) > max_size:
+        raise BatchError(f'A batch can have at most {max_size} plants.')
+
+    batch = []
+    plant_ids = set()
+
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int) or isinstance(item.get('id'), bool):
+            raise BatchError('Each plant must have an integer id.')
+
+        action = item.get('action', 'water')
+        notes = item.get('notes') or ''
+
+        if action not in ACTIONS:
+            raise BatchError(f'Plant {item["id"]}: action must be one of {", ".join(ACTIONS)}.')
+
+        if not isinstance(notes, str) or len(notes) > MAX_NOTES_LENGTH:
+            raise BatchError(f'Plant {item["id"]}: notes must be less than {MAX_NOTES_LENGTH} characters in length.')
+
+        if item['id'] in plant_ids:
+            raise BatchError(f'Plant {item["id"]} is in the batch more than once.')
+
+        plant_ids.add(item['id'])
+        batch.append({"id": item['id'], "action": action, "notes": notes})
+
+    return batch
+
+def get_batch_schedules(user_id, plant_ids):
+    """Returns the water schedules of a user's plants with their plant type id and light type, loaded in one joined query.
+    Plants that don't exist (or belong to another user) are left out.
+
+    Returns a dict of plant id to (water_schedule, type_id, light_type) rows."""
+
+    rows = (db.session.query(WaterSchedule, Plant.type_id, LightSource.type.label('light_type'))
+        .join(Plant, WaterSchedule.plant_id == Plant.id)
+        .join(LightSource, Plant.light_id == LightSource.id)
+        .filter(Plant.user_id == user_id, Plant.id.in_(plant_ids))
+        .all())
+
+    return {row.WaterSchedule.plant_id: row for row in rows}
+
+def uses_light_forecast(row):
+    """Returns True if watering the plant recalculates its water interval from the light forecast
+    (auto mode with a natural light source), the same as the water route."""
+
+    return not row.WaterSchedule.manual_mode and row.light_type != 'Artificial'
+
+def calculate_water_intervals(user_location, rows):
+    """Calculates the new water_interval of each row watered in auto mode with a natural light source.
+    Rows are grouped by forecast key (location and last water date) so each group shares one light forecast
+    covering the longest interval in the group, and every interval in the group is adjusted in one vectorized call.
+
+    Returns a dict of water schedule id to water_interval. Groups whose forecast can't be fetched from the API (or can't be parsed) are left out."""
+
+    groups = defaultdict(list)
+
+    for row in rows:
+        groups[get_forecast_key(user_location, row.WaterSchedule.water_date)].append(row)
+
+    water_intervals = {}
+
+    for group in groups.values():
+        try:
+            forecast = get_light_forecast(
+                user_location=user_location,
+                start_date=group[0].WaterSchedule.water_date,
+                horizon=max(row.WaterSchedule.water_interval for row in group))
+        except FORECAST_ERRORS:
+            continue
+
+        plant_types = [get_plant_type(row.type_id) for row in group]
+        group_intervals = np.array([row.WaterSchedule.water_interval for row in group])
+
+        new_water_intervals = adjust_water_intervals(
+            water_intervals=group_intervals,
+            average_hours=forecast.get_average_hours([row.light_type for row in group], group_intervals),
+            base_sunlight=np.array([plant_type.base_sunlight for plant_type in plant_types]),
+            max_days_without_water=np.array([plant_type.max_days_without_water for plant_type in plant_types]))
+
+        for row, water_interval in zip(group, new_water_intervals):
+            water_intervals[row.WaterSchedule.id] = int(water_interval)
+
+    return water_intervals
+
+def apply_batch(user, batch, now):
+    """Waters or snoozes each plant in a validated batch for a user (the same as the water and snooze routes),
+    and adds the water history records to the session. The caller commits the session.
+
+    Returns a list of dicts in the batch order: [{"id": id, "status": status, "next_water_date": date}, {etc.}]
+    with a status of watered, snoozed, not_found, or refused (the light forecast couldn't be fetched, the plant isn't changed)."""
+
+    schedules = get_batch_schedules(user.id, [item['id'] for item in batch])
+
+    forecast_rows = [schedules[item['id']] for item in batch
+        if item['action'] == 'water' and item['id'] in schedules and uses_light_forecast(schedules[item['id']])]
+    water_intervals = calculate_water_intervals(user.get_coordinates, forecast_rows) if forecast_rows else {}
+
+    results = []
+    history = []
+
+    for item in batch:
+        row = schedules.get(item['id'])
+
+        if row is None:
+            results.append({"id": item['id'], "status": "not_found", "next_water_date": None})
+            continue
+
+        water_schedule = row.WaterSchedule
+
+        if item['action'] == 'snooze':
+            water_schedule.next_water_date = now + timedelta(days=SNOOZE_DAYS)
+            history.append(WaterHistory(water_date=water_schedule.water_date, snooze=SNOOZE_DAYS, notes=item['notes'],
+                plant_id=item['id'], water_schedule_id=water_schedule.id))
+            status = 'snoozed'
+
+        elif uses_light_forecast(row):
+            if water_schedule.id not in water_intervals:
+                results.append({"id": item['id'], "status": "refused", "next_water_date": None})
+                continue
+
+            water_schedule.water_interval = water_intervals[water_schedule.id]
+            water_schedule.water_date = now
+            water_schedule.next_water_date = now + timedelta(days=water_schedule.water_interval)
+            history.append(WaterHistory(water_date=now, notes=item['notes'], plant_id=item['id'], water_schedule_id=water_schedule.id))
+            status = 'watered'
+
+        else:
+            #manual mode and artificial light keep their water interval (the water route only moves the water date of manual schedules)
+            if water_schedule.manual_mode:
+                water_schedule.water_date = now
+            water_schedule.next_water_date = now + timedelta(days=water_schedule.water_interval)
+            history.append(WaterHistory(water_date=now, notes=item['notes'], plant_id=item['id'], water_schedule_id=water_schedule.id))
+            status = 'watered'
+
+        results.append({"id": item['id'], "status": status, "next_water_date": water_schedule.next_water_date.isoformat()})
+
+    db.session.add_all(history)
+
+    return results
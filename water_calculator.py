@@ -1,8 +1,18 @@
 """Water Calculator & helper methods."""
 
-from solar_calculator import SolarCalculator
+import numpy as np
+from bisect import bisect_right
+from requests.exceptions import RequestException
+from light_forecast import get_light_forecast
 from datetime import datetime
 
+# Water interval threshold table. The breakpoints are the (sorted) absolute differences in hours between the average daily light
+# and the plant type's base sunlight, and each band between breakpoints adjusts the water interval by the number of days below:
+# less than 1 hour: 0 days, 1-3 hours: 1 day, 3-6 hours: 2 days, 6-10 hours: 7 days, 10 or more hours: 20 days.
+# Too much light shortens the interval (more frequent watering) and not enough light lengthens it.
+LIGHT_DIFFERENCE_BREAKPOINTS = [1, 3, 6, 10]
+WATER_ADJUSTMENTS = [0, 1, 2, 7, 20]
+
 class WaterCalculator:
     """A class to make water schedule calculations.
     Takes a User, a plant type, and a water_schedule."""
@@ -15,44 +25,31 @@ class WaterCalculator:
         self.light_forcast = self.get_light_forcast()
     
     def get_light_forcast(self):
-        """Get the light forcast from the solar calculator.
+        """Get the light forcast from the shared light forecast for the user's location.
         Uses the user's location, current date, water interval (days between water frequency),
         and the light type to calculate the maximum light potential for each day.
-        
-        If the light forcast fails to populate raise an error."""
-
-        calculator = SolarCalculator(
-            user_location=self.user.get_coordinates,
-            current_date=self.water_schedule.water_date,
-            water_interval=self.water_schedule.water_interval,
-            light_type = self.light_type
-            )
-
-        light_forcast = calculator.get_daily_sunlight()
 
-        if (light_forcast):
+        The forecast is memoized per location and start date, so plants that share a location reuse it.
+        
+        If the light forcast fails to populate (or the API can't be reached) raise an error."""
+
+        try:
+            forecast = get_light_forecast(
+                user_location=self.user.get_coordinates,
+                start_date=self.water_schedule.water_date,
+                horizon=self.water_schedule.water_interval)
+            light_forcast = forecast.get_daily_sunlight(self.light_type, self.water_schedule.water_interval)
+        except RequestException:
+            light_forcast = None
+
+        if light_forcast is not None and len(light_forcast):
             return light_forcast
         raise ConnectionRefusedError #not sure if this is the appropriate error I should be raising?
     
-    def convert_timedelta_to_float(self, time_delta):
-        """Accepts a datetime.timedelta object, extracts the minutes and microseconds,
-        then converts the total minutes and microseconds to hours.
-        Returns a float representing the total hours."""
-
-        seconds = time_delta.seconds
-        microseconds = time_delta.microseconds
-
-        return (microseconds / 1000000 + seconds / 60) / 60
-    
     def calculate_average_hours(self, time_list):
-        """Accepts a list of datetime.timedelta objects, calculates and returns the average."""
-        
-        total = 0
-        for time in time_list:
-            hours = self.convert_timedelta_to_float(time)
-            total = total + hours
+        """Accepts a list of daily sunlight in seconds, calculates and returns the average in hours."""
         
-        return total / len(time_list)
+        return calculate_average_hours(time_list)
 
 
     def calculate_water_interval(self):
@@ -70,49 +67,77 @@ class WaterCalculator:
 
         4. No matter what, the water_interval will never exceed the plant type max_days_without_water so plants in less than optimal conditions will recieve enough water to stay alive and plants in extreme conditions will not recieve too much water so as to cause root rot."""
 
-        # base_water = self.plant_type.base_water
-        base_light = self.plant_type.base_sunlight
-        new_water_interval = self.water_schedule.water_interval
-
         #compare the average hours with the optimal hours and adjust accordingly given the respective thresholds
         average_hours = self.calculate_average_hours(self.light_forcast)
-        
-        res = average_hours - base_light
-        adjustment = 0
-        
-        positive_threshold = {
-            res >= 0 and res < 1: 0,
-            res >= 1 and res < 3: -1, 
-            res >= 3 and res < 6: -2,
-            res >= 6 and res < 9: -7,
-            res >= 10: -20}
-
-        negative_threshold = {
-            res <= 0 and res > -1: 0,
-            res <= -1 and res > -3: 1, 
-            res <= -3 and res > -6: 2,
-            res <= -6 and res > -9: 7,
-            res <= -10: 20}
-        
-        if res >= 0:
-            #the plant is getting too much light
-            for key in positive_threshold:
-                if (key):
-                    adjustment = positive_threshold[key]
-        else:
-            #the plant is not getting enough light
-            for key in negative_threshold:
-                if (key):
-                    adjustment = negative_threshold[key]
-        
-        #set the new number of days between watering
-        new_water_interval += adjustment
 
-        #last, make sure the water_interval does not exceed the plant type's max_days_without_water or go into negative.
-        if new_water_interval >= self.plant_type.max_days_without_water:
-            new_water_interval = self.plant_type.max_days_without_water
-        
-        if new_water_interval <= 0:
-            new_water_interval = 3
+        return adjust_water_interval(
+            water_interval=self.water_schedule.water_interval,
+            average_hours=average_hours,
+            base_sunlight=self.plant_type.base_sunlight,
+            max_days_without_water=self.plant_type.max_days_without_water)
+
+def calculate_average_hours(time_list):
+    """Accepts a list (or numpy array) of daily sunlight in seconds, calculates and returns the average in hours."""
+
+    return sum(time_list) / len(time_list) / 3600
+
+def adjust_water_interval(water_interval, average_hours, base_sunlight, max_days_without_water):
+    """Adjusts a water_interval (days between waterings) by the difference between the average daily light hours
+    and the plant type's base_sunlight, then bounds it by the plant type's max_days_without_water.
+    See WaterCalculator.calculate_water_interval for the details of the algorithm.
+
+    Returns the new water_interval."""
+
+    new_water_interval = water_interval
         
-        return new_water_interval      
+    res = average_hours - base_sunlight
+    adjustment = get_water_adjustment(res)
+    
+    #set the new number of days between watering
+    new_water_interval += adjustment
+
+    #last, make sure the water_interval does not exceed the plant type's max_days_without_water or go into negative.
+    if new_water_interval >= max_days_without_water:
+        new_water_interval = max_days_without_water
+    
+    if new_water_interval <= 0:
+        new_water_interval = 3
+    
+    return new_water_interval
+
+def get_water_adjustment(res):
+    """Looks up the number of days to adjust the water interval for res (average daily light hours - base sunlight hours)
+    in the water interval threshold table.
+
+    Returns a negative adjustment if the plant is getting too much light (res >= 0), or a positive adjustment if the plant
+    is not getting enough light."""
+
+    adjustment = WATER_ADJUSTMENTS[bisect_right(LIGHT_DIFFERENCE_BREAKPOINTS, abs(res))]
+
+    if res >= 0:
+        #the plant is getting too much light
+        return -adjustment
+    #the plant is not getting enough light
+    return adjustment
+
+def get_water_adjustments(res):
+    """Looks up the water interval adjustments for a numpy array of res values (average daily light hours - base sunlight hours)
+    in one vectorized pass, for batches and simulations. Matches get_water_adjustment for each value.
+
+    Returns a numpy array of adjustments in days."""
+
+    res = np.asarray(res, dtype=float)
+    adjustments = np.take(WATER_ADJUSTMENTS, np.searchsorted(LIGHT_DIFFERENCE_BREAKPOINTS, np.abs(res), side='right'))
+
+    return np.where(res >= 0, -adjustments, adjustments)
+
+def adjust_water_intervals(water_intervals, average_hours, base_sunlight, max_days_without_water):
+    """Vectorized adjust_water_interval for numpy arrays (or scalars) of water intervals, average daily light hours,
+    base sunlight hours and max days without water.
+
+    Returns a numpy array of the new water intervals."""
+
+    new_water_intervals = np.asarray(water_intervals) + get_water_adjustments(np.asarray(average_hours) - base_sunlight)
+    new_water_intervals = np.minimum(new_water_intervals, max_days_without_water)
+
+    return np.where(new_water_intervals <= 0, 3, new_water_intervals)
@@ -0,0 +1,96 @@
+"""Water Schedule Recalculator & helper methods."""
+
+import numpy as np
+from collections import defaultdict
+from datetime import timedelta
+from models import db, User, PlantType, Plant, LightSource, WaterSchedule
+from light_forecast import LightForecast, get_forecast_key, FORECAST_ERRORS
+from water_calculator import adjust_water_intervals
+
+def get_auto_schedules(user_id=None):
+    """Returns the rows needed to recalculate every auto mode water schedule with a natural light source,
+    or only one user's schedules if a user_id is provided. The rows are loaded in one joined query:
+    (id, water_date, water_interval, latitude, longitude, light_type, base_water, base_sunlight, max_days_without_water)."""
+
+    query = (db.session.query(
+            WaterSchedule.id,
+            WaterSchedule.water_date,
+            WaterSchedule.water_interval,
+            User.latitude,
+            User.longitude,
+            LightSource.type.label('light_type'),
+            PlantType.base_water,
+            PlantType.base_sunlight,
+            PlantType.max_days_without_water)
+        .join(Plant, WaterSchedule.plant_id == Plant.id)
+        .join(User, Plant.user_id == User.id)
+        .join(LightSource, Plant.light_id == LightSource.id)
+        .join(PlantType, Plant.type_id == PlantType.id)
+        .filter(WaterSchedule.manual_mode == False)
+        .filter(LightSource.type != 'Artificial')
+        .filter(User.latitude.isnot(None), User.longitude.isnot(None)))
+
+    if user_id is not None:
+        query = query.filter(Plant.user_id == user_id)
+
+    return query.all()
+
+def group_schedules(schedules):
+    """Groups the schedule rows by forecast key (location and water date), so each group shares one light forecast.
+    Returns a dict of lists of schedule rows."""
+
+    groups = defaultdict(list)
+
+    for schedule in schedules:
+        user_location = {"latitude": schedule.latitude, "longitude": schedule.longitude}
+        groups[get_forecast_key(user_location, schedule.water_date)].append(schedule)
+
+    return groups
+
+def calculate_water_schedules(schedules):
+    """Calculates the next_water_date for a list of schedule rows that share a location and water date.
+    One light forecast covering the longest interval in the group is calculated, and every interval in the group
+    is adjusted in one vectorized call.
+
+    The interval is adjusted from the schedule's current water_interval, the same as watering the plant on its water date
+    (WaterCalculator), so the adjustments made by earlier waterings are kept.
+
+    Returns a list of dicts: [{"id": id, "next_water_date": next_water_date}, {etc.}]"""
+
+    first = schedules[0]
+    user_location = {"latitude": first.latitude, "longitude": first.longitude}
+    forecast = LightForecast(user_location, first.water_date, max(schedule.water_interval for schedule in schedules))
+
+    water_intervals = np.array([schedule.water_interval for schedule in schedules])
+
+    new_water_intervals = adjust_water_intervals(
+        water_intervals=water_intervals,
+        average_hours=forecast.get_average_hours([schedule.light_type for schedule in schedules], water_intervals),
+        base_sunlight=np.array([schedule.base_sunlight for schedule in schedules]),
+        max_days_without_water=np.array([schedule.max_days_without_water for schedule in schedules]))
+
+    return [{"id": schedule.id, "next_water_date": schedule.water_date + timedelta(days=int(water_interval))}
+        for schedule, water_interval in zip(schedules, new_water_intervals)]
+
+def recalculate_water_schedules(user_id=None):
+    """Recalculates the next_water_date of every auto mode water schedule (or one user's schedules)
+    from the light forecast after the schedule's last water date, and bulk updates them in one transaction.
+
+    Only the next_water_date is updated: the water_interval is adjusted when the plant is watered (one adjustment
+    per watering), so running the recalculation again (like a nightly job) does not compound the adjustments.
+    Groups whose forecast can't be fetched from the API (or can't be parsed) are skipped and keep their current schedule.
+
+    Returns the number of water schedules updated."""
+
+    updates = []
+
+    for schedules in group_schedules(get_auto_schedules(user_id)).values():
+        try:
+            updates.extend(calculate_water_schedules(schedules))
+        except FORECAST_ERRORS:
+            continue
+
+    db.session.bulk_update_mappings(WaterSchedule, updates)
+    db.session.commit()
+
+    return len(updates)